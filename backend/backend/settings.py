@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.1/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 from decouple import config, Csv
 from datetime import timedelta
@@ -50,6 +51,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'corsheaders.middleware.CorsMiddleware',
+    'core.middleware.PerformanceMiddleware',  # Server-Timing + per-request log lines
+    'core.middleware.ProfilingMiddleware',  # Profiles requests carrying a signed X-Profile token
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # For serving static files in production
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -93,6 +96,13 @@ if DB_ENGINE == 'django.db.backends.sqlite3':
         'default': {
             'ENGINE': DB_ENGINE,
             'NAME': BASE_DIR / config('DB_NAME', default='db.sqlite3'),
+            'OPTIONS': {
+                # Take the write lock when a transaction starts, so concurrent
+                # writers (e.g. bookings from several workers) wait for each
+                # other instead of failing with "database is locked"
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
         }
     }
 else:
@@ -109,6 +119,33 @@ else:
 
 
 
+# Cache
+# LocMemCache is per process: a cache invalidated by one gunicorn worker stays
+# stale in the others. A deployment with several workers requires a shared
+# cache (Redis or Memcached), e.g.
+#   CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   CACHE_LOCATION=redis://127.0.0.1:6379/1
+# for the dashboard caches, login throttles and JWT revocation markers.
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='medicare-default'),
+    }
+}
+
+# Seconds to cache per-doctor dashboard counters (0 disables the cache)
+DOCTOR_STATS_CACHE_TIMEOUT = config('DOCTOR_STATS_CACHE_TIMEOUT', default=60, cast=int)
+# With a per-process cache the doctor counters are kept this long at most,
+# bounding how stale another worker's copy can be after an invalidation
+LOCAL_CACHE_MAX_TIMEOUT = config('LOCAL_CACHE_MAX_TIMEOUT', default=5, cast=int)
+
+# Seconds to cache the admin dashboard totals (0 disables the cache)
+ADMIN_SUMMARY_CACHE_TIMEOUT = config('ADMIN_SUMMARY_CACHE_TIMEOUT', default=30, cast=int)
+
+# Flat fee per appointment used for the revenue figures on the Reports page
+APPOINTMENT_BASE_PRICE = config('APPOINTMENT_BASE_PRICE', default=150, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -161,15 +198,62 @@ CORS_ALLOWED_ORIGINS = config('CORS_ALLOWED_ORIGINS', default='http://localhost:
 CORS_ALLOW_CREDENTIALS = True
 
 # REST Framework settings
+# With JWT_STATELESS_AUTH the role/name/is_verified claims in the access token
+# are trusted and the User row is not loaded on every request. Needs a shared
+# cache (see Cache below) for the revocation markers; core.E001 enforces it.
+JWT_STATELESS_AUTH = config('JWT_STATELESS_AUTH', default=False, cast=bool)
+# Seconds a worker may reuse a "not revoked" answer before checking the cache again
+JWT_REVOCATION_CHECK_TTL = config('JWT_REVOCATION_CHECK_TTL', default=30, cast=int)
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'core.authentication.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
 }
 
+# Cursor pagination for list endpoints (opt-in via ?page_size= or ?cursor=)
+CURSOR_PAGINATION_DEFAULT_PAGE_SIZE = config('CURSOR_PAGINATION_DEFAULT_PAGE_SIZE', default=50, cast=int)
+CURSOR_PAGINATION_MAX_PAGE_SIZE = config('CURSOR_PAGINATION_MAX_PAGE_SIZE', default=500, cast=int)
+
+# Bulk export: rows fetched per database round trip and bytes per streamed chunk
+EXPORT_CHUNK_SIZE = config('EXPORT_CHUNK_SIZE', default=2000, cast=int)
+EXPORT_BUFFER_BYTES = config('EXPORT_BUFFER_BYTES', default=64 * 1024, cast=int)
+
+# Bulk import: rows per bulk_create/transaction and how many row errors to report back
+IMPORT_BATCH_SIZE = config('IMPORT_BATCH_SIZE', default=1000, cast=int)
+IMPORT_MAX_REPORTED_ERRORS = config('IMPORT_MAX_REPORTED_ERRORS', default=100, cast=int)
+
+# Appointment slots: working hours for doctors without a DoctorSchedule
+# (weekday 0 = Monday, start, end, slot minutes) and the widest ?from=&to= range
+DOCTOR_DEFAULT_SCHEDULE = [(weekday, '09:00', '17:00', 30) for weekday in range(5)]
+SLOTS_MAX_DAYS = config('SLOTS_MAX_DAYS', default=31, cast=int)
+
+# Patient typeahead (/api/patients/search/): default and largest ?limit=
+PATIENT_SEARCH_LIMIT = config('PATIENT_SEARCH_LIMIT', default=10, cast=int)
+PATIENT_SEARCH_MAX_LIMIT = config('PATIENT_SEARCH_MAX_LIMIT', default=50, cast=int)
+
+# Delta sync of the list endpoints (see core/sync.py)
+SYNC_OVERLAP_SECONDS = config('SYNC_OVERLAP_SECONDS', default=5, cast=int)
+SYNC_TOMBSTONE_DAYS = config('SYNC_TOMBSTONE_DAYS', default=30, cast=int)
+
+# Admission control for login/register (see core/throttling.py). The counters
+# live in the default cache, so they are only global with a shared one (see
+# Cache below; `check --deploy` warns otherwise). The per-IP limit is loose:
+# a ward of staff behind one NAT logs in together at shift change, and the
+# per-identity limit is what protects an account.
+AUTH_THROTTLE_RATES = {
+    'auth_ip': config('AUTH_THROTTLE_IP_RATE', default='300/min'),
+    'auth_identity': config('AUTH_THROTTLE_IDENTITY_RATE', default='10/min'),
+}
+# Password hashes allowed to run at once per worker process; keep it below
+# the gunicorn --threads count so some threads always serve other requests
+AUTH_HASHING_CONCURRENCY = config('AUTH_HASHING_CONCURRENCY', default=2, cast=int)
+AUTH_HASHING_QUEUE_TIMEOUT = config('AUTH_HASHING_QUEUE_TIMEOUT', default=2.0, cast=float)
+AUTH_BUSY_RETRY_AFTER = config('AUTH_BUSY_RETRY_AFTER', default=2, cast=int)
+
 # JWT settings
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(hours=config('JWT_ACCESS_TOKEN_LIFETIME_HOURS', default=5, cast=int)),
@@ -181,6 +265,27 @@ SIMPLE_JWT = {
 
 AUTH_USER_MODEL = 'core.User'
 
+# Frontend base URL, used for links in outgoing emails
+FRONTEND_URL = config('FRONTEND_URL', default='http://localhost:3000')
+
+# Email
+# Emails are queued in the EmailOutbox table and delivered by
+# `python manage.py send_outbox`, never from inside a request.
+EMAIL_BACKEND = config('EMAIL_BACKEND', default='django.core.mail.backends.smtp.EmailBackend')
+EMAIL_HOST = config('EMAIL_HOST', default='localhost')
+EMAIL_PORT = config('EMAIL_PORT', default=25, cast=int)
+EMAIL_HOST_USER = config('EMAIL_HOST_USER', default='')
+EMAIL_HOST_PASSWORD = config('EMAIL_HOST_PASSWORD', default='')
+EMAIL_USE_TLS = config('EMAIL_USE_TLS', default=False, cast=bool)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=30, cast=int)
+DEFAULT_FROM_EMAIL = config('DEFAULT_FROM_EMAIL', default='Medicare Hospital <noreply@medicare.com>')
+EMAIL_OUTBOX_BATCH_SIZE = config('EMAIL_OUTBOX_BATCH_SIZE', default=50, cast=int)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config('EMAIL_OUTBOX_MAX_ATTEMPTS', default=6, cast=int)
+EMAIL_OUTBOX_BACKOFF_BASE = config('EMAIL_OUTBOX_BACKOFF_BASE', default=30, cast=int)  # seconds
+EMAIL_OUTBOX_MAX_BACKOFF = config('EMAIL_OUTBOX_MAX_BACKOFF', default=3600, cast=int)  # seconds
+# How long a worker holds a claimed batch; must outlast sending it (batch size x EMAIL_TIMEOUT at worst)
+EMAIL_OUTBOX_LEASE = config('EMAIL_OUTBOX_LEASE', default=1800, cast=int)  # seconds
+
 # Security Settings for Production
 if not DEBUG:
     # HTTPS Settings
@@ -206,12 +311,21 @@ LOGGING = {
             'format': '{levelname} {asctime} {module} {message}',
             'style': '{',
         },
+        'json': {
+            # core.performance messages are already JSON objects
+            'format': '{message}',
+            'style': '{',
+        },
     },
     'handlers': {
         'console': {
             'class': 'logging.StreamHandler',
             'formatter': 'verbose',
         },
+        'performance': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
     },
     'root': {
         'handlers': ['console'],
@@ -223,6 +337,34 @@ LOGGING = {
             'level': config('LOG_LEVEL', default='INFO'),
             'propagate': False,
         },
+        'core.performance': {
+            'handlers': ['performance'],
+            'level': config('PERF_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
     },
 }
 
+# Request instrumentation (see core/middleware.py)
+# Server-Timing tells anyone, logged in or not, how long the database took: development only by default
+PERF_SERVER_TIMING = config('PERF_SERVER_TIMING', default=DEBUG, cast=bool)
+PERF_SLOW_REQUEST_MS = config('PERF_SLOW_REQUEST_MS', default=500, cast=int)
+PERF_SLOW_SQL_LIMIT = config('PERF_SLOW_SQL_LIMIT', default=100, cast=int)
+
+# Per-view request metrics shared across workers (see core/metrics.py)
+METRICS_ENABLED = config('METRICS_ENABLED', default=True, cast=bool)
+METRICS_DIR = config('METRICS_DIR', default=str(Path(tempfile.gettempdir()) / 'medicare-metrics'))
+# Bearer token for the Prometheus scraper; without one /api/metrics is only open when DEBUG is on
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+
+# On-demand request profiling (see core/profiling.py)
+PROFILE_DIR = config('PROFILE_DIR', default=str(BASE_DIR / 'logs' / 'profiles'))
+PROFILE_INTERVAL_MS = config('PROFILE_INTERVAL_MS', default=1, cast=float)
+PROFILE_TOKEN_MAX_AGE = config('PROFILE_TOKEN_MAX_AGE', default=900, cast=int)  # seconds
+PROFILE_KEEP = config('PROFILE_KEEP', default=200, cast=int)
+
+# Per-view query budgets (see core/budget.py): raise over the query count (tests turn
+# this on), otherwise log a sample of the offending requests
+QUERY_BUDGET_RAISE = config('QUERY_BUDGET_RAISE', default=False, cast=bool)
+QUERY_BUDGET_DB_MS = config('QUERY_BUDGET_DB_MS', default=200, cast=int)
+QUERY_BUDGET_SAMPLE_RATE = config('QUERY_BUDGET_SAMPLE_RATE', default=0.1, cast=float)
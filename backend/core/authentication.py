@@ -0,0 +1,102 @@
+"""
+Stateless JWT authentication.
+
+`login_view` puts the user's role, name and verification state into the token
+(see `add_user_claims`). With JWT_STATELESS_AUTH enabled, requests are then
+authenticated from those claims alone: `request.user` is a ClaimsUser and no
+User row is loaded. Views that need more than id/role/name (e.g. profile_view)
+fetch the row explicitly with `db_user`.
+
+Tokens of deactivated or deleted users are rejected through a revocation
+marker kept in the cache, checked at most once every
+JWT_REVOCATION_CHECK_TTL seconds per user and process. The cache must be
+shared between the workers (system check core.E001).
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+
+from .models import User
+
+CLAIMS = ('role', 'name', 'is_verified')
+
+# user id -> (checked at, revoked at) for the short-TTL revocation check
+_revocation_memo = {}
+
+
+def add_user_claims(token, user):
+    """Copy the fields views authorize on into a (refresh) token"""
+    token['role'] = user.role
+    token['name'] = user.get_full_name()
+    token['is_verified'] = user.is_verified
+    token['username'] = user.username
+    return token
+
+
+def _revocation_key(user_id):
+    return f'jwt-revoked:{user_id}'
+
+
+def revoke_user_tokens(user_id):
+    """Reject every token issued to this user before the current second"""
+    lifetime = api_settings.ACCESS_TOKEN_LIFETIME.total_seconds()
+    # Whole seconds like `iat`, so a login in the same second (e.g. right after a role change) is accepted
+    cache.set(_revocation_key(user_id), int(time.time()), int(lifetime) + 60)
+    _revocation_memo.pop(user_id, None)
+
+
+def _revoked_at(user_id):
+    now = time.monotonic()
+    memo = _revocation_memo.get(user_id)
+    if memo and now - memo[0] < settings.JWT_REVOCATION_CHECK_TTL:
+        return memo[1]
+    revoked_at = cache.get(_revocation_key(user_id))
+    _revocation_memo[user_id] = (now, revoked_at)
+    return revoked_at
+
+
+class ClaimsUser(TokenUser):
+    """request.user built from token claims; unknown attributes read as None"""
+
+    @property
+    def role(self):
+        return self.token.get('role')
+
+    def get_full_name(self):
+        return self.token.get('name', '')
+
+
+def db_user(user):
+    """The User row behind request.user, loading it only if it is a ClaimsUser"""
+    if isinstance(user, User):
+        return user
+    return User.objects.get(pk=user.id)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that trusts the token's claims instead of loading the
+    User when JWT_STATELESS_AUTH is on; behaves exactly like the stock class
+    when it is off.
+    """
+
+    def get_user(self, validated_token):
+        if not settings.JWT_STATELESS_AUTH or any(claim not in validated_token for claim in CLAIMS):
+            # Disabled, or a token issued before the claims existed
+            return super().get_user(validated_token)
+
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise AuthenticationFailed('Token contained no recognizable user identification')
+
+        revoked_at = _revoked_at(user_id)
+        if revoked_at is not None and validated_token.get('iat', 0) < revoked_at:
+            raise AuthenticationFailed('Token has been revoked', code='token_revoked')
+
+        return ClaimsUser(validated_token)
@@ -0,0 +1,127 @@
+"""
+Free appointment slots from doctors' weekly working hours.
+
+Any number of doctors and days costs two queries: the DoctorSchedule rows and
+the booked (non-cancelled) appointments in the range, which use
+appt_doctor_date_idx. Bookings are turned into an interval index per doctor
+and day (sorted, merged minute ranges) so each candidate slot is a bisect
+rather than a scan of the day's appointments. Doctors without a schedule fall
+back to settings.DOCTOR_DEFAULT_SCHEDULE.
+"""
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_time
+
+from .models import Appointment, DoctorSchedule
+
+DEFAULT_SLOT_MINUTES = DoctorSchedule._meta.get_field('slot_minutes').default
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+# 'HH:MM' for every minute of the day, so formatting a slot is a list lookup
+LABELS = [f'{minute // 60:02d}:{minute % 60:02d}' for minute in range(24 * 60)]
+
+
+def default_blocks():
+    """settings.DOCTOR_DEFAULT_SCHEDULE as {weekday: [(start, end, slot)]} in minutes"""
+    blocks = defaultdict(list)
+    for weekday, start, end, slot in settings.DOCTOR_DEFAULT_SCHEDULE:
+        blocks[weekday].append((_minutes(parse_time(start)), _minutes(parse_time(end)), slot))
+    return blocks
+
+
+def weekly_blocks(doctor_ids):
+    """{doctor_id: {weekday: [(start, end, slot)]}}, sorted by start"""
+    templates = defaultdict(lambda: defaultdict(list))
+    rows = DoctorSchedule.objects.filter(doctor_id__in=doctor_ids).order_by('start_time').values_list(
+        'doctor_id', 'weekday', 'start_time', 'end_time', 'slot_minutes'
+    )
+    for doctor_id, weekday, start, end, slot in rows:
+        templates[doctor_id][weekday].append((_minutes(start), _minutes(end), slot))
+    fallback = default_blocks()
+    return {doctor_id: templates.get(doctor_id, fallback) for doctor_id in doctor_ids}
+
+
+def weekly_schedule(doctor_id):
+    """(is_default, [{weekday, start, end, slot_minutes}]) for the schedule endpoint"""
+    is_default = not DoctorSchedule.objects.filter(doctor_id=doctor_id).exists()
+    blocks = default_blocks() if is_default else weekly_blocks([doctor_id])[doctor_id]
+    return is_default, [{
+        'weekday': weekday,
+        'start': LABELS[start],
+        'end': LABELS[end],
+        'slot_minutes': slot
+    } for weekday, day_blocks in sorted(blocks.items()) for start, end, slot in day_blocks]
+
+
+def _duration(blocks, minute):
+    """Length of a booking starting at `minute`: the slot size of the block it falls in"""
+    for start, end, slot in blocks:
+        if start <= minute < end:
+            return slot
+    return DEFAULT_SLOT_MINUTES
+
+
+def busy_index(doctor_ids, start, end, templates):
+    """{(doctor_id, date): (starts, ends)} of merged booked intervals in minutes"""
+    intervals = defaultdict(list)
+    booked = Appointment.objects.filter(
+        doctor_id__in=doctor_ids, date__range=(start, end)
+    ).exclude(status='Cancelled').order_by().values_list('doctor_id', 'date', 'time')
+    for doctor_id, day, at in booked:
+        minute = _minutes(at)
+        blocks = templates[doctor_id].get(day.weekday(), ())
+        intervals[doctor_id, day].append((minute, minute + _duration(blocks, minute)))
+
+    index = {}
+    for key, ranges in intervals.items():
+        ranges.sort()
+        starts, ends = [], []
+        for lo, hi in ranges:
+            if ends and lo <= ends[-1]:
+                ends[-1] = max(ends[-1], hi)
+            else:
+                starts.append(lo)
+                ends.append(hi)
+        index[key] = (starts, ends)
+    return index
+
+
+def free_slots(doctor_ids, start, end, now=None):
+    """{doctor_id: {'YYYY-MM-DD': ['HH:MM', ...]}} of bookable slots between two dates (inclusive)"""
+    doctor_ids = list(doctor_ids)
+    now = timezone.localtime(now)
+    today, current_minute = now.date(), _minutes(now)
+    templates = weekly_blocks(doctor_ids)
+    index = busy_index(doctor_ids, start, end, templates)
+    no_bookings = ([], [])
+
+    result = {}
+    for doctor_id in doctor_ids:
+        days = {}
+        day = start
+        while day <= end:
+            if day >= today:
+                starts, ends = index.get((doctor_id, day), no_bookings)
+                earliest = current_minute if day == today else 0
+                slots = []
+                for block_start, block_end, slot in templates[doctor_id].get(day.weekday(), ()):
+                    minute = block_start
+                    while minute + slot <= block_end:
+                        # First booked interval ending after the slot starts
+                        i = bisect_right(ends, minute)
+                        if minute >= earliest and (i == len(starts) or starts[i] >= minute + slot):
+                            slots.append(LABELS[minute])
+                        minute += slot
+                if slots:
+                    days[day.isoformat()] = slots
+            day += timedelta(days=1)
+        result[doctor_id] = days
+    return result
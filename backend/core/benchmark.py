@@ -0,0 +1,237 @@
+"""
+Endpoint benchmarks for every route in core/urls.py (`benchmark_api`).
+
+Each scale gets its own throwaway database seeded by SyntheticDataGenerator,
+plus an admin, a patient login for one of the busiest doctor's patients,
+and a few notifications. Every GET route in ROUTES is then requested through
+the full middleware stack with the access token that role gets from
+login_view. For each route the suite records:
+
+* p50/p95/p99 wall time in ms, streamed bodies (exports) read to the end;
+* the number of queries, counted with an execute_wrapper as in
+  PerformanceMiddleware, so queries made while streaming count too;
+* the response status and size in bytes.
+
+The data is deterministic for a seed, so query counts and sizes are exact
+and only the timings are noisy. `compare` checks a run against a stored
+baseline:
+
+* a route regresses when its time grows by more than `threshold` (a ratio)
+  and by more than `min_delta_ms`. The absolute floor keeps sub-millisecond
+  routes from failing on noise;
+* a route also regresses when it makes more queries, its body grows by more
+  than `threshold`, or its status changes.
+
+Routes that only accept writes are listed in SKIPPED, not timed: repeating
+them would change the data the other routes read. A new route must go in
+one or the other, which the tests enforce.
+"""
+import logging
+import math
+import os
+import statistics
+import tempfile
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connection
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from . import profiling
+from .authentication import add_user_claims
+from .models import User, Patient, Appointment, MedicalRecord, Notification
+from .synthetic import SyntheticDataGenerator
+
+METRICS_TOKEN = 'benchmark'
+
+# label, URL name, role, URL kwargs from the seeded samples, query parameters
+ROUTES = [
+    ('profile', 'profile', 'admin', None, {}),
+    ('patient-list', 'patient-list', 'admin', None, {}),
+    ('patient-search', 'patient-search', 'admin', None, {'q': 'smith'}),
+    ('patient-detail', 'patient-detail', 'admin', lambda s: {'pk': s['patient']}, {}),
+    ('appointment-list', 'appointment-list', 'admin', None, {}),
+    ('appointment-detail', 'appointment-detail', 'admin', lambda s: {'pk': s['appointment']}, {}),
+    ('doctor-list', 'doctor-list', 'admin', None, {}),
+    ('department-slots', 'department-slots', 'patient', None, {}),
+    ('doctor-slots', 'doctor-slots', 'patient', lambda s: {'pk': s['doctor']}, {}),
+    ('doctor-schedule', 'doctor-schedule', 'doctor', lambda s: {'pk': s['doctor']}, {}),
+    ('medical-record-list', 'medical-record-list', 'admin', None, {}),
+    ('medical-record-search', 'medical-record-search', 'doctor', None, {'q': 'blood'}),
+    ('medical-record-detail', 'medical-record-detail', 'admin', lambda s: {'pk': s['record']}, {}),
+    ('doctor-patients', 'doctor-patients', 'doctor', None, {}),
+    ('doctor-patient-detail', 'doctor-patient-detail', 'doctor', lambda s: {'pk': s['patient']}, {}),
+    ('doctor-appointments', 'doctor-appointments', 'doctor', None, {}),
+    ('doctor-stats', 'doctor-stats', 'doctor', None, {}),
+    ('patient-dashboard', 'patient-dashboard', 'patient', None, {}),
+    ('admin-summary', 'admin-summary', 'admin', None, {}),
+    ('profile-list', 'profile-list', 'admin', None, {}),
+    ('profile-download', 'profile-download', 'admin', lambda s: {'name': s['profile']}, {}),
+    ('reports', 'reports', 'admin', None, {}),
+    ('export:patients', 'export', 'admin', lambda s: {'resource': 'patients'}, {}),
+    ('export:appointments', 'export', 'admin', lambda s: {'resource': 'appointments'}, {}),
+    ('export:medical-records', 'export', 'admin', lambda s: {'resource': 'medical-records'}, {}),
+    ('notifications-list', 'notifications-list', 'admin', None, {}),
+    ('metrics', 'metrics', None, None, {}),  # scraped with METRICS_TOKEN, not a JWT
+]
+
+SKIPPED = {
+    'login': 'POST only; password hashing is measured by benchmark_login',
+    'logout': 'POST only; blacklists the refresh token',
+    'patient-register': 'POST only; creates accounts',
+    'profile-token': 'POST only',
+    'import': 'POST only; writes rows',
+    'verify-patient': 'POST only; changes the patient',
+}
+
+
+def percentile(samples, q):
+    """Nearest-rank percentile of a sorted list"""
+    return samples[max(0, math.ceil(q / 100 * len(samples)) - 1)]
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def seed(scale, seed=42, log=None):
+    """Load synthetic data for `scale` into the current database; returns the counts and sample objects"""
+    counts = SyntheticDataGenerator(scale, seed=seed, log=log).generate()
+    admin = User.objects.create(username=f'bench{seed}_admin', email=f'bench{seed}.admin@medicare.com', role='admin')
+    # The first synthetic doctor is the busiest one
+    doctor = User.objects.filter(role='doctor', username__startswith=f'synth{seed}_').order_by('id').first()
+    patient = Patient.objects.filter(assigned_doctor=doctor).order_by('id').first()
+    patient_user = User.objects.create(
+        username=f'bench{seed}_patient', email=f'bench{seed}.patient@medicare.com', role='patient', is_verified=True,
+    )
+    Patient.objects.filter(pk=patient.pk).update(user=patient_user)
+    Notification.objects.bulk_create([
+        Notification(notification_type='general', title=f'Notice {i}', message='Benchmark notification', user=patient_user)
+        for i in range(20)
+    ])
+    appointment = Appointment.objects.filter(patient=patient).order_by('id').first() or Appointment.objects.order_by('id').first()
+    record = MedicalRecord.objects.filter(patient=patient).order_by('id').first() or MedicalRecord.objects.order_by('id').first()
+    return counts, {
+        'users': {'admin': admin, 'doctor': doctor, 'patient': patient_user},
+        'doctor': doctor.pk,
+        'patient': patient.pk,
+        'appointment': appointment.pk,
+        'record': record.pk,
+    }
+
+
+def _access_token(user):
+    # Exactly what login_view hands out, so stateless auth sees the same claims
+    return str(add_user_claims(RefreshToken.for_user(user), user).access_token)
+
+
+def measure(client, path, params, headers, repeat, warmup):
+    """Request `path` warmup + repeat times; returns the route's result"""
+    timings = []
+    for i in range(warmup + repeat):
+        counter = _QueryCounter()
+        with connection.execute_wrapper(counter):
+            started = time.perf_counter()
+            response = client.get(path, params, headers=headers)
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            elapsed = (time.perf_counter() - started) * 1000
+        response.close()
+        if i >= warmup:
+            timings.append(elapsed)
+    timings.sort()
+    return {
+        'path': path,
+        'status': response.status_code,
+        'samples': len(timings),
+        'p50_ms': round(percentile(timings, 50), 3),
+        'p95_ms': round(percentile(timings, 95), 3),
+        'p99_ms': round(percentile(timings, 99), 3),
+        'mean_ms': round(statistics.fmean(timings), 3),
+        'queries': counter.count,
+        'bytes': len(body),
+    }
+
+
+def run(samples, repeat=30, warmup=3, only=None, log=None):
+    """Time every route in ROUTES (or the labels in `only`) against the seeded data; returns {label: result}"""
+    log = log or (lambda message: None)
+    tokens = {role: _access_token(user) for role, user in samples['users'].items()}
+    results = {}
+    with ExitStack() as stack:
+        directory = stack.enter_context(tempfile.TemporaryDirectory())
+        # The server's own metrics and profiles are never touched
+        stack.enter_context(override_settings(
+            SECURE_SSL_REDIRECT=False,
+            ALLOWED_HOSTS=['testserver'],
+            METRICS_DIR=os.path.join(directory, 'metrics'),
+            METRICS_TOKEN=METRICS_TOKEN,
+            PROFILE_DIR=os.path.join(directory, 'profiles'),
+        ))
+        # One log line per request would drown the report
+        performance_log = logging.getLogger('core.performance')
+        stack.callback(performance_log.setLevel, performance_log.level)
+        performance_log.setLevel(logging.CRITICAL)
+        samples = dict(samples, profile=profiling.save(Counter({'benchmark;request': 1}), 'benchmark', 1))
+        client = Client()
+        for label, name, role, kwargs, params in ROUTES:
+            if only and label not in only:
+                continue
+            path = reverse(name, kwargs=kwargs(samples) if kwargs else None)
+            headers = {'Authorization': f'Bearer {tokens[role] if role else METRICS_TOKEN}'}
+            results[label] = measure(client, path, params, headers, repeat, warmup)
+            result = results[label]
+            log(f"  {label:<24} {result['status']}  p50 {result['p50_ms']:8.2f}  p95 {result['p95_ms']:8.2f}  "
+                f"p99 {result['p99_ms']:8.2f} ms  {result['queries']:3} queries  {result['bytes']:>10,} bytes")
+    return results
+
+
+def compare(baseline, current, threshold=1.25, min_delta_ms=2.0, metric='p95_ms'):
+    """
+    Regressions of `current` against `baseline` (both as written by
+    benchmark_api), as (scale, label, reason). Scales and routes missing from
+    either side are not compared.
+    """
+    regressions = []
+    for scale, run_results in current['scales'].items():
+        old_routes = baseline['scales'].get(scale, {}).get('routes', {})
+        for label, new in run_results['routes'].items():
+            old = old_routes.get(label)
+            if old is None:
+                continue
+            if new['status'] != old['status']:
+                regressions.append((scale, label, f"status {old['status']} -> {new['status']}"))
+            if new['queries'] > old['queries']:
+                regressions.append((scale, label, f"queries {old['queries']} -> {new['queries']}"))
+            if new['bytes'] > old['bytes'] * threshold:
+                regressions.append((scale, label, f"bytes {old['bytes']:,} -> {new['bytes']:,}"))
+            if new[metric] > old[metric] * threshold and new[metric] - old[metric] > min_delta_ms:
+                regressions.append((scale, label, f'{metric} {old[metric]:.2f} -> {new[metric]:.2f}'))
+    return regressions
+
+
+def scale_key(scale):
+    return f'{scale:g}'
+
+
+def describe_run(repeat, warmup, seed):
+    """The header of a results file"""
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'database': connection.vendor,
+        'debug': settings.DEBUG,
+        'repeat': repeat,
+        'warmup': warmup,
+        'seed': seed,
+        'skipped': SKIPPED,
+        'scales': {},
+    }
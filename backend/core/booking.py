@@ -0,0 +1,74 @@
+"""
+Concurrency-safe appointment booking.
+
+The appt_unique_active_slot constraint makes a double booking impossible at
+the database level. The booking path also serializes requests for the same
+slot so the loser gets a clean SlotTaken (409) instead of an IntegrityError
+half way through its transaction. No table locks are taken:
+
+* PostgreSQL: a transaction-scoped advisory lock keyed by (doctor, slot), so
+  only requests for the very same slot wait on each other.
+* Other databases: SELECT ... FOR UPDATE on the doctor's user row, which
+  serializes bookings per doctor. SQLite ignores FOR UPDATE and fails fast on
+  contended writes, so bookings in one process also take a striped
+  per-doctor lock until the transaction commits; across processes the
+  constraint still has the final say.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db import IntegrityError, connection, transaction
+
+from .models import User, Appointment
+
+ACTIVE_SLOT_CONSTRAINT = 'appt_unique_active_slot'
+# SQLite's wording for the same constraint
+ACTIVE_SLOT_COLUMNS = 'core_appointment.doctor_id, core_appointment.date, core_appointment.time'
+
+_doctor_locks = [threading.Lock() for _ in range(64)]
+
+
+class SlotTaken(Exception):
+    """The doctor already has an active appointment at that date and time"""
+
+
+@contextmanager
+def slot_lock(doctor_id, day, at):
+    """A transaction that holds the booking lock for one doctor slot"""
+    if connection.vendor == 'postgresql':
+        slot = day.toordinal() * 1440 + at.hour * 60 + at.minute
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Two int4 keys: the doctor and the slot, folded into int4 range
+                cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [doctor_id, slot % 2**31 - 2**30])
+            yield
+        return
+
+    with _doctor_locks[int(doctor_id) % len(_doctor_locks)], transaction.atomic():
+        list(User.objects.select_for_update().filter(pk=doctor_id).values_list('pk'))
+        yield
+
+
+def slot_is_taken(doctor_id, day, at, exclude_id=None):
+    booked = Appointment.objects.filter(doctor_id=doctor_id, date=day, time=at).exclude(status='Cancelled')
+    if exclude_id:
+        booked = booked.exclude(pk=exclude_id)
+    return booked.exists()
+
+
+def is_slot_conflict(error):
+    return ACTIVE_SLOT_CONSTRAINT in str(error) or ACTIVE_SLOT_COLUMNS in str(error)
+
+
+def book_appointment(patient_id, doctor_id, day, at, **fields):
+    """Create an appointment, or raise SlotTaken if the slot is already booked"""
+    with slot_lock(doctor_id, day, at):
+        if slot_is_taken(doctor_id, day, at):
+            raise SlotTaken()
+        try:
+            with transaction.atomic():
+                return Appointment.objects.create(patient_id=patient_id, doctor_id=doctor_id, date=day, time=at, **fields)
+        except IntegrityError as e:
+            if is_slot_conflict(e):
+                raise SlotTaken()
+            raise
@@ -0,0 +1,131 @@
+"""
+Query budgets for the read views.
+
+    @api_view(['GET'])
+    @permission_classes([IsAuthenticated])
+    @query_budget(4)
+    def doctor_stats(request): ...
+
+declares that a GET of the view makes at most 4 queries and spends at most
+QUERY_BUDGET_DB_MS (or `db_ms`) in the database. A budget is a constant, so
+a view whose query count grows with the data (an N+1 loop over a page of
+rows) breaks it as soon as there is more than a handful of rows.
+
+* With QUERY_BUDGET_RAISE on (the API tests turn it on), going over the
+  query count raises QueryBudgetExceeded listing the statements the view
+  ran, repeated ones first, so the test that hit it fails. Database time is
+  not enforced there: it depends on the machine running the tests, so it
+  would only make them flaky.
+* Otherwise a QUERY_BUDGET_SAMPLE_RATE sample of the requests over either
+  budget is logged as a WARNING on `core.performance`. The line holds the fingerprint
+  of every statement run more than once: the SQL with its literals and IN
+  lists folded. Like the slow-request log it never holds parameters.
+
+Only queries made by the thread running the view count, so a connection
+shared between threads (the live test server's) does not mix requests up.
+Streaming responses are budgeted up to the first byte.
+"""
+import json
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger('core.performance')
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r'\b\d+(?:\.\d+)?\b')
+_LIST = re.compile(r'\((?:\s*(?:\?|%s)\s*,)+\s*(?:\?|%s)\s*\)')
+_SPACE = re.compile(r'\s+')
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def fingerprint(sql):
+    """The statement with literals replaced by ? and IN lists folded, so repeats of one query match"""
+    sql = _STRING.sub('?', sql)
+    sql = _NUMBER.sub('?', sql)
+    sql = _LIST.sub('(...)', sql)
+    return _SPACE.sub(' ', sql).strip()
+
+
+class _Recorder:
+    def __init__(self):
+        self.thread = threading.get_ident()
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if threading.get_ident() != self.thread:
+            return execute(sql, params, many, context)
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.seconds += time.perf_counter() - started
+            self.statements.append(sql)
+
+
+def _raise(view_name, recorder, queries):
+    counts = Counter(fingerprint(sql) for sql in recorder.statements)
+    lines = [f'{view_name} made {len(recorder.statements)} queries (budget {queries}):']
+    first = {}
+    for sql in recorder.statements:
+        first.setdefault(fingerprint(sql), sql)
+    for shape, count in counts.most_common():
+        lines.append(f'  {count}x {first[shape]}')
+    raise QueryBudgetExceeded('\n'.join(lines))
+
+
+def _log(view_name, recorder, queries, db_ms):
+    if random.random() >= settings.QUERY_BUDGET_SAMPLE_RATE:
+        return
+    counts = Counter(fingerprint(sql) for sql in recorder.statements)
+    logger.warning(json.dumps({
+        'view': view_name,
+        'over_budget': True,
+        'queries': len(recorder.statements),
+        'query_budget': queries,
+        'db_ms': round(recorder.seconds * 1000, 1),
+        'db_ms_budget': db_ms,
+        'duplicates': [{'count': count, 'sql': shape} for shape, count in counts.most_common() if count > 1],
+    }))
+
+
+def query_budget(queries, db_ms=None, methods=('GET', 'HEAD')):
+    """
+    Budget a function view's `methods` requests to `queries` queries and
+    `db_ms` of database time (default QUERY_BUDGET_DB_MS). Goes under
+    @permission_classes, above @conditional so its query counts too.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return view(request, *args, **kwargs)
+
+            recorder = _Recorder()
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(recorder))
+                response = view(request, *args, **kwargs)
+            over_queries = len(recorder.statements) > queries
+            if settings.QUERY_BUDGET_RAISE:
+                if over_queries:
+                    _raise(view.__name__, recorder, queries)
+                return response
+            limit = settings.QUERY_BUDGET_DB_MS if db_ms is None else db_ms
+            if over_queries or recorder.seconds * 1000 > limit:
+                _log(view.__name__, recorder, queries, limit)
+            return response
+        return wrapper
+    return decorator
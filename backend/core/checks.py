@@ -0,0 +1,41 @@
+"""
+System checks for settings that only hold across several worker processes
+when the cache is shared between them.
+"""
+from django.conf import settings
+from django.core import checks
+
+# Every process has its own copy, so what one worker writes the others never see
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache():
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+@checks.register(checks.Tags.security)
+def stateless_auth_needs_shared_cache(app_configs, **kwargs):
+    if settings.JWT_STATELESS_AUTH and not shared_cache():
+        return [checks.Error(
+            'JWT_STATELESS_AUTH needs a shared cache: revocation markers in a per-process cache '
+            'are only seen by the worker that wrote them, so the others keep accepting revoked tokens.',
+            hint='Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached, or add core.E001 to '
+                 'SILENCED_SYSTEM_CHECKS if the server runs a single process.',
+            id='core.E001',
+        )]
+    return []
+
+
+@checks.register(checks.Tags.security, deploy=True)
+def throttles_need_shared_cache(app_configs, **kwargs):
+    if any(settings.AUTH_THROTTLE_RATES.values()) and not shared_cache():
+        return [checks.Warning(
+            'The login throttles count in a per-process cache, so each worker allows the full '
+            'AUTH_THROTTLE_RATES and the real limit grows with the number of workers.',
+            hint='Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached.',
+            id='core.W001',
+        )]
+    return []
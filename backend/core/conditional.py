@@ -0,0 +1,97 @@
+"""
+Conditional GET for the read endpoints: ETag / Last-Modified, answered with
+304 Not Modified when the client's copy is still current.
+
+The validators never look at the response body. They come from the newest
+change in the tables a response is built from: the newest updated_at, plus
+the newest tombstone so deletes count too. Each table costs one indexed
+lookup, and all of them run in a single query. A dashboard poll that finds
+nothing new costs that one query and no serialization.
+
+updated_at is set when a row is saved, but the row only becomes visible when
+its transaction commits. A change still inside that window could commit
+without moving the newest updated_at past the one a client already holds.
+So no validators are sent until the newest change is SYNC_OVERLAP_SECONDS
+old. The same delay keeps Last-Modified's one-second resolution safe.
+
+Responses are `Cache-Control: private, no-cache` and vary on Authorization.
+The browser keeps the body and revalidates it on every request, which the
+frontend gets without any code of its own.
+"""
+import hashlib
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db.models import Subquery
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .models import User, Tombstone
+
+
+def _newest(queryset, field):
+    return Subquery(queryset.order_by(f'-{field}').values(field)[:1])
+
+
+def last_change(anchor_id, sources):
+    """
+    Newest change across `sources` in one query, or None when a queryset
+    source matched no row. A model counts its rows and its tombstones; a
+    queryset (e.g. one row for a detail view) counts its rows only.
+    """
+    annotations, required = {}, []
+    for i, source in enumerate(sources):
+        if isinstance(source, type):
+            annotations[f'rows{i}'] = _newest(source.objects.all(), 'updated_at')
+            annotations[f'deleted{i}'] = _newest(Tombstone.objects.filter(model=source._meta.label_lower), 'deleted_at')
+        else:
+            annotations[f'rows{i}'] = _newest(source, 'updated_at')
+            required.append(f'rows{i}')
+    # The subqueries are hung off the requesting user's row, as in stats.py
+    newest = User.objects.filter(pk=anchor_id).annotate(**annotations).values(*annotations).first()
+    if newest is None or any(newest[name] is None for name in required):
+        return None
+    return max((value for value in newest.values() if value is not None), default=None)
+
+
+def conditional(*sources, roles=None):
+    """
+    Add ETag/Last-Modified to a function view's GET responses and answer
+    matching If-None-Match/If-Modified-Since with 304. Goes under @api_view, so
+    the client is authenticated first.
+
+    `sources` are models, or functions (request, *args, **kwargs) returning a
+    queryset for views of a single row. A view that only serves some roles
+    must list them in `roles`: the 304 is answered before the view runs, so
+    its own role check would otherwise be skipped. Other roles go straight to
+    the view (and its 403) without validators.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD') or (roles and request.user.role not in roles):
+                return view(request, *args, **kwargs)
+
+            resolved = [source if isinstance(source, type) else source(request, *args, **kwargs) for source in sources]
+            changed = last_change(request.user.id, resolved)
+            if changed is None or changed > timezone.now() - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS):
+                return view(request, *args, **kwargs)
+
+            # Weak: list bodies carry a fresh `since` token each time, the data is what matches
+            key = f'{request.get_full_path()}|{request.user.id}|{changed.isoformat()}'
+            etag = f'W/"{hashlib.md5(key.encode()).hexdigest()}"'
+            last_modified = int(changed.timestamp())
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+            response.headers['ETag'] = etag
+            response.headers['Last-Modified'] = http_date(last_modified)
+            patch_cache_control(response, private=True, no_cache=True)
+            patch_vary_headers(response, ['Authorization'])
+            return response
+        return wrapper
+    return decorator
@@ -0,0 +1,142 @@
+"""
+Streaming bulk export of patients, appointments and medical records.
+
+Rows are read with values_list(...).iterator(chunk_size) — no model instances,
+related names joined in the same query — and encoded as NDJSON or CSV one
+buffer at a time, optionally gzip-compressed on the fly. Memory use depends on
+EXPORT_CHUNK_SIZE, not on how many rows are exported. Used by the
+/api/export/<resource>/ endpoint and the `export_data` management command.
+"""
+import csv
+import io
+import json
+import zlib
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import Patient, Appointment, MedicalRecord
+
+# resource -> (queryset factory, [(column, lookup)])
+RESOURCES = {
+    'patients': (
+        lambda: Patient.objects.all(),
+        [
+            ('id', 'id'),
+            ('name', 'name'),
+            ('email', 'email'),
+            ('phone', 'phone'),
+            ('age', 'age'),
+            ('gender', 'gender'),
+            ('condition', 'condition'),
+            ('status', 'status'),
+            ('assigned_doctor_id', 'assigned_doctor_id'),
+            ('assigned_doctor_email', 'assigned_doctor__email'),
+            ('created_at', 'created_at'),
+        ],
+    ),
+    'appointments': (
+        lambda: Appointment.objects.all(),
+        [
+            ('id', 'id'),
+            ('patient_id', 'patient_id'),
+            ('patient_email', 'patient__email'),
+            ('doctor_id', 'doctor_id'),
+            ('doctor_email', 'doctor__email'),
+            ('date', 'date'),
+            ('time', 'time'),
+            ('type', 'type'),
+            ('status', 'status'),
+            ('notes', 'notes'),
+            ('created_at', 'created_at'),
+        ],
+    ),
+    'medical-records': (
+        lambda: MedicalRecord.objects.all(),
+        [
+            ('id', 'id'),
+            ('patient_id', 'patient_id'),
+            ('patient_email', 'patient__email'),
+            ('doctor_id', 'doctor_id'),
+            ('doctor_email', 'doctor__email'),
+            ('record_type', 'record_type'),
+            ('description', 'description'),
+            ('status', 'status'),
+            ('created_at', 'created_at'),
+        ],
+    ),
+}
+
+FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def parse_since(value):
+    """An aware datetime for a `since` bound (naive means the current time zone), or None if it is not a valid one"""
+    try:
+        since = parse_datetime(value)
+    except ValueError:
+        # Well formed but impossible, e.g. 2024-02-30T00:00
+        return None
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    return since
+
+
+def export_rows(resource, since=None):
+    """Yield one tuple per row, ordered by id; `since` limits to rows changed at or after it"""
+    queryset_factory, columns = RESOURCES[resource]
+    queryset = queryset_factory()
+    if since is not None:
+        queryset = queryset.filter(updated_at__gte=since)
+    return queryset.order_by('id').values_list(*[lookup for _, lookup in columns]).iterator(
+        chunk_size=settings.EXPORT_CHUNK_SIZE
+    )
+
+
+def _encode_ndjson(columns, rows):
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(dict(zip(columns, row))) + '\n'
+
+
+def _encode_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def stream_export(resource, output_format='ndjson', since=None, compress=False):
+    """Yield the encoded export as bytes chunks of roughly EXPORT_BUFFER_BYTES"""
+    columns = [column for column, _ in RESOURCES[resource][1]]
+    encode = _encode_ndjson if output_format == 'ndjson' else _encode_csv
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip container
+    buffer_size = settings.EXPORT_BUFFER_BYTES
+
+    pending, size = [], 0
+    for text in encode(columns, export_rows(resource, since)):
+        pending.append(text)
+        size += len(text)
+        if size >= buffer_size:
+            chunk = ''.join(pending).encode()
+            pending, size = [], 0
+            if compressor:
+                chunk = compressor.compress(chunk)
+            if chunk:
+                yield chunk
+
+    chunk = ''.join(pending).encode()
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
@@ -0,0 +1,188 @@
+"""
+Query-parameter filtering, sorting and facet counts for the list endpoints.
+
+    /api/appointments/?status=Scheduled,Confirmed&doctor=4&date_from=2025-01-01&sort=date&facets=status,type
+
+Multi-value filters accept repeated parameters or a comma-separated list.
+Facet counts honour every filter except the facet's own, so a status tab bar
+still shows the counts of the other statuses while one of them is selected.
+Each facet is a single GROUP BY query.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from rest_framework import status
+from rest_framework.exceptions import APIException
+
+from .models import Appointment, MedicalRecord
+from .pagination import APPOINTMENT_ORDERING, MEDICAL_RECORD_ORDERING, paginate
+
+
+class InvalidFilter(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = {'success': False, 'message': 'Invalid filter'}
+    default_code = 'invalid_filter'
+
+    def __init__(self, message):
+        super().__init__()
+        # Set directly: APIException would coerce the dict's values to strings
+        self.detail = {'success': False, 'message': message}
+
+
+def _values(params, name):
+    """All distinct values of a repeatable, comma-separated parameter, in order"""
+    # A repeated value would page its partition twice
+    return list(dict.fromkeys(value.strip() for raw in params.getlist(name) for value in raw.split(',') if value.strip()))
+
+
+class ListFilter:
+    """
+    Filters, sort orders and facets for one list endpoint.
+
+    `choices` maps a query parameter to a model field filtered with __in (and
+    validated against the field's choices when it has them), `ids` maps a
+    parameter to a foreign key column, and `sorts` maps the `sort` values to
+    keyset orderings for pagination.paginate. Several values of the
+    `partition_by` parameter are paged as one index scan per value, which
+    needs an index led by that field and followed by the sort columns.
+    """
+
+    def __init__(self, model, date_field, choices, ids, sorts, default_sort, partition_by=None):
+        self.model = model
+        self.date_field = date_field
+        self.choices = choices
+        self.ids = ids
+        self.sorts = sorts
+        self.default_sort = default_sort
+        self.partition_by = partition_by
+
+    def _choice_values(self, params, param):
+        values = _values(params, param)
+        field = self.model._meta.get_field(self.choices[param])
+        allowed = {key for key, _ in field.choices or ()}
+        invalid = [value for value in values if allowed and value not in allowed]
+        if invalid:
+            raise InvalidFilter(f'Invalid {param}: {", ".join(invalid)}')
+        return values
+
+    def _date_bounds(self, params):
+        bounds = []
+        for param in ('date_from', 'date_to'):
+            raw = params.get(param)
+            try:
+                day = parse_date(raw) if raw else None
+            except ValueError:
+                day = None
+            if raw and day is None:
+                raise InvalidFilter(f'{param} must be a date (YYYY-MM-DD)')
+            bounds.append(day)
+        return bounds
+
+    def _date_conditions(self, start, end):
+        """Range conditions on the date column, inclusive of both days"""
+        conditions = {}
+        is_datetime = self.model._meta.get_field(self.date_field).get_internal_type() == 'DateTimeField'
+        if start:
+            # Compare against day boundaries rather than __date so the index is usable
+            conditions[f'{self.date_field}__gte'] = (
+                timezone.make_aware(datetime.combine(start, time.min)) if is_datetime else start
+            )
+        if end:
+            if is_datetime:
+                conditions[f'{self.date_field}__lt'] = timezone.make_aware(
+                    datetime.combine(end + timedelta(days=1), time.min)
+                )
+            else:
+                conditions[f'{self.date_field}__lte'] = end
+        return conditions
+
+    def id_filters(self, params):
+        """{column: id} for the id parameters in use"""
+        conditions = {}
+        for param, column in self.ids.items():
+            raw = params.get(param)
+            if raw:
+                try:
+                    conditions[column] = int(raw)
+                except ValueError:
+                    raise InvalidFilter(f'{param} must be an id')
+        return conditions
+
+    def choice_filters(self, params):
+        """{param: [values]} for the multi-value parameters in use"""
+        selected = {}
+        for param in self.choices:
+            values = self._choice_values(params, param)
+            if values:
+                selected[param] = values
+        return selected
+
+    def apply(self, request, queryset):
+        """
+        Return (queryset, ordering, facets, selected) for the request. `facets`
+        is None unless the client asked for them with ?facets=, `selected` holds
+        the values of each multi-value filter in use.
+        """
+        params = request.query_params
+        conditions = self._date_conditions(*self._date_bounds(params))
+        conditions.update(self.id_filters(params))
+        selected = self.choice_filters(params)
+
+        sort = params.get('sort') or self.default_sort
+        if sort not in self.sorts:
+            raise InvalidFilter(f'sort must be one of {", ".join(self.sorts)}')
+
+        facet_names = _values(params, 'facets')
+        unknown = [name for name in facet_names if name not in self.choices]
+        if unknown:
+            raise InvalidFilter(f'Cannot facet on {", ".join(unknown)}')
+
+        base = queryset.filter(**conditions)
+        facets = None
+        if facet_names:
+            facets = {}
+            for name in facet_names:
+                field = self.choices[name]
+                counted = base
+                for other, values in selected.items():
+                    if other != name:
+                        counted = counted.filter(**{f'{self.choices[other]}__in': values})
+                facets[name] = dict(counted.order_by().values_list(field).annotate(n=Count('pk')))
+
+        for param, values in selected.items():
+            base = base.filter(**{f'{self.choices[param]}__in': values})
+        return base, self.sorts[sort], facets, selected
+
+    def paginate(self, request, queryset):
+        """Return (rows, pagination, facets) for a filtered, sorted list request"""
+        queryset, ordering, facets, selected = self.apply(request, queryset)
+        partitions = None
+        values = selected.get(self.partition_by, ())
+        if len(values) > 1:
+            field = self.choices[self.partition_by]
+            partitions = [Q(**{field: value}) for value in values]
+        rows, pagination = paginate(request, queryset, ordering, partitions)
+        return rows, pagination, facets
+
+
+APPOINTMENT_FILTER = ListFilter(
+    Appointment,
+    date_field='date',
+    choices={'status': 'status', 'type': 'type'},
+    ids={'doctor': 'doctor_id', 'patient': 'patient_id'},
+    sorts={'-date': APPOINTMENT_ORDERING, 'date': ('date', 'time', 'id')},
+    default_sort='-date',
+    partition_by='status',
+)
+
+MEDICAL_RECORD_FILTER = ListFilter(
+    MedicalRecord,
+    date_field='created_at',
+    choices={'status': 'status', 'record_type': 'record_type'},
+    ids={'doctor': 'doctor_id', 'patient': 'patient_id'},
+    sorts={'-created_at': MEDICAL_RECORD_ORDERING, 'created_at': ('created_at', 'id')},
+    default_sort='-created_at',
+    partition_by='record_type',
+)
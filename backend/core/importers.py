@@ -0,0 +1,276 @@
+"""
+Bulk import of patients and appointments from CSV or NDJSON.
+
+Rows are parsed and validated in a single streaming pass and inserted with
+bulk_create in batches of IMPORT_BATCH_SIZE, each batch in its own
+transaction. A bad row is reported with its line number and skipped; it never
+aborts the rest of the file. Memory is bounded by the batch size (plus at most
+IMPORT_MAX_REPORTED_ERRORS error entries), so a 1M row file is fine.
+
+Lookups are batched too: doctor emails are resolved from one dictionary built
+up front, patient emails with one query per batch.
+"""
+import codecs
+import csv
+import json
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.dateparse import parse_date, parse_time
+
+from .models import User, Patient, Appointment
+from .search import index_patients
+from .stats import invalidate_doctor_stats
+
+INPUT_FORMATS = ('csv', 'ndjson')
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.failed = 0
+        self.errors = []
+
+    def add_error(self, line, errors):
+        self.failed += 1
+        if len(self.errors) < settings.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'errors': errors})
+
+    def as_dict(self):
+        return {
+            'created': self.created,
+            'failed': self.failed,
+            'errors': sorted(self.errors, key=lambda error: error['line']),
+            'errors_truncated': self.failed > len(self.errors),
+        }
+
+
+def parse_rows(stream, input_format):
+    """Yield (line number, dict or None, parse error) for each record in a binary stream"""
+    # Uploaded files and the raw request both iterate as byte lines
+    text = codecs.iterdecode(stream, 'utf-8-sig', errors='replace')
+    if input_format == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, {k.strip(): (v or '').strip() for k, v in row.items() if k}, None
+        return
+
+    for line_no, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f'Invalid JSON: {e}'
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, 'Each line must be a JSON object'
+            continue
+        yield line_no, {k: '' if v is None else str(v).strip() for k, v in row.items()}, None
+
+
+def _choice(value, choices, default, field, errors):
+    if not value:
+        return default
+    valid = [choice for choice, _ in choices]
+    if value not in valid:
+        errors[field] = f'Must be one of: {", ".join(valid)}'
+    return value
+
+
+def _doctor_lookup():
+    return {
+        email.lower(): pk
+        for email, pk in User.objects.filter(role='doctor').values_list('email', 'pk')
+        if email
+    }
+
+
+class PatientImporter:
+    model = Patient
+    gender_choices = Patient._meta.get_field('gender').choices
+    status_choices = Patient._meta.get_field('status').choices
+
+    def __init__(self):
+        self.doctors = _doctor_lookup()
+
+    def build(self, row):
+        errors = {}
+        for field in ('name', 'email', 'phone'):
+            if not row.get(field):
+                errors[field] = 'This field is required'
+        age = None
+        if row.get('age'):
+            try:
+                age = int(row['age'])
+            except ValueError:
+                errors['age'] = 'Must be an integer'
+        doctor_id = None
+        doctor_email = row.get('assigned_doctor_email', '').lower()
+        if doctor_email:
+            doctor_id = self.doctors.get(doctor_email)
+            if doctor_id is None:
+                errors['assigned_doctor_email'] = 'No doctor with this email'
+        patient = Patient(
+            name=row.get('name', ''),
+            email=row.get('email', '').lower(),
+            phone=row.get('phone', ''),
+            age=age,
+            gender=_choice(row.get('gender'), self.gender_choices, 'Male', 'gender', errors),
+            condition=row.get('condition') or None,
+            assigned_doctor_id=doctor_id,
+            status=_choice(row.get('status'), self.status_choices, 'Active', 'status', errors),
+        )
+        return patient, errors
+
+    def check_batch(self, batch, result):
+        """Drop rows whose email is already taken, in the database or earlier in the batch"""
+        emails = [patient.email for _, patient in batch]
+        taken = set(Patient.objects.filter(email__in=emails).values_list('email', flat=True))
+        kept = []
+        for line, patient in batch:
+            if patient.email in taken:
+                result.add_error(line, {'email': 'A patient with this email already exists'})
+                continue
+            taken.add(patient.email)
+            kept.append((line, patient))
+        return kept
+
+    def doctor_ids(self, objects):
+        return {patient.assigned_doctor_id for patient in objects}
+
+    def bulk_inserted(self, objects):
+        # bulk_create sends no post_save, so the search index is updated here
+        index_patients(patient.pk for patient in objects)
+
+
+class AppointmentImporter:
+    model = Appointment
+    status_choices = Appointment.STATUS_CHOICES
+
+    def __init__(self):
+        self.doctors = _doctor_lookup()
+
+    def build(self, row):
+        errors = {}
+        doctor_id = self.doctors.get(row.get('doctor_email', '').lower())
+        if doctor_id is None:
+            errors['doctor_email'] = 'No doctor with this email'
+        if not row.get('patient_email'):
+            errors['patient_email'] = 'This field is required'
+        try:
+            day = parse_date(row.get('date', ''))
+        except ValueError:
+            day = None
+        if day is None:
+            errors['date'] = 'Must be a YYYY-MM-DD date'
+        try:
+            at = parse_time(row.get('time', ''))
+        except ValueError:
+            at = None
+        if at is None:
+            errors['time'] = 'Must be a HH:MM time'
+        appointment = Appointment(
+            doctor_id=doctor_id,
+            date=day,
+            time=at,
+            type=row.get('type') or 'Consultation',
+            status=_choice(row.get('status'), self.status_choices, 'Scheduled', 'status', errors),
+            notes=row.get('notes') or None,
+        )
+        # Resolved per batch in check_batch
+        appointment._patient_email = row.get('patient_email', '').lower()
+        return appointment, errors
+
+    def check_batch(self, batch, result):
+        emails = {appointment._patient_email for _, appointment in batch}
+        patients = dict(Patient.objects.filter(email__in=emails).values_list('email', 'pk'))
+        # Slots already booked, in the database or earlier in the batch (appt_unique_active_slot)
+        booked = set(Appointment.objects.filter(
+            doctor_id__in={appointment.doctor_id for _, appointment in batch},
+            date__in={appointment.date for _, appointment in batch},
+        ).exclude(status='Cancelled').order_by().values_list('doctor_id', 'date', 'time'))
+        kept = []
+        for line, appointment in batch:
+            appointment.patient_id = patients.get(appointment._patient_email)
+            if appointment.patient_id is None:
+                result.add_error(line, {'patient_email': 'No patient with this email'})
+                continue
+            if appointment.status != 'Cancelled':
+                slot = (appointment.doctor_id, appointment.date, appointment.time)
+                if slot in booked:
+                    result.add_error(line, {'time': 'The doctor already has an appointment at this time'})
+                    continue
+                booked.add(slot)
+            kept.append((line, appointment))
+        return kept
+
+    def doctor_ids(self, objects):
+        return {appointment.doctor_id for appointment in objects}
+
+    def bulk_inserted(self, objects):
+        pass
+
+
+IMPORTERS = {
+    'patients': PatientImporter,
+    'appointments': AppointmentImporter,
+}
+
+
+def _insert_batch(importer, batch, result):
+    batch = importer.check_batch(batch, result)
+    if not batch:
+        return set()
+    objects = [obj for _, obj in batch]
+    try:
+        with transaction.atomic():
+            importer.model.objects.bulk_create(objects)
+            importer.bulk_inserted(objects)
+        result.created += len(objects)
+        return importer.doctor_ids(objects)
+    except IntegrityError:
+        pass
+
+    # Something in the batch conflicts (e.g. a concurrent insert of the same
+    # email): insert row by row so only the offending rows are reported.
+    inserted = []
+    with transaction.atomic():
+        for line, obj in batch:
+            try:
+                with transaction.atomic():
+                    obj.pk = None
+                    obj.save(force_insert=True)
+                inserted.append(obj)
+            except IntegrityError as e:
+                result.add_error(line, {'row': str(e)})
+    result.created += len(inserted)
+    return importer.doctor_ids(inserted)
+
+
+def import_rows(resource, stream, input_format='csv', batch_size=None):
+    """Import a CSV/NDJSON binary stream; returns an ImportResult"""
+    importer = IMPORTERS[resource]()
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    result = ImportResult()
+    touched_doctors = set()
+
+    batch = []
+    for line, row, parse_error in parse_rows(stream, input_format):
+        if parse_error:
+            result.add_error(line, {'row': parse_error})
+            continue
+        obj, errors = importer.build(row)
+        if errors:
+            result.add_error(line, errors)
+            continue
+        batch.append((line, obj))
+        if len(batch) >= batch_size:
+            touched_doctors |= _insert_batch(importer, batch, result)
+            batch = []
+    if batch:
+        touched_doctors |= _insert_batch(importer, batch, result)
+
+    # bulk_create skips post_save, so refresh the dashboards it would have
+    invalidate_doctor_stats(*touched_doctors)
+    return result
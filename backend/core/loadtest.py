@@ -0,0 +1,285 @@
+"""
+Closed-loop load generator for the API (`loadtest`).
+
+Virtual users are asyncio tasks, each with its own keep-alive HTTP/1.1
+connection, written on asyncio streams so nothing beyond the standard
+library is needed. Every request picks a role by the MIX weights, then one
+of that role's actions:
+
+* doctors poll their stats and appointment list;
+* receptionists book appointments and page through the front-desk list
+  (admins stand in when there are no receptionist accounts);
+* admins load the dashboard summary and the patient list;
+* patients load their dashboard and look up a doctor's free slots.
+
+Tokens are minted from the database the server uses, exactly as login_view
+mints them. Load tests then measure the API itself, not password hashing
+or the login throttles. Bookings are real writes, so point the server at a
+throwaway database (e.g. one filled by `populate_all_data --scale`).
+
+The load runs in stages of increasing concurrency. Each stage reports
+throughput, latency percentiles and error rate, overall and per role and
+endpoint. `saturation` picks the stage after which more concurrency stops
+buying throughput: the worker configuration's capacity.
+"""
+import asyncio
+import json
+import math
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+from random import Random
+from urllib.parse import urlsplit
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .authentication import add_user_claims
+from .models import User, Patient
+
+# role: (share of requests, [(endpoint, method, path, weight)])
+MIX = {
+    'doctor': (40, [
+        ('doctor-stats', 'GET', '/doctor/stats/', 3),
+        ('doctor-appointments', 'GET', '/doctor/appointments/?page_size=20', 2),
+    ]),
+    'receptionist': (15, [
+        ('book-appointment', 'POST', '/appointments/', 1),
+        ('appointment-list', 'GET', '/appointments/?page_size=20', 2),
+    ]),
+    'admin': (10, [
+        ('admin-summary', 'GET', '/admin/summary/', 3),
+        ('patient-list', 'GET', '/patients/?page_size=20', 1),
+    ]),
+    'patient': (35, [
+        ('patient-dashboard', 'GET', '/patient/dashboard/', 3),
+        ('doctor-slots', 'GET', '/doctors/{doctor}/slots/', 1),
+    ]),
+}
+
+# A booking that loses the race for its slot is a correct answer, not an error
+EXPECTED_STATUSES = {'book-appointment': (200, 409)}
+
+_IDENTITIES = 50  # tokens minted per role
+
+
+class HTTPConnection:
+    """One keep-alive HTTP/1.1 connection on asyncio streams"""
+
+    def __init__(self, host, port, secure=False):
+        self.host, self.port, self.secure = host, port, secure
+        self.reader = self.writer = None
+
+    async def request(self, method, path, headers=None, body=None):
+        """(status, body bytes); a connection the server dropped while idle is reopened once"""
+        fresh = self.writer is None
+        if fresh:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port, ssl=self.secure or None)
+        try:
+            return await self._exchange(method, path, headers or {}, body)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            if fresh:
+                raise
+            return await self.request(method, path, headers, body)
+
+    async def _exchange(self, method, path, headers, body):
+        lines = [f'{method} {path} HTTP/1.1', f'Host: {self.host}:{self.port}', 'Connection: keep-alive']
+        lines += [f'{name}: {value}' for name, value in headers.items()]
+        if body is not None:
+            lines.append(f'Content-Length: {len(body)}')
+        self.writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + (body or b''))
+        await self.writer.drain()
+
+        status_line = await self.reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        response_headers = {}
+        while True:
+            line = await self.reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            response_headers[name.strip().lower()] = value.strip()
+
+        if response_headers.get('transfer-encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int((await self.reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunks.append(await self.reader.readexactly(size + 2))
+                if size == 0:
+                    break
+            content = b''.join(chunk[:-2] for chunk in chunks)
+        elif 'content-length' in response_headers:
+            content = await self.reader.readexactly(int(response_headers['content-length']))
+        elif method == 'HEAD' or status in (204, 304):
+            content = b''
+        else:
+            content = await self.reader.read()
+            response_headers['connection'] = 'close'
+
+        if response_headers.get('connection', '').lower() == 'close':
+            await self.close()
+        return status, content
+
+    async def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            try:
+                await self.writer.wait_closed()
+            except ConnectionError:
+                pass
+        self.reader = self.writer = None
+
+
+def _access_token(user):
+    return str(add_user_claims(RefreshToken.for_user(user), user).access_token)
+
+
+def prepare(mix=MIX, log=None):
+    """
+    Tokens per role and the ids requests are built from. Roles without
+    accounts are dropped from the mix, except receptionists, who fall back
+    to admins. Returns (mix, context).
+    """
+    log = log or (lambda message: None)
+    users = {
+        'doctor': User.objects.filter(role='doctor', is_active=True),
+        'receptionist': User.objects.filter(role='receptionist', is_active=True),
+        'admin': User.objects.filter(role='admin', is_active=True),
+        # The dashboard needs the patient profile behind the login
+        'patient': User.objects.filter(role='patient', is_active=True, is_verified=True, patient_profile__isnull=False),
+    }
+    tokens = {}
+    for role in mix:
+        accounts = list(users[role].order_by('id')[:_IDENTITIES])
+        if not accounts and role == 'receptionist':
+            log('No receptionist accounts; admins make the receptionist requests')
+            accounts = list(users['admin'].order_by('id')[:_IDENTITIES])
+        if not accounts:
+            log(f'No {role} accounts; {role} requests are left out of the mix')
+            continue
+        tokens[role] = [_access_token(user) for user in accounts]
+    mix = {role: entry for role, entry in mix.items() if role in tokens}
+    context = {
+        'tokens': tokens,
+        'doctors': list(users['doctor'].order_by('id').values_list('id', flat=True)[:1000]),
+        'patients': list(Patient.objects.order_by('id').values_list('id', flat=True)[:1000]),
+    }
+    return mix, context
+
+
+def _booking(rng, context):
+    day = date.today() + timedelta(days=rng.randrange(1, 90))
+    return {
+        'patient': rng.choice(context['patients']),
+        'doctor': rng.choice(context['doctors']),
+        'date': day.isoformat(),
+        'time': f'{rng.randrange(8, 18):02d}:{rng.choice((0, 15, 30, 45)):02d}',
+        'type': 'Consultation',
+    }
+
+
+def _percentile(samples, q):
+    return samples[max(0, math.ceil(q / 100 * len(samples)) - 1)]
+
+
+def _summary(samples, seconds):
+    """samples: [(status, ms, ok)]"""
+    latencies = sorted(ms for _, ms, _ in samples)
+    errors = sum(1 for _, _, ok in samples if not ok)
+    statuses = defaultdict(int)
+    for status, _, _ in samples:
+        statuses[str(status)] += 1
+    return {
+        'requests': len(samples),
+        'throughput': round(len(samples) / seconds, 1),
+        'p50_ms': round(_percentile(latencies, 50), 1) if samples else None,
+        'p95_ms': round(_percentile(latencies, 95), 1) if samples else None,
+        'p99_ms': round(_percentile(latencies, 99), 1) if samples else None,
+        'error_rate': round(errors / len(samples), 4) if samples else 0.0,
+        'statuses': dict(statuses),
+    }
+
+
+async def _virtual_user(connection, prefix, mix, context, rng, deadline, think, timeout, record):
+    roles, shares = list(mix), [share for share, _ in mix.values()]
+    while time.monotonic() < deadline:
+        role = rng.choices(roles, shares)[0]
+        actions = mix[role][1]
+        endpoint, method, path, _ = rng.choices(actions, [weight for *_, weight in actions])[0]
+        headers = {'Authorization': f"Bearer {rng.choice(context['tokens'][role])}", 'Accept': 'application/json'}
+        body = None
+        if method == 'POST':
+            body = json.dumps(_booking(rng, context)).encode()
+            headers['Content-Type'] = 'application/json'
+        if '{doctor}' in path:
+            path = path.format(doctor=rng.choice(context['doctors']))
+
+        started = time.perf_counter()
+        try:
+            status, _ = await asyncio.wait_for(connection.request(method, prefix + path, headers, body), timeout)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+            # Refused, reset, timed out or garbled: the next request reconnects
+            await connection.close()
+            status = 0
+        elapsed = (time.perf_counter() - started) * 1000
+        record(role, endpoint, status, elapsed, status in EXPECTED_STATUSES.get(endpoint, (200,)))
+        if think:
+            await asyncio.sleep(rng.expovariate(1 / think))
+
+
+async def run_stage(url, mix, context, concurrency, duration, think=0.0, timeout=30.0, seed=0):
+    """Run `concurrency` virtual users for `duration` seconds; returns the stage's report"""
+    parts = urlsplit(url)
+    secure = parts.scheme == 'https'
+    port = parts.port or (443 if secure else 80)
+    prefix = parts.path.rstrip('/')
+
+    samples = defaultdict(list)
+
+    def record(role, endpoint, status, ms, ok):
+        samples[role, endpoint].append((status, ms, ok))
+
+    connections = [HTTPConnection(parts.hostname, port, secure) for _ in range(concurrency)]
+    started = time.monotonic()
+    deadline = started + duration
+    try:
+        await asyncio.gather(*(
+            _virtual_user(connection, prefix, mix, context, Random(f'{seed}:{concurrency}:{i}'), deadline, think, timeout, record)
+            for i, connection in enumerate(connections)
+        ))
+    finally:
+        for connection in connections:
+            await connection.close()
+    # The last requests finish after the deadline
+    seconds = time.monotonic() - started
+
+    every = [sample for endpoint_samples in samples.values() for sample in endpoint_samples]
+    report = {'concurrency': concurrency, 'seconds': round(seconds, 2), **_summary(every, seconds)}
+    report['endpoints'] = {
+        f'{role} {endpoint}': _summary(endpoint_samples, seconds)
+        for (role, endpoint), endpoint_samples in sorted(samples.items())
+    }
+    return report
+
+
+def saturation(stages, gain=0.1):
+    """
+    Concurrency of the last stage that still raised throughput by more than
+    `gain` over the stage before it, or None if every stage did (the ramp
+    never reached saturation).
+    """
+    for previous, stage in zip(stages, stages[1:]):
+        if stage['throughput'] < previous['throughput'] * (1 + gain):
+            return previous['concurrency']
+    return None
+
+
+async def run_ramp(url, mix, context, levels, duration, think=0.0, timeout=30.0, seed=0, log=None):
+    """run_stage at each concurrency in `levels`; returns the stage reports"""
+    stages = []
+    for concurrency in levels:
+        stage = await run_stage(url, mix, context, concurrency, duration, think, timeout, seed)
+        stages.append(stage)
+        if log:
+            log(stage)
+    return stages
@@ -0,0 +1,90 @@
+"""
+Django management command to benchmark every API route at several data scales
+Run with: python manage.py benchmark_api --scales 0.1,1,10 --output benchmark-api.json
+          python manage.py benchmark_api --compare baseline.json            # fails on a regression
+          python manage.py benchmark_api --results new.json --compare baseline.json
+
+Each scale runs against its own throwaway test database, so your real data is
+never touched. See core/benchmark.py for what is measured and compared.
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from core import benchmark
+
+
+class Command(BaseCommand):
+    help = 'Times every route in core/urls.py at several data scales and compares the results with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', default='0.1,1', help='Comma-separated SyntheticDataGenerator scales')
+        parser.add_argument('--repeat', type=int, default=30, help='Timed requests per route')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per route first')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--routes', help='Comma-separated route labels to run (default: all)')
+        parser.add_argument('--output', help='Write the results to this JSON file')
+        parser.add_argument('--results', help='Compare this saved results file instead of running the suite')
+        parser.add_argument('--compare', metavar='BASELINE', help='Fail if a route regressed against this results file')
+        parser.add_argument('--threshold', type=float, default=1.25, help='Allowed ratio over the baseline')
+        parser.add_argument('--min-delta-ms', type=float, default=2.0, help='Ignore slowdowns smaller than this')
+        parser.add_argument('--metric', choices=['p50', 'p95', 'p99'], default='p95')
+
+    def handle(self, *args, **options):
+        if options['results']:
+            current = self.load(options['results'])
+        else:
+            current = self.run_suite(options)
+            if options['output']:
+                with open(options['output'], 'w') as handle:
+                    json.dump(current, handle, indent=2)
+                self.stdout.write(f"Results written to {options['output']}")
+
+        if options['compare']:
+            self.compare(self.load(options['compare']), current, options)
+
+    def load(self, path):
+        try:
+            with open(path) as handle:
+                return json.load(handle)
+        except (OSError, ValueError) as e:
+            raise CommandError(f'Cannot read {path}: {e}')
+
+    def run_suite(self, options):
+        try:
+            scales = [float(scale) for scale in options['scales'].split(',')]
+        except ValueError:
+            raise CommandError('--scales must be comma-separated numbers')
+        only = set(options['routes'].split(',')) if options['routes'] else None
+        if only:
+            unknown = only - {label for label, *_ in benchmark.ROUTES}
+            if unknown:
+                raise CommandError(f"Unknown routes: {', '.join(sorted(unknown))}")
+
+        results = benchmark.describe_run(options['repeat'], options['warmup'], options['seed'])
+        for scale in scales:
+            old_name = connection.settings_dict['NAME']
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                self.stdout.write(f'Scale {scale:g}: seeding...')
+                counts, samples = benchmark.seed(scale, seed=options['seed'])
+                self.stdout.write(f"Scale {scale:g}: {', '.join(f'{n:,} {name}' for name, n in counts.items())}")
+                routes = benchmark.run(samples, options['repeat'], options['warmup'], only, log=self.stdout.write)
+            finally:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+            results['scales'][benchmark.scale_key(scale)] = {'counts': counts, 'routes': routes}
+        return results
+
+    def compare(self, baseline, current, options):
+        metric = f"{options['metric']}_ms"
+        regressions = benchmark.compare(baseline, current, options['threshold'], options['min_delta_ms'], metric)
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(
+                f"No regressions against the baseline ({metric} x{options['threshold']:g}, "
+                f"+{options['min_delta_ms']:g} ms floor)"
+            ))
+            return
+        for scale, label, reason in regressions:
+            self.stdout.write(self.style.ERROR(f'  scale {scale}  {label:<24} {reason}'))
+        raise CommandError(f'{len(regressions)} regression(s) against the baseline')
@@ -0,0 +1,91 @@
+"""
+Django management command to stress-test concurrent appointment booking
+Run with: python manage.py benchmark_booking --url http://127.0.0.1:8000/api \\
+              --email admin@medicare.com --password admin123 --date 2030-01-07
+
+Start the server the way production does first (see Procfile). Every client
+races to book the same small set of slots for one doctor, so most requests
+must come back 409; afterwards the database is checked for double bookings.
+Run it against the same database the server uses.
+"""
+import json
+import statistics
+import threading
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from core.models import User, Patient, Appointment
+from core.management.commands.benchmark_login import _request
+
+
+class Command(BaseCommand):
+    help = 'Fires concurrent bookings for the same doctor slots and verifies none are double-booked'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api', help='API base URL')
+        parser.add_argument('--email', required=True, help='Admin or receptionist account')
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--date', required=True, help='Day to book (YYYY-MM-DD); use one with no appointments')
+        parser.add_argument('--doctor', type=int, help='Doctor id (default: the first doctor)')
+        parser.add_argument('--clients', type=int, default=32, help='Concurrent booking clients')
+        parser.add_argument('--requests', type=int, default=20, help='Bookings attempted per client')
+        parser.add_argument('--slots', type=int, default=16, help='Distinct 15-minute slots contended for')
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        status, body = _request(f'{base}/auth/login/', {'email': options['email'], 'password': options['password']})
+        if status != 200:
+            raise CommandError(f'Login failed with {status}: {body[:200]!r}')
+        token = json.loads(body)['data']['access']
+
+        doctor = User.objects.filter(role='doctor', **({'id': options['doctor']} if options['doctor'] else {})).order_by('id').first()
+        patient_ids = list(Patient.objects.order_by('id').values_list('id', flat=True)[:options['clients']])
+        if doctor is None or not patient_ids:
+            raise CommandError('Need at least one doctor and one patient (try populate_all_data)')
+        start = datetime(2000, 1, 1, 9, 0)
+        slots = [(start + timedelta(minutes=15 * i)).strftime('%H:%M') for i in range(options['slots'])]
+
+        results = []
+        lock = threading.Lock()
+
+        def client(n):
+            for i in range(options['requests']):
+                payload = {
+                    'patient': patient_ids[n % len(patient_ids)],
+                    'doctor': doctor.id,
+                    'date': options['date'],
+                    'time': slots[(n * 7 + i) % len(slots)],
+                }
+                started = time.perf_counter()
+                status, _ = _request(f'{base}/appointments/', payload, token=token)
+                with lock:
+                    results.append((status, (time.perf_counter() - started) * 1000))
+
+        threads = [threading.Thread(target=client, args=(n,)) for n in range(options['clients'])]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        statuses = {}
+        for status, _ in results:
+            statuses[status] = statuses.get(status, 0) + 1
+        latencies = sorted(ms for _, ms in results)
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        self.stdout.write(
+            f"{len(results)} bookings from {options['clients']} clients for {len(slots)} slots in {elapsed:.1f}s "
+            f"({len(results) / elapsed:.0f} req/s)"
+        )
+        self.stdout.write(f'  median {statistics.median(latencies):.1f} ms   p95 {p95:.1f} ms   statuses {statuses}')
+
+        doubles = Appointment.objects.filter(doctor=doctor, date=options['date']).exclude(
+            status='Cancelled'
+        ).values('time').annotate(n=Count('id')).filter(n__gt=1).count()
+        if doubles:
+            raise CommandError(f'{doubles} slots were double-booked')
+        self.stdout.write(self.style.SUCCESS(f'✅ No double bookings ({statuses.get(200, 0)} created)'))
@@ -0,0 +1,99 @@
+"""
+Django management command to benchmark the doctor dashboard counters
+Run with: python manage.py benchmark_doctor_stats --appointments 1000000
+
+Runs against a throwaway test database, so your real data is never touched.
+"""
+import statistics
+import time
+from datetime import date, time as dtime, timedelta
+from random import Random
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import override_settings
+
+from core.models import User, Patient, Appointment
+from core.stats import doctor_stats_counts
+
+
+class Command(BaseCommand):
+    help = 'Benchmarks doctor_stats (four COUNTs vs one aggregate vs cached) on a seeded test database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--appointments', type=int, default=1_000_000)
+        parser.add_argument('--doctors', type=int, default=50)
+        parser.add_argument('--patients', type=int, default=20_000)
+        parser.add_argument('--repeat', type=int, default=50)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+
+    def handle(self, *args, **options):
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            self.seed(options)
+            self.run(options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+    def seed(self, options):
+        rng = Random(42)
+        started = time.perf_counter()
+        doctors = User.objects.bulk_create([
+            User(username=f'bench_doctor_{i}', email=f'bench_doctor_{i}@medicare.com', role='doctor')
+            for i in range(options['doctors'])
+        ])
+        patients = Patient.objects.bulk_create([
+            Patient(name=f'Patient {i}', email=f'bench_patient_{i}@example.com', phone='555-0000',
+                    assigned_doctor=rng.choice(doctors))
+            for i in range(options['patients'])
+        ], batch_size=options['batch_size'])
+
+        statuses = [choice for choice, _ in Appointment.STATUS_CHOICES]
+        first_day = date.today() - timedelta(days=3 * 365)
+        remaining = options['appointments']
+        while remaining:
+            batch = min(remaining, options['batch_size'])
+            Appointment.objects.bulk_create([
+                Appointment(
+                    patient=rng.choice(patients),
+                    doctor=rng.choice(doctors),
+                    date=first_day + timedelta(days=rng.randrange(3 * 365 + 30)),
+                    time=dtime(rng.randrange(8, 18), rng.choice((0, 15, 30, 45))),
+                    status=rng.choice(statuses),
+                ) for _ in range(batch)
+            ])
+            remaining -= batch
+        self.doctor_id = doctors[0].id
+        self.stdout.write(
+            f"Seeded {options['appointments']:,} appointments in {time.perf_counter() - started:.1f}s"
+        )
+
+    def legacy(self):
+        today = date.today()
+        return (
+            Patient.objects.filter(assigned_doctor_id=self.doctor_id).count(),
+            Appointment.objects.filter(doctor_id=self.doctor_id).count(),
+            Appointment.objects.filter(doctor_id=self.doctor_id, date=today).count(),
+            Appointment.objects.filter(doctor_id=self.doctor_id, status='Pending').count(),
+        )
+
+    def timed(self, label, func, repeat):
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append((time.perf_counter() - started) * 1000)
+        samples.sort()
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        self.stdout.write(f'  {label:<28} median {statistics.median(samples):8.3f} ms   p95 {p95:8.3f} ms')
+
+    def run(self, repeat):
+        self.stdout.write(f'doctor_stats latency over {repeat} runs:')
+        self.timed('four COUNT queries', self.legacy, repeat)
+        with override_settings(DOCTOR_STATS_CACHE_TIMEOUT=0):
+            self.timed('single aggregate query', lambda: doctor_stats_counts(self.doctor_id), repeat)
+        with override_settings(DOCTOR_STATS_CACHE_TIMEOUT=60):
+            cache.clear()
+            self.timed('cached (warm)', lambda: doctor_stats_counts(self.doctor_id), repeat)
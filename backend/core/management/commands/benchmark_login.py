@@ -0,0 +1,100 @@
+"""
+Django management command to benchmark logins against concurrent read traffic
+Run with: python manage.py benchmark_login --url http://127.0.0.1:8000/api \\
+              --email doctor@medicare.com --password doctor123
+
+Start the server the way production does first, e.g.
+    gunicorn backend.wsgi --workers 3 --worker-class gthread --threads 4
+then compare read latency with and without the login storm (--logins 0).
+The email/password account is only used to get a token for the read traffic.
+"""
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _request(url, data=None, token=None):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f'Bearer {token}'
+    body = json.dumps(data).encode() if data is not None else None
+    request = urllib.request.Request(url, data=body, headers=headers)
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+
+class Command(BaseCommand):
+    help = 'Measures login throughput and read latency while both run concurrently against a live server'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api', help='API base URL')
+        parser.add_argument('--email', required=True)
+        parser.add_argument('--password', required=True)
+        parser.add_argument('--read-path', default='/doctor/stats/', help='Endpoint used for read traffic')
+        parser.add_argument('--logins', type=int, default=16, help='Concurrent login clients (unknown usernames)')
+        parser.add_argument('--readers', type=int, default=8, help='Concurrent read clients')
+        parser.add_argument('--duration', type=float, default=20.0, help='Seconds to run')
+
+    def handle(self, *args, **options):
+        base = options['url'].rstrip('/')
+        credentials = {'email': options['email'], 'password': options['password']}
+        status, body = _request(f'{base}/auth/login/', credentials)
+        if status != 200:
+            raise CommandError(f'Initial login failed with {status}: {body[:200]!r}')
+        token = json.loads(body)['data']['access']
+
+        results = {'login': [], 'read': []}
+        lock = threading.Lock()
+        deadline = time.monotonic() + options['duration']
+
+        def client(kind, index):
+            attempt = 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                if kind == 'login':
+                    # Distinct unknown usernames still cost a full password hash
+                    # (Django hashes anyway to hide which accounts exist) without
+                    # tripping the per-account throttle.
+                    attempt += 1
+                    status, _ = _request(
+                        f'{base}/auth/login/',
+                        {'username': f'storm_{index}_{attempt}', 'password': options['password']},
+                    )
+                else:
+                    status, _ = _request(f"{base}{options['read_path']}", token=token)
+                elapsed = (time.perf_counter() - started) * 1000
+                with lock:
+                    results[kind].append((status, elapsed))
+
+        threads = [threading.Thread(target=client, args=('login', i)) for i in range(options['logins'])]
+        threads += [threading.Thread(target=client, args=('read', i)) for i in range(options['readers'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.stdout.write(
+            f"{options['logins']} login clients, {options['readers']} read clients, {options['duration']:.0f}s"
+        )
+        for kind, samples in results.items():
+            if not samples:
+                continue
+            latencies = sorted(elapsed for _, elapsed in samples)
+            # A rejected password (401) is still a completed login attempt
+            ok = sum(1 for status, _ in samples if status in (200, 401))
+            statuses = {}
+            for status, _ in samples:
+                statuses[status] = statuses.get(status, 0) + 1
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+            self.stdout.write(
+                f'  {kind:<6} {ok / options["duration"]:8.1f} ok/s   '
+                f'median {statistics.median(latencies):8.1f} ms   p95 {p95:8.1f} ms   statuses {statuses}'
+            )
@@ -0,0 +1,55 @@
+"""
+Django management command to benchmark the request metrics hot path
+Run with: python manage.py benchmark_metrics --requests 200000
+
+Records synthetic requests into a throwaway METRICS_DIR, so the server's
+real metrics are never touched.
+"""
+import statistics
+import tempfile
+import time
+from random import Random
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from core import metrics
+
+
+class Command(BaseCommand):
+    help = 'Measures the cost of metrics.observe_request per request and of rendering /api/metrics'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200_000)
+        parser.add_argument('--views', type=int, default=40, help='Distinct view names (series per metric)')
+        parser.add_argument('--rounds', type=int, default=5)
+
+    def handle(self, *args, **options):
+        rng = Random(42)
+        views = [f'view-{i}' for i in range(options['views'])]
+        samples = [
+            (rng.choice(views), rng.choice(('GET', 'GET', 'GET', 'POST')), rng.choice((200, 200, 200, 304, 404)),
+             rng.expovariate(1 / 0.03), rng.expovariate(1 / 0.01), rng.randrange(1, 12))
+            for _ in range(10_000)
+        ]
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS_DIR=directory):
+            per_request = []
+            for _ in range(options['rounds']):
+                started = time.perf_counter()
+                for i in range(options['requests']):
+                    metrics.observe_request(*samples[i % len(samples)])
+                per_request.append((time.perf_counter() - started) / options['requests'] * 1e6)
+            self.stdout.write(
+                f"observe_request: median {statistics.median(per_request):.2f} µs/request "
+                f"(best {min(per_request):.2f}, {options['rounds']} rounds of {options['requests']:,})"
+            )
+
+            renders = []
+            for _ in range(20):
+                started = time.perf_counter()
+                text = metrics.render()
+                renders.append((time.perf_counter() - started) * 1000)
+            self.stdout.write(
+                f"render: median {statistics.median(renders):.2f} ms for {text.count(chr(10)):,} lines "
+                f"({len(views)} views)"
+            )
@@ -0,0 +1,45 @@
+"""
+Django management command to export patients, appointments or medical records
+Run with: python manage.py export_data appointments --format csv --gzip --output appointments.csv.gz
+          python manage.py export_data patients --since 2025-01-01T00:00:00Z > patients.ndjson
+
+Rows are streamed, so memory stays flat however large the table is.
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.export import RESOURCES, FORMATS, parse_since, stream_export
+
+
+class Command(BaseCommand):
+    help = 'Streams a full or incremental export of a resource as NDJSON or CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(RESOURCES))
+        parser.add_argument('--format', choices=list(FORMATS), default='ndjson')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip')
+        parser.add_argument('--since', help='Only rows changed at or after this ISO 8601 datetime')
+        parser.add_argument('--output', default='-', help='File to write (default: stdout)')
+
+    def handle(self, *args, **options):
+        since = None
+        if options['since']:
+            since = parse_since(options['since'])
+            if since is None:
+                raise CommandError('--since must be an ISO 8601 datetime')
+
+        chunks = stream_export(options['resource'], options['format'], since, options['gzip'])
+        if options['output'] == '-':
+            out = sys.stdout.buffer
+            for chunk in chunks:
+                out.write(chunk)
+            out.flush()
+            return
+
+        written = 0
+        with open(options['output'], 'wb') as out:
+            for chunk in chunks:
+                out.write(chunk)
+                written += len(chunk)
+        self.stderr.write(self.style.SUCCESS(f"✅ Exported {options['resource']} to {options['output']} ({written:,} bytes)"))
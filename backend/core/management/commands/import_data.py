@@ -0,0 +1,40 @@
+"""
+Django management command to bulk import patients or appointments
+Run with: python manage.py import_data patients patients.csv
+          python manage.py import_data appointments appointments.ndjson --batch-size 5000
+
+The file is streamed and inserted in batches; rows that fail validation are
+reported by line number and skipped.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core.importers import IMPORTERS, INPUT_FORMATS, import_rows
+
+
+class Command(BaseCommand):
+    help = 'Bulk imports patients or appointments from a CSV or NDJSON file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=list(IMPORTERS))
+        parser.add_argument('path', help='CSV or NDJSON file to import')
+        parser.add_argument('--format', choices=list(INPUT_FORMATS), help='Defaults to the file extension')
+        parser.add_argument('--batch-size', type=int, help='Rows per insert batch (default: IMPORT_BATCH_SIZE)')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        input_format = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        try:
+            stream = open(path, 'rb')
+        except OSError as e:
+            raise CommandError(f'Cannot open {path}: {e}')
+
+        with stream:
+            result = import_rows(options['resource'], stream, input_format, options['batch_size'])
+
+        for error in result.as_dict()['errors']:
+            self.stderr.write(f"  line {error['line']}: {error['errors']}")
+        if result.failed > len(result.errors):
+            self.stderr.write(f'  ... and {result.failed - len(result.errors)} more')
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Imported {result.created:,} {options['resource']} ({result.failed:,} rows skipped)"
+        ))
@@ -0,0 +1,116 @@
+"""
+Django management command to load test a running server with a role-based traffic mix
+Run with: python manage.py loadtest --url http://127.0.0.1:8000/api --concurrency 1,2,4,8,16,32
+          python manage.py loadtest --server "gunicorn backend.wsgi --workers 3 --worker-class gthread --threads 4"
+          python manage.py loadtest --server "uvicorn backend.asgi:application --port 8000 --workers 3"
+
+Run it with the same settings (DB_NAME etc.) as the server: tokens are minted
+from that database. A plain-http local server needs SECURE_SSL_REDIRECT=False,
+or every request gets a 301 and counts as an error. Bookings are real writes, so use a throwaway database.
+See core/loadtest.py for the mix and how saturation is found.
+"""
+import asyncio
+import json
+import shlex
+import socket
+import subprocess
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import loadtest
+
+
+class Command(BaseCommand):
+    help = 'Runs a doctor/receptionist/admin/patient traffic mix at increasing concurrency and reports per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000/api', help='API base URL')
+        parser.add_argument('--server', help='Start this server command first and stop it afterwards')
+        parser.add_argument('--concurrency', default='1,2,4,8,16,32', help='Comma-separated virtual users per stage')
+        parser.add_argument('--duration', type=float, default=15.0, help='Seconds per stage')
+        parser.add_argument('--mix', help='Role shares, e.g. doctor=40,receptionist=15,admin=10,patient=35')
+        parser.add_argument('--think-ms', type=float, default=0.0, help='Mean pause between a user\'s requests')
+        parser.add_argument('--timeout', type=float, default=30.0, help='Seconds before a request counts as failed')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help='Write the stage reports to this JSON file')
+
+    def handle(self, *args, **options):
+        try:
+            levels = [int(level) for level in options['concurrency'].split(',')]
+        except ValueError:
+            raise CommandError('--concurrency must be comma-separated integers')
+        mix, context = loadtest.prepare(self.parse_mix(options['mix']), log=self.stdout.write)
+        if not mix:
+            raise CommandError('No accounts for any role in the mix')
+        if not context['doctors'] or ('receptionist' in mix and not context['patients']):
+            raise CommandError('Slots and bookings need at least one doctor, bookings one patient too')
+
+        server = self.start_server(options['server'], options['url']) if options['server'] else None
+        try:
+            stages = asyncio.run(loadtest.run_ramp(
+                options['url'], mix, context, levels, options['duration'],
+                think=options['think_ms'] / 1000, timeout=options['timeout'], seed=options['seed'], log=self.report,
+            ))
+        finally:
+            if server:
+                server.terminate()
+                server.wait(timeout=30)
+
+        knee = loadtest.saturation(stages)
+        best = max(stages, key=lambda stage: stage['throughput'])
+        if knee is None:
+            self.stdout.write(f"Not saturated up to {levels[-1]} users ({best['throughput']} req/s); raise --concurrency")
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Saturates at {knee} concurrent users; peak {best['throughput']} req/s at {best['concurrency']}"
+            ))
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump({'url': options['url'], 'mix': {role: share for role, (share, _) in mix.items()},
+                           'saturation': knee, 'stages': stages}, handle, indent=2)
+            self.stdout.write(f"Results written to {options['output']}")
+
+    def parse_mix(self, value):
+        if not value:
+            return loadtest.MIX
+        mix = {}
+        for part in value.split(','):
+            role, _, share = part.partition('=')
+            if role not in loadtest.MIX:
+                raise CommandError(f"Unknown role {role!r}; use {', '.join(loadtest.MIX)}")
+            try:
+                share = float(share)
+            except ValueError:
+                raise CommandError(f'{role} needs a numeric share, e.g. {role}=20')
+            if share > 0:
+                mix[role] = (share, loadtest.MIX[role][1])
+        return mix
+
+    def start_server(self, command, url):
+        parts = urlsplit(url)
+        server = subprocess.Popen(shlex.split(command))
+        deadline = time.monotonic() + 30
+        while time.monotonic() < deadline:
+            if server.poll() is not None:
+                raise CommandError(f'Server exited with {server.returncode}')
+            try:
+                socket.create_connection((parts.hostname, parts.port or 80), timeout=1).close()
+                return server
+            except OSError:
+                time.sleep(0.2)
+        server.terminate()
+        raise CommandError(f'Server did not accept connections on {parts.netloc} within 30s')
+
+    def report(self, stage):
+        self.stdout.write(
+            f"{stage['concurrency']:>4} users  {stage['throughput']:8.1f} req/s  "
+            f"p50 {stage['p50_ms'] or 0:7.1f}  p95 {stage['p95_ms'] or 0:7.1f}  p99 {stage['p99_ms'] or 0:7.1f} ms  "
+            f"errors {stage['error_rate']:.1%}"
+        )
+        for name, endpoint in stage['endpoints'].items():
+            self.stdout.write(
+                f"       {name:<36} {endpoint['throughput']:8.1f} req/s  p50 {endpoint['p50_ms']:7.1f}  "
+                f"p95 {endpoint['p95_ms']:7.1f} ms  errors {endpoint['error_rate']:.1%}"
+            )
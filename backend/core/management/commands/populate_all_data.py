@@ -1,9 +1,11 @@
 """
 Django management command to populate database with doctors, patients, appointments, and medical records
 Run with: python manage.py populate_all_data
+          python manage.py populate_all_data --scale 1000   # ~10M appointments for load testing
 """
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from core.models import User, Patient, Appointment, MedicalRecord
+from core.synthetic import SyntheticDataGenerator, UNIT
 from datetime import datetime, timedelta
 from random import choice, randint
 
@@ -11,7 +13,20 @@ from random import choice, randint
 class Command(BaseCommand):
     help = 'Populates the database with sample doctors, patients, appointments, and medical records'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float,
+            help=f"Generate synthetic data instead: each unit is {UNIT['doctors']} doctors, {UNIT['patients']:,} patients, "
+                 f"{UNIT['appointments']:,} appointments and {UNIT['records']:,} medical records",
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed for --scale (same seed, same data)')
+        parser.add_argument('--years', type=int, default=3, help='Years of appointment history for --scale')
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk insert for --scale')
+
     def handle(self, *args, **options):
+        if options['scale']:
+            return self.populate_synthetic(options)
+        
         self.stdout.write("=" * 50)
         self.stdout.write(self.style.SUCCESS("POPULATING DATABASE WITH SAMPLE DATA"))
         self.stdout.write("=" * 50)
@@ -38,6 +53,22 @@ class Command(BaseCommand):
         self.stdout.write(f"  - Medical Records: {len(medical_records)}")
         self.stdout.write("\nYou can now view this data in your application!")
 
+    def populate_synthetic(self, options):
+        """Bulk-generate a large deterministic dataset for benchmarks"""
+        generator = SyntheticDataGenerator(
+            options['scale'], seed=options['seed'], years=options['years'],
+            batch_size=options['batch_size'], log=self.stdout.write,
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"GENERATING SYNTHETIC DATA (scale {options['scale']:g}, seed {options['seed']})"
+        ))
+        try:
+            generator.generate()
+        except ValueError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS("✅ SYNTHETIC DATA COMPLETE!"))
+        self.stdout.write("Doctors sign in with password doctor123")
+
     def create_doctors(self):
         """Create sample doctors"""
         all_doctors = []
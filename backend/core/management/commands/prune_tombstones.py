@@ -0,0 +1,16 @@
+"""
+Django management command to delete expired delta-sync tombstones
+Run with: python manage.py prune_tombstones     (e.g. daily from cron)
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.sync import prune_tombstones
+
+
+class Command(BaseCommand):
+    help = 'Deletes tombstones older than SYNC_TOMBSTONE_DAYS; clients with older since tokens reload their lists'
+
+    def handle(self, *args, **options):
+        deleted = prune_tombstones()
+        self.stdout.write(self.style.SUCCESS(f'✅ Pruned {deleted} tombstones older than {settings.SYNC_TOMBSTONE_DAYS} days'))
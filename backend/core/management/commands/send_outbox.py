@@ -0,0 +1,43 @@
+"""
+Django management command to deliver queued emails from the outbox
+Run with: python manage.py send_outbox            (drain once and exit)
+          python manage.py send_outbox --loop     (keep polling, for a worker process)
+
+To try it locally without a real mail server, run a debugging SMTP server
+(python -m smtpd -n -c DebuggingServer localhost:1025) and set
+EMAIL_HOST=localhost and EMAIL_PORT=1025.
+"""
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from core.outbox import send_pending
+
+
+class Command(BaseCommand):
+    help = 'Sends pending emails from the outbox in batches over one SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Emails per batch (default EMAIL_OUTBOX_BATCH_SIZE)')
+        parser.add_argument('--max-attempts', type=int, help='Give up after this many attempts (default EMAIL_OUTBOX_MAX_ATTEMPTS)')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new emails instead of exiting')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the outbox is empty')
+
+    def handle(self, *args, **options):
+        connection = get_connection(fail_silently=False)
+        total_sent = total_failed = 0
+        try:
+            while True:
+                sent, failed = send_pending(options['batch_size'], options['max_attempts'], connection)
+                total_sent += sent
+                total_failed += failed
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}')
+                    continue
+                if not options['loop']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write(self.style.SUCCESS(f'✅ Outbox drained: {total_sent} sent, {total_failed} failed'))
@@ -0,0 +1,217 @@
+"""
+Request metrics shared across gunicorn workers, exposed at /api/metrics in
+the Prometheus text format.
+
+PerformanceMiddleware records every request:
+
+* medicare_http_requests_total{view, method, status}    counter
+* medicare_http_request_duration_seconds{view}         histogram
+* medicare_http_request_db_seconds{view}               histogram
+* medicare_http_request_queries{view}                  histogram
+
+Each worker process writes its own memory-mapped file in METRICS_DIR, so
+recording a request never takes a cross-process lock or makes a syscall.
+Recording is a few struct.pack_into calls on the process's own mapping. The
+metrics view reads every file in the directory and sums them. Files of
+workers that have exited are still summed, so counters never go backwards
+while the server runs. The directory is emptied when gunicorn starts (see
+gunicorn.conf.py).
+
+File layout: an 8-byte header holding the number of bytes in use, then
+entries of [4-byte key length][JSON key, padded to 8 bytes][8-byte double].
+An entry is written in full before the header counts it, so a reader never
+sees half an entry.
+
+Labels are view names (the URL pattern name), never raw paths, so the
+number of series stays bounded.
+"""
+import glob
+import json
+import math
+import mmap
+import os
+import struct
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200)
+
+HISTOGRAMS = {
+    'medicare_http_request_duration_seconds': ('Request wall time', DURATION_BUCKETS),
+    'medicare_http_request_db_seconds': ('Time spent in database queries per request', DURATION_BUCKETS),
+    'medicare_http_request_queries': ('Database queries per request', QUERY_BUCKETS),
+}
+COUNTERS = {
+    'medicare_http_requests_total': 'Requests by view, method and status',
+}
+
+_INITIAL_SIZE = 64 * 1024
+_HEADER = struct.Struct('<Q')
+_VALUE = struct.Struct('<d')
+
+
+class MmapStore:
+    """One process's float values, keyed by strings, in a memory-mapped file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(_INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = _HEADER.unpack_from(self._map, 0)[0] or _HEADER.size
+        self._positions = {key: position for key, _, position in _entries(self._map, self._used)}
+
+    def _append(self, key):
+        encoded = key.encode()
+        padded = len(encoded) + (-(4 + len(encoded)) % 8)
+        size = 4 + padded + _VALUE.size
+        if self._used + size > len(self._map):
+            self._grow(self._used + size)
+        struct.pack_into(f'<I{padded}s', self._map, self._used, len(encoded), encoded)
+        position = self._used + 4 + padded
+        _VALUE.pack_into(self._map, position, 0.0)
+        self._used += size
+        _HEADER.pack_into(self._map, 0, self._used)
+        self._positions[key] = position
+        return position
+
+    def _grow(self, needed):
+        size = len(self._map)
+        while size < needed:
+            size *= 2
+        self._map.close()
+        self._file.truncate(size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def add(self, key, amount):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        _VALUE.pack_into(self._map, position, _VALUE.unpack_from(self._map, position)[0] + amount)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _entries(buffer, used):
+    """(key, value, value position) of every entry in a store's bytes"""
+    position = _HEADER.size
+    while position < used:
+        length = struct.unpack_from('<I', buffer, position)[0]
+        key = bytes(buffer[position + 4:position + 4 + length]).decode()
+        position += 4 + length + (-(4 + length) % 8)
+        yield key, _VALUE.unpack_from(buffer, position)[0], position
+        position += _VALUE.size
+
+
+_lock = threading.Lock()
+_store = None
+_store_owner = None
+_keys = {}
+
+
+def _key(name, *labels):
+    # Memoized: encoding the JSON key was most of the cost of a request
+    key = _keys.get((name, labels))
+    if key is None:
+        key = _keys[name, labels] = json.dumps([name, list(labels)], separators=(',', ':'))
+    return key
+
+
+def _get_store():
+    """This process's store, reopened after a fork or a METRICS_DIR change"""
+    global _store, _store_owner
+    owner = (os.getpid(), settings.METRICS_DIR)
+    if _store_owner != owner:
+        if _store is not None:
+            _store.close()
+        os.makedirs(settings.METRICS_DIR, exist_ok=True)
+        _store = MmapStore(os.path.join(settings.METRICS_DIR, f'{owner[0]}.db'))
+        _store_owner = owner
+    return _store
+
+
+def observe_request(view, method, status, seconds, db_seconds, queries):
+    """Record one finished request"""
+    if not settings.METRICS_ENABLED:
+        return
+    view = view or 'unmatched'
+    with _lock:
+        store = _get_store()
+        store.add(_key('medicare_http_requests_total', view, method, str(status)), 1)
+        for name, value in (
+            ('medicare_http_request_duration_seconds', seconds),
+            ('medicare_http_request_db_seconds', db_seconds),
+            ('medicare_http_request_queries', queries),
+        ):
+            # Buckets are stored per interval; the exporter makes them cumulative
+            store.add(_key(name, view, bisect_left(HISTOGRAMS[name][1], value)), 1)
+            store.add(_key(name + '_sum', view), value)
+
+
+def collect():
+    """{key: value} summed over every process's file"""
+    totals = defaultdict(float)
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        with open(path, 'rb') as handle:
+            data = handle.read()
+        if len(data) < _HEADER.size:
+            continue
+        for key, value, _ in _entries(data, min(_HEADER.unpack_from(data, 0)[0], len(data))):
+            totals[key] += value
+    return totals
+
+
+def _format_value(value):
+    return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render():
+    """The metrics in the Prometheus text exposition format (version 0.0.4)"""
+    counters, buckets, sums = defaultdict(float), defaultdict(float), defaultdict(float)
+    for key, value in collect().items():
+        name, labels = json.loads(key)
+        if name in COUNTERS:
+            counters[name, tuple(labels)] += value
+        elif name in HISTOGRAMS:
+            buckets[name, labels[0], labels[1]] += value
+        elif name.endswith('_sum'):
+            sums[name[:-len('_sum')], labels[0]] += value
+
+    lines = []
+    for name, help_text in COUNTERS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} counter']
+        for (series, (view, method, status)), value in sorted(counters.items()):
+            if series == name:
+                lines.append(
+                    f'{name}{{view="{_escape(view)}",method="{_escape(method)}",status="{status}"}} {_format_value(value)}'
+                )
+    for name, (help_text, bounds) in HISTOGRAMS.items():
+        lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        views = sorted({view for series, view, _ in buckets if series == name})
+        for view in views:
+            label = f'view="{_escape(view)}"'
+            cumulative = 0.0
+            for index, bound in enumerate(bounds + (math.inf,)):
+                cumulative += buckets.get((name, view, index), 0.0)
+                upper = '+Inf' if bound == math.inf else repr(float(bound))
+                lines.append(f'{name}_bucket{{{label},le="{upper}"}} {_format_value(cumulative)}')
+            lines.append(f'{name}_sum{{{label}}} {_format_value(sums.get((name, view), 0.0))}')
+            lines.append(f'{name}_count{{{label}}} {_format_value(cumulative)}')
+    return '\n'.join(lines) + '\n'
+
+
+def clear():
+    """Delete every process's file; gunicorn.conf.py calls this when the server starts"""
+    for path in glob.glob(os.path.join(settings.METRICS_DIR, '*.db')):
+        os.remove(path)
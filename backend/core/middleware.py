@@ -0,0 +1,129 @@
+"""
+Per-request performance instrumentation.
+
+PerformanceMiddleware times every request and counts its queries with a
+database execute_wrapper. That works with DEBUG off, unlike
+connection.queries. It reports:
+
+* a `Server-Timing` header (total and db time, query count), which the
+  browser's network panel shows next to each request. It is sent to every
+  client, so PERF_SERVER_TIMING only turns it on with DEBUG by default;
+* one JSON log line per request on the `core.performance` logger: method,
+  path, view, status, duration_ms, db_ms, queries, bytes;
+* for requests slower than PERF_SLOW_REQUEST_MS, the same line again as a
+  WARNING with `"slow": true` and the SQL of its PERF_SLOW_SQL_LIMIT
+  slowest statements, slowest first.
+  Only the statements are logged, never their parameters, which hold
+  patient data.
+
+The same numbers feed the per-view counters and histograms served at
+/api/metrics (see core/metrics.py).
+
+Streaming responses (exports) run most of their queries after the view
+returns, so only the queries made before the first byte are counted and
+`bytes` is null.
+"""
+import heapq
+import json
+import logging
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics, profiling
+
+logger = logging.getLogger('core.performance')
+
+
+class _QueryRecorder:
+    """execute_wrapper that adds up query time, keeping the SQL of the `keep` slowest statements"""
+
+    def __init__(self, keep):
+        self.keep = keep
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.seconds += elapsed
+            # A min-heap, so the fastest statement kept is the one pushed out
+            if len(self.statements) < self.keep:
+                heapq.heappush(self.statements, (elapsed, sql))
+            elif self.keep:
+                heapq.heappushpop(self.statements, (elapsed, sql))
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return None
+    return match.view_name or match._func_path
+
+
+class PerformanceMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = _QueryRecorder(settings.PERF_SLOW_SQL_LIMIT)
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(recorder))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - started) * 1000
+        db_ms = recorder.seconds * 1000
+
+        if settings.PERF_SERVER_TIMING:
+            response.headers['Server-Timing'] = (
+                f'total;dur={total_ms:.1f}, db;dur={db_ms:.1f};desc="{recorder.count} queries"'
+            )
+
+        line = {
+            'method': request.method,
+            'path': request.path,
+            'view': _view_name(request),
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 1),
+            'db_ms': round(db_ms, 1),
+            'queries': recorder.count,
+            'bytes': None if response.streaming else len(response.content),
+        }
+        metrics.observe_request(line['view'], request.method, response.status_code, total_ms / 1000, db_ms / 1000, recorder.count)
+        logger.info(json.dumps(line))
+
+        if total_ms >= settings.PERF_SLOW_REQUEST_MS:
+            line['sql'] = [
+                {'ms': round(seconds * 1000, 2), 'sql': sql}
+                for seconds, sql in sorted(recorder.statements, reverse=True)
+            ]
+            line['sql_truncated'] = recorder.count > len(recorder.statements)
+            line['slow'] = True
+            logger.warning(json.dumps(line))
+        return response
+
+
+class ProfilingMiddleware:
+    """Profiles the requests that carry a signed admin token (see core/profiling.py)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = profiling.requested_token(request)
+        if token is None or not profiling.token_is_valid(token):
+            return self.get_response(request)
+
+        with profiling.Profile() as profile:
+            response = self.get_response(request)
+        if profile.stacks is not None:
+            response.headers['X-Profile-Id'] = profiling.save(profile.stacks, _view_name(request), profile.duration_ms)
+        return response
@@ -0,0 +1,62 @@
+# Generated by Django 5.1.4 on 2026-10-17 22:48
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('core', '0003_user_is_verified_notification'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['-date', '-time', 'id'], name='appt_ordering_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'date'], name='appt_doctor_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['doctor', 'status'], name='appt_doctor_status_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['patient', '-date', '-time'], name='appt_patient_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='medicalrecord',
+            index=models.Index(fields=['-created_at', 'id'], name='record_ordering_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='medicalrecord',
+            index=models.Index(fields=['patient', '-created_at'], name='record_patient_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='medicalrecord',
+            index=models.Index(condition=models.Q(('status', 'Pending')), fields=['status'], name='record_pending_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(fields=['-created_at', 'id'], name='notif_ordering_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(fields=['is_read', '-created_at'], name='notif_read_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['-created_at'], name='notif_unread_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='user',
+            index=models.Index(fields=['email'], name='user_email_idx'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:50
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Value
+from django.db.models.functions import Coalesce, Concat
+
+
+def cancel_double_bookings(apps, schema_editor):
+    """Keep the earliest active appointment per doctor slot and cancel the rest, so the constraint can be added"""
+    Appointment = apps.get_model('core', 'Appointment')
+    active = Appointment.objects.exclude(status='Cancelled')
+    duplicates = active.values('doctor_id', 'date', 'time').annotate(
+        n=Count('id'), keep=Min('id')
+    ).filter(n__gt=1).order_by()
+    for slot in duplicates.iterator():
+        active.filter(
+            doctor_id=slot['doctor_id'], date=slot['date'], time=slot['time']
+        ).exclude(id=slot['keep']).update(
+            status='Cancelled',
+            notes=Concat(Coalesce('notes', Value('')), Value(f" [Cancelled: doctor double-booked, kept appointment #{slot['keep']}]")),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_doctorschedule'),
+    ]
+
+    operations = [
+        migrations.RunPython(cancel_double_bookings, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='appointment',
+            constraint=models.UniqueConstraint(condition=models.Q(('status', 'Cancelled'), _negated=True), fields=('doctor', 'date', 'time'), name='appt_unique_active_slot'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.4 on 2026-10-17 23:56
+
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('core', '0007_unique_active_slot'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['status', '-date', '-time', 'id'], name='appt_status_date_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='medicalrecord',
+            index=models.Index(fields=['doctor', '-created_at'], name='record_doctor_created_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='medicalrecord',
+            index=models.Index(fields=['record_type', '-created_at'], name='record_type_created_idx'),
+        ),
+    ]
@@ -0,0 +1,45 @@
+from django.db import migrations
+
+SEARCH_EXPRESSION = "lower(name || ' ' || email || ' ' || regexp_replace(phone, '[^0-9]', '', 'g'))"
+PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace(phone, '-', ''), ' ', ''), '(', ''), ')', ''), '+', ''), '.', '')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS patient_search_trgm_idx '
+            f'ON core_patient USING gin (({SEARCH_EXPRESSION}) gin_trgm_ops)'
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE core_patient_search USING fts5(name, email, phone, tokenize='trigram')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO core_patient_search (rowid, name, email, phone) '
+            f'SELECT id, name, email, {PHONE_DIGITS} FROM core_patient'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS patient_search_trgm_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_patient_search')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('core', '0008_list_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
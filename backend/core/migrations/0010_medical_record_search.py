@@ -0,0 +1,44 @@
+from django.db import migrations
+
+RECORD_TAGS = (
+    "'type' || lower(replace(record_type, ' ', '')) || ' status' || lower(status) "
+    "|| ' doctor' || doctor_id || ' patient' || patient_id"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS record_description_fts_idx '
+            "ON core_medicalrecord USING gin (to_tsvector('english', description))"
+        )
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE core_medicalrecord_search USING fts5(description, tags, tokenize='porter unicode61')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO core_medicalrecord_search (rowid, description, tags) '
+            f'SELECT id, description, {RECORD_TAGS} FROM core_medicalrecord'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS record_description_fts_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS core_medicalrecord_search')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('core', '0009_patient_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
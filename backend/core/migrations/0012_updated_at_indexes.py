@@ -0,0 +1,31 @@
+from django.db import migrations, models
+
+from core.operations import AddIndexConcurrently
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_updated_at_tombstone'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='patient',
+            index=models.Index(fields=['updated_at', 'id'], name='patient_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='appointment',
+            index=models.Index(fields=['updated_at', 'id'], name='appt_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='medicalrecord',
+            index=models.Index(fields=['updated_at', 'id'], name='record_updated_idx'),
+        ),
+        AddIndexConcurrently(
+            model_name='notification',
+            index=models.Index(fields=['updated_at', 'id'], name='notif_updated_idx'),
+        ),
+    ]
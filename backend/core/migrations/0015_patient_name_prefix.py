@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_prefix_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        # text_pattern_ops, so lower(name) LIKE 'prefix%' is a range scan under any collation
+        schema_editor.execute(
+            'CREATE INDEX CONCURRENTLY IF NOT EXISTS patient_name_prefix_idx '
+            'ON core_patient (lower(name) text_pattern_ops)'
+        )
+    elif vendor == 'sqlite':
+        # LIKE is case-insensitive on SQLite, so only a NOCASE index serves it
+        schema_editor.execute(
+            'CREATE INDEX IF NOT EXISTS patient_name_prefix_idx ON core_patient (name COLLATE NOCASE)'
+        )
+
+
+def drop_prefix_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX CONCURRENTLY IF EXISTS patient_name_prefix_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP INDEX IF EXISTS patient_name_prefix_idx')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction on PostgreSQL
+    atomic = False
+
+    dependencies = [
+        ('core', '0014_user_updated_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_prefix_index, drop_prefix_index),
+    ]
@@ -13,6 +13,15 @@ class User(AbstractUser):
     phone = models.CharField(max_length=20, blank=True, null=True)
     department = models.CharField(max_length=100, blank=True, null=True)
     is_verified = models.BooleanField(default=True)  # For patient verification by admin
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta(AbstractUser.Meta):
+        indexes = [
+            # login_view, LoginSerializer and patient_register look users up by email
+            models.Index(fields=['email'], name='user_email_idx'),
+            # Conditional GET validators (see core/conditional.py)
+            models.Index(fields=['updated_at'], name='user_updated_idx'),
+        ]
     
     def __str__(self):
         return f"{self.username} ({self.role})"
@@ -28,6 +37,13 @@ class Patient(models.Model):
     assigned_doctor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='patients', limit_choices_to={'role': 'doctor'})
     status = models.CharField(max_length=20, choices=[('Active', 'Active'), ('Inactive', 'Inactive')], default='Active')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Delta sync (?since=, see core/sync.py)
+            models.Index(fields=['updated_at', 'id'], name='patient_updated_idx'),
+        ]
 
     def __str__(self):
         return self.name
@@ -48,9 +64,26 @@ class Appointment(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Scheduled')
     notes = models.TextField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date', '-time']
+        indexes = [
+            models.Index(fields=['-date', '-time', 'id'], name='appt_ordering_idx'),
+            models.Index(fields=['doctor', 'date'], name='appt_doctor_date_idx'),
+            models.Index(fields=['doctor', 'status'], name='appt_doctor_status_idx'),
+            models.Index(fields=['patient', '-date', '-time'], name='appt_patient_date_idx'),
+            models.Index(fields=['status', '-date', '-time', 'id'], name='appt_status_date_idx'),
+            models.Index(fields=['updated_at', 'id'], name='appt_updated_idx'),
+        ]
+        constraints = [
+            # A doctor can only have one active appointment per slot (see core/booking.py)
+            models.UniqueConstraint(
+                fields=['doctor', 'date', 'time'],
+                condition=~models.Q(status='Cancelled'),
+                name='appt_unique_active_slot',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.patient.name} with {self.doctor.get_full_name()} on {self.date} at {self.time}"
@@ -68,9 +101,18 @@ class MedicalRecord(models.Model):
     description = models.TextField()
     status = models.CharField(max_length=20, choices=[('Pending', 'Pending'), ('Completed', 'Completed')], default='Pending')
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='record_ordering_idx'),
+            models.Index(fields=['patient', '-created_at'], name='record_patient_created_idx'),
+            models.Index(fields=['doctor', '-created_at'], name='record_doctor_created_idx'),
+            models.Index(fields=['record_type', '-created_at'], name='record_type_created_idx'),
+            models.Index(fields=['status'], condition=models.Q(status='Pending'), name='record_pending_idx'),
+            models.Index(fields=['updated_at', 'id'], name='record_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.record_type} for {self.patient.name}"
@@ -87,9 +129,84 @@ class Notification(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='notifications_about')
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at', 'id'], name='notif_ordering_idx'),
+            models.Index(fields=['is_read', '-created_at'], name='notif_read_created_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_read=False), name='notif_unread_idx'),
+            models.Index(fields=['updated_at', 'id'], name='notif_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.notification_type} - {self.title}"
+
+class Tombstone(models.Model):
+    """A deleted row, kept so delta-syncing clients (?since=) learn to drop it; pruned by `manage.py prune_tombstones`"""
+    model = models.CharField(max_length=100)  # model label, e.g. 'core.appointment'
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['model', 'deleted_at'], name='tombstone_model_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.model} #{self.object_id} deleted {self.deleted_at}"
+
+class EmailOutbox(models.Model):
+    """Emails queued inside a request transaction and delivered by `manage.py send_outbox`"""
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Sent', 'Sent'),
+        ('Failed', 'Failed'),
+    ]
+    recipient = models.EmailField()
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    html_body = models.TextField(blank=True, null=True)
+    from_email = models.CharField(max_length=254)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, null=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['next_attempt_at', 'id']
+        indexes = [
+            models.Index(fields=['next_attempt_at', 'id'], condition=models.Q(status='Pending'), name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.recipient} ({self.status})"
+
+class DoctorSchedule(models.Model):
+    """A weekly working-hours block; a doctor can have several per weekday (e.g. morning and afternoon)"""
+    WEEKDAY_CHOICES = [
+        (0, 'Monday'),
+        (1, 'Tuesday'),
+        (2, 'Wednesday'),
+        (3, 'Thursday'),
+        (4, 'Friday'),
+        (5, 'Saturday'),
+        (6, 'Sunday'),
+    ]
+    doctor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='schedules', limit_choices_to={'role': 'doctor'})
+    weekday = models.IntegerField(choices=WEEKDAY_CHOICES)
+    start_time = models.TimeField()
+    end_time = models.TimeField()
+    slot_minutes = models.IntegerField(default=30)
+
+    class Meta:
+        ordering = ['doctor', 'weekday', 'start_time']
+        indexes = [
+            models.Index(fields=['doctor', 'weekday'], name='schedule_doctor_weekday_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.doctor.username} {self.get_weekday_display()} {self.start_time}-{self.end_time}"
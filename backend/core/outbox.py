@@ -0,0 +1,154 @@
+"""
+Transactional email outbox.
+
+Views call `queue_email` inside the same transaction as the change that
+triggers the email, so the row only exists if that change committed. The
+`send_outbox` management command drains due rows in batches over a single
+SMTP connection, outside any database transaction, retrying rejected
+messages with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EmailOutbox
+
+logger = logging.getLogger(__name__)
+
+
+def queue_email(recipient, subject, body, html_body=None, from_email=None):
+    return EmailOutbox.objects.create(
+        recipient=recipient,
+        subject=subject,
+        body=body,
+        html_body=html_body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+    )
+
+
+def retry_delay(attempts):
+    """Exponential backoff: base, 2*base, 4*base ... capped at EMAIL_OUTBOX_MAX_BACKOFF"""
+    delay = settings.EMAIL_OUTBOX_BACKOFF_BASE * 2 ** max(attempts - 1, 0)
+    return timedelta(seconds=min(delay, settings.EMAIL_OUTBOX_MAX_BACKOFF))
+
+
+def _build_message(item, connection):
+    message = EmailMultiAlternatives(
+        subject=item.subject,
+        body=item.body,
+        from_email=item.from_email,
+        to=[item.recipient],
+        connection=connection,
+    )
+    if item.html_body:
+        message.attach_alternative(item.html_body, 'text/html')
+    return message
+
+
+def _claim(batch_size):
+    """
+    Lease a batch of due rows in a short transaction by pushing their
+    next_attempt_at EMAIL_OUTBOX_LEASE seconds ahead. Returns (lease, rows).
+    """
+    with transaction.atomic():
+        # skip_locked lets several workers claim batches without waiting for each other
+        batch = list(
+            EmailOutbox.objects.select_for_update(skip_locked=True)
+            .filter(status='Pending', next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        lease = timezone.now() + timedelta(seconds=settings.EMAIL_OUTBOX_LEASE)
+        EmailOutbox.objects.filter(id__in=[item.id for item in batch]).update(next_attempt_at=lease)
+    return lease, batch
+
+
+def _record(lease, items):
+    """Save the outcome of the rows still held under `lease`; a row whose lease expired belongs to another worker now"""
+    with transaction.atomic():
+        for item in items:
+            EmailOutbox.objects.filter(id=item.id, status='Pending', next_attempt_at=lease).update(
+                attempts=item.attempts,
+                status=item.status,
+                sent_at=item.sent_at,
+                next_attempt_at=item.next_attempt_at,
+                last_error=item.last_error,
+            )
+
+
+def _defer(items, error):
+    """Push items back without charging an attempt: a connection failure says nothing about them"""
+    if items:
+        logger.warning('Cannot connect to the mail server, %s outbox emails deferred: %s', len(items), error)
+    for item in items:
+        item.last_error = str(error)
+        item.next_attempt_at = timezone.now() + retry_delay(1)
+
+
+def send_pending(batch_size=None, max_attempts=None, connection=None):
+    """
+    Send one batch of due emails. Returns (sent, failed) counts; a batch of
+    zero/zero means the outbox is drained or the mail server is unreachable.
+
+    No transaction is open while talking to the mail server: the batch is
+    leased in one short transaction and the results are saved in another,
+    so a slow or unreachable server never holds a database lock that
+    request writes would queue behind. Rows of a worker that died mid-batch
+    come due again when their lease (EMAIL_OUTBOX_LEASE) runs out.
+
+    Only a message the server rejects counts towards max_attempts. When the
+    connection cannot be opened, the batch stops and the unsent emails are
+    retried after EMAIL_OUTBOX_BACKOFF_BASE, so an outage never fails them
+    and costs at most one connect timeout per batch.
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    max_attempts = max_attempts or settings.EMAIL_OUTBOX_MAX_ATTEMPTS
+    connection = connection or get_connection(fail_silently=False)
+    sent = failed = 0
+
+    lease, batch = _claim(batch_size)
+    if not batch:
+        return 0, 0
+
+    try:
+        connection.open()
+    except Exception as e:
+        # The mail server is down, not the messages: retry later, free of charge
+        _defer(batch, e)
+        _record(lease, batch)
+        return 0, 0
+
+    try:
+        for index, item in enumerate(batch):
+            item.attempts += 1
+            try:
+                connection.send_messages([_build_message(item, connection)])
+            except Exception as e:
+                logger.warning('Outbox email %s failed (attempt %s): %s', item.id, item.attempts, e)
+                item.last_error = str(e)
+                if item.attempts >= max_attempts:
+                    item.status = 'Failed'
+                else:
+                    item.next_attempt_at = timezone.now() + retry_delay(item.attempts)
+                failed += 1
+                # The connection may be broken now; reopen it for the rest of the batch
+                connection.close()
+                try:
+                    connection.open()
+                except Exception as reopen_error:
+                    _defer(batch[index + 1:], reopen_error)
+                    break
+            else:
+                item.status = 'Sent'
+                item.sent_at = timezone.now()
+                item.last_error = None
+                sent += 1
+    finally:
+        connection.close()
+        # Also on an unexpected error, so what was sent is not sent again
+        _record(lease, batch)
+
+    return sent, failed
@@ -0,0 +1,210 @@
+"""
+Keyset (cursor) pagination for the hand-built list endpoints in views.py.
+
+A cursor stores the ordering values of the last row on a page, so fetching the
+next page is a plain indexed range scan instead of an OFFSET that gets slower
+the deeper you page.
+"""
+import base64
+import json
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+PATIENT_ORDERING = ('id',)
+APPOINTMENT_ORDERING = ('-date', '-time', 'id')
+MEDICAL_RECORD_ORDERING = ('-created_at', 'id')
+NOTIFICATION_ORDERING = ('-created_at', 'id')
+
+
+class InvalidCursor(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = {'success': False, 'message': 'Invalid pagination cursor'}
+    default_code = 'invalid_cursor'
+
+
+class InvalidPageSize(APIException):
+    status_code = status.HTTP_400_BAD_REQUEST
+    default_detail = {'success': False, 'message': 'page_size must be a positive integer'}
+    default_code = 'invalid_page_size'
+
+
+def _encode_cursor(values, reverse, ordering):
+    # The ordering travels with the cursor so one minted under another ?sort=
+    # is rejected instead of silently paging in the wrong direction
+    payload = json.dumps({'v': values, 'r': reverse, 'o': ','.join(ordering)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor, ordering):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values, reverse = payload['v'], bool(payload['r'])
+        minted_for = payload.get('o', ','.join(ordering))
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise InvalidCursor()
+    if minted_for != ','.join(ordering):
+        raise InvalidCursor()
+    return values, reverse
+
+
+def _field_name(term):
+    return term.lstrip('-')
+
+
+def _row_values(obj, ordering):
+    """Ordering values of a row in a JSON friendly form"""
+    values = []
+    for term in ordering:
+        value = getattr(obj, _field_name(term))
+        values.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+    return values
+
+
+def _keyset_filter(model, ordering, values, reverse):
+    """
+    Build the "rows after this one" condition for a mixed-direction ordering:
+    (a > x) OR (a = x AND b > y) OR (a = x AND b = y AND c > z) ...
+    """
+    try:
+        values = [
+            model._meta.get_field(_field_name(term)).to_python(value)
+            for term, value in zip(ordering, values, strict=True)
+        ]
+    except Exception:
+        raise InvalidCursor()
+
+    condition = Q()
+    equal = Q()
+    for term, value in zip(ordering, values):
+        name = _field_name(term)
+        descending = term.startswith('-') != reverse
+        condition |= equal & Q(**{f'{name}__{"lt" if descending else "gt"}': value})
+        equal &= Q(**{name: value})
+    return condition
+
+
+def _reverse_ordering(ordering):
+    return tuple(term[1:] if term.startswith('-') else f'-{term}' for term in ordering)
+
+
+def _page_size(request):
+    max_size = settings.CURSOR_PAGINATION_MAX_PAGE_SIZE
+    raw = request.query_params.get('page_size')
+    if raw is None:
+        return min(settings.CURSOR_PAGINATION_DEFAULT_PAGE_SIZE, max_size)
+    try:
+        size = int(raw)
+    except ValueError:
+        raise InvalidPageSize()
+    if size < 1:
+        raise InvalidPageSize()
+    return min(size, max_size)
+
+
+def _merge_rows(parts, ordering, limit):
+    """First `limit` rows across separately ordered querysets, in `ordering`"""
+    rows = [row for part in parts for row in part[:limit]]
+    # Stable sorts from the last term to the first give the mixed-direction order
+    for term in reversed(ordering):
+        rows.sort(key=lambda row: getattr(row, _field_name(term)), reverse=term.startswith('-'))
+    return rows[:limit]
+
+
+def paginate(request, queryset, ordering, partitions=None):
+    """
+    Return (rows, pagination) for a list endpoint.
+
+    Pagination is opt-in so existing clients keep getting the full list: when
+    the request has neither `page_size` nor `cursor`, the whole ordered queryset
+    is returned and `pagination` is None.
+
+    `partitions` optionally splits the queryset into disjoint filters (e.g. one
+    per status of `status__in`). Each part is read in index order and the pages
+    are merged, instead of the database sorting every matching row.
+    """
+    queryset = queryset.order_by(*ordering)
+    params = request.query_params
+    if 'page_size' not in params and 'cursor' not in params:
+        return queryset, None
+
+    page_size = _page_size(request)
+    cursor = params.get('cursor')
+    reverse = False
+    page_ordering = ordering
+    if cursor:
+        values, reverse = _decode_cursor(cursor, ordering)
+        queryset = queryset.filter(_keyset_filter(queryset.model, ordering, values, reverse))
+    if reverse:
+        page_ordering = _reverse_ordering(ordering)
+        queryset = queryset.order_by(*page_ordering)
+
+    if partitions:
+        rows = _merge_rows([queryset.filter(part) for part in partitions], page_ordering, page_size + 1)
+    else:
+        rows = list(queryset[:page_size + 1])
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+    if reverse:
+        rows.reverse()
+
+    # Walking forwards there is a previous page whenever we came from a cursor;
+    # walking backwards there is always a next page (the one we came from).
+    has_next = has_more if not reverse else bool(cursor)
+    has_previous = bool(cursor) if not reverse else has_more
+
+    pagination = {
+        'page_size': page_size,
+        'next': _encode_cursor(_row_values(rows[-1], ordering), False, ordering) if rows and has_next else None,
+        'previous': _encode_cursor(_row_values(rows[0], ordering), True, ordering) if rows and has_previous else None,
+    }
+    return rows, pagination
+
+
+def paginate_ids(request, fetch):
+    """
+    Return (rows, pagination) for a source that is not a queryset, such as a
+    full-text index: `fetch(before_id, limit)` returns up to `limit` rows,
+    tuples starting with the id, below `before_id` (or from the top when it
+    is None), newest first.
+
+    Always paginated and forward only; `previous` is always None.
+    """
+    ordering = ('-id',)
+    page_size = _page_size(request)
+    before_id = None
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        values, reverse = _decode_cursor(cursor, ordering)
+        if reverse or len(values) != 1 or not isinstance(values[0], int):
+            raise InvalidCursor()
+        before_id = values[0]
+
+    rows = list(fetch(before_id, page_size + 1))
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    pagination = {
+        'page_size': page_size,
+        'next': _encode_cursor([rows[-1][0]], False, ordering) if has_next else None,
+        'previous': None,
+    }
+    return rows, pagination
+
+
+def list_response(data, pagination, facets=None, sync=None):
+    """
+    Standard list payload, with pagination and facet blocks when the client
+    asked for them and the delta sync keys (see core/sync.py)
+    """
+    body = {'success': True, 'data': data}
+    if pagination is not None:
+        body['pagination'] = pagination
+    if facets is not None:
+        body['facets'] = facets
+    if sync is not None:
+        body.update(sync)
+    return Response(body)
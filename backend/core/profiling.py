@@ -0,0 +1,172 @@
+"""
+On-demand profiling of single production requests.
+
+An admin mints a short-lived signed token (POST /api/admin/profiles/token/).
+Any request that carries it, in an `X-Profile` header or a `?profile=` query
+parameter, is profiled. That lets the request be replayed exactly as the
+affected user made it, e.g. the patient whose dashboard is slow.
+ProfilingMiddleware does the rest:
+
+* A sampling thread reads the request thread's stack from
+  sys._current_frames() every PROFILE_INTERVAL_MS. The interpreter's switch
+  interval is lowered to match while the profile runs, so CPU-bound code is
+  sampled at that rate too. Unlike cProfile, nothing hooks every function
+  call, so the profile is not skewed towards call-heavy code.
+* The samples are written to PROFILE_DIR as collapsed stacks, one
+  `frame;frame;frame count` line per distinct stack. speedscope and
+  flamegraph.pl open them as is. Only the newest PROFILE_KEEP files are
+  kept.
+* The response gets an `X-Profile-Id` header naming the file. The admin
+  endpoints list the files and download them.
+
+Requests without a token pay one dict lookup in request.META. Only one
+request is profiled at a time per process; a second one runs unprofiled.
+"""
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+
+SALT = 'core.profiling'
+PROFILE_NAME = re.compile(r'^\d{8}T\d{6}-[\w-]+-\d+ms-\d+\.collapsed$')
+
+_busy = threading.Lock()
+_short_names = {}
+
+
+def mint_token(admin_id):
+    return signing.TimestampSigner(salt=SALT).sign(str(admin_id))
+
+
+def token_is_valid(token):
+    try:
+        signing.TimestampSigner(salt=SALT).unsign(token, max_age=settings.PROFILE_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return False
+    return True
+
+
+def requested_token(request):
+    """The profile token a request carries, if any, without parsing the query string otherwise"""
+    token = request.META.get('HTTP_X_PROFILE')
+    if token is None and 'profile=' in request.META.get('QUERY_STRING', ''):
+        token = request.GET.get('profile')
+    return token
+
+
+def _short(filename):
+    name = _short_names.get(filename)
+    if name is None:
+        name = filename
+        for prefix in sorted({str(settings.BASE_DIR), *sys.path}, key=len, reverse=True):
+            if prefix and filename.startswith(prefix + os.sep):
+                name = filename[len(prefix) + 1:]
+                break
+        _short_names[filename] = name
+    return name
+
+
+class Sampler(threading.Thread):
+    """Collects the stacks of one thread every `interval` seconds"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='profile-sampler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({_short(code.co_filename)}:{code.co_firstlineno})'.replace(';', ','))
+                frame = frame.f_back
+            if stack:
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self._done.set()
+        self.join()
+
+
+class Profile:
+    """
+    Context manager sampling the current thread. `stacks` holds the result,
+    or None when another profile was already running in this process.
+    """
+
+    def __enter__(self):
+        self.stacks = self.sampler = None
+        if not _busy.acquire(blocking=False):
+            return self
+        interval = settings.PROFILE_INTERVAL_MS / 1000
+        # The switch interval is process-wide, hence one profile at a time
+        self._switch_interval = sys.getswitchinterval()
+        sys.setswitchinterval(min(self._switch_interval, interval))
+        self.sampler = Sampler(threading.get_ident(), interval)
+        self.started = time.perf_counter()
+        self.sampler.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.sampler is None:
+            return
+        self.sampler.stop()
+        self.duration_ms = (time.perf_counter() - self.started) * 1000
+        sys.setswitchinterval(self._switch_interval)
+        _busy.release()
+        self.stacks = self.sampler.stacks
+
+
+def save(stacks, view, duration_ms):
+    """Write the collapsed stacks to PROFILE_DIR and prune old files; returns the file name"""
+    os.makedirs(settings.PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now(dt_timezone.utc).strftime('%Y%m%dT%H%M%S')
+    label = re.sub(r'[^\w-]', '-', view or 'unmatched')
+    name = f'{stamp}-{label}-{int(duration_ms)}ms-{time.time_ns() % 10**9}.collapsed'
+    with open(os.path.join(settings.PROFILE_DIR, name), 'w') as handle:
+        for stack, count in stacks.most_common():
+            handle.write(f'{stack} {count}\n')
+    for old in list_profiles()[settings.PROFILE_KEEP:]:
+        os.remove(os.path.join(settings.PROFILE_DIR, old['name']))
+    return name
+
+
+def list_profiles():
+    """Saved profiles, newest first"""
+    if not os.path.isdir(settings.PROFILE_DIR):
+        return []
+    found = []
+    for name in os.listdir(settings.PROFILE_DIR):
+        if PROFILE_NAME.match(name):
+            found.append((os.stat(os.path.join(settings.PROFILE_DIR, name)), name))
+    found.sort(key=lambda entry: entry[0].st_mtime_ns, reverse=True)
+
+    profiles = []
+    for stat, name in found:
+        view, duration, _ = name.split('-', 1)[1].rsplit('-', 2)
+        profiles.append({
+            'name': name,
+            'view': view,
+            'duration_ms': int(duration[:-2]),
+            'created_at': datetime.fromtimestamp(stat.st_mtime, dt_timezone.utc).isoformat(),
+            'bytes': stat.st_size,
+        })
+    return profiles
+
+
+def profile_path(name):
+    """Path of a saved profile, or None; names are checked so no other file can be read"""
+    if not PROFILE_NAME.match(name):
+        return None
+    path = os.path.join(settings.PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
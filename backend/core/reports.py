@@ -0,0 +1,134 @@
+"""
+Analytics for the Reports page.
+
+Everything is computed with GROUP BY / conditional aggregate queries so the
+cost depends on the number of months and departments in the range, not on
+shipping every row to the browser.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+
+from .models import User, Patient, Appointment
+
+AGE_GROUPS = [
+    ('18-25', Q(age__lte=25)),
+    ('26-55', Q(age__gt=25, age__lte=55)),
+    ('55+', Q(age__gt=55)),
+]
+
+
+def _month_start(day, months_back=0):
+    month = day.month - 1 - months_back
+    return date(day.year + month // 12, month % 12 + 1, 1)
+
+
+def _monthly_series(queryset, field):
+    rows = (
+        queryset.order_by()
+        .annotate(month=TruncMonth(field))
+        .values('month')
+        .annotate(count=Count('id'))
+        .order_by('month')
+    )
+    return [(row['month'], row['count']) for row in rows]
+
+
+def _label(month):
+    return month.strftime('%b %Y')
+
+
+def build_report(start=None, end=None, department=None):
+    appointments = Appointment.objects.all()
+    patients = Patient.objects.all()
+    if start:
+        appointments = appointments.filter(date__gte=start)
+        patients = patients.filter(created_at__date__gte=start)
+    if end:
+        appointments = appointments.filter(date__lte=end)
+        patients = patients.filter(created_at__date__lte=end)
+    if department:
+        appointments = appointments.filter(doctor__department__iexact=department)
+        patients = patients.filter(assigned_doctor__department__iexact=department)
+
+    totals = appointments.order_by().aggregate(
+        totalAppointments=Count('id'),
+        completedVisits=Count('id', filter=Q(status='Completed')),
+    )
+
+    doctors = User.objects.filter(role='doctor', is_active=True)
+    if department:
+        doctors = doctors.filter(department__iexact=department)
+
+    by_month = _monthly_series(appointments, 'date')
+
+    # Cumulative patient count per month; the starting point is everyone who
+    # registered before the range.
+    growth = _monthly_series(patients, 'created_at')
+    running = 0
+    if start:
+        earlier = Patient.objects.filter(created_at__date__lt=start)
+        if department:
+            earlier = earlier.filter(assigned_doctor__department__iexact=department)
+        running = earlier.count()
+    growth_data = []
+    for _, count in growth:
+        running += count
+        growth_data.append(running)
+
+    departments = (
+        appointments.order_by()
+        .values('doctor__department')
+        .annotate(visits=Count('id'))
+        .order_by('-visits')
+    )
+
+    ages = patients.order_by().aggregate(
+        total=Count('id'),
+        **{label: Count('id', filter=condition) for label, condition in AGE_GROUPS}
+    )
+    age_total = ages.pop('total') or 1
+
+    # Revenue is a flat fee per non-cancelled appointment, same as the old
+    # client-side estimate, but for real calendar months.
+    today = date.today()
+    this_month, last_month, next_month = _month_start(today), _month_start(today, 1), _month_start(today, -1)
+    billable = appointments.exclude(status='Cancelled').order_by()
+    revenue = billable.aggregate(
+        # Appointments already booked for later months are not this month's revenue
+        thisMonth=Count('id', filter=Q(date__gte=this_month, date__lt=next_month)),
+        lastMonth=Count('id', filter=Q(date__gte=last_month, date__lt=this_month)),
+    )
+    price = settings.APPOINTMENT_BASE_PRICE
+    this_revenue, last_revenue = revenue['thisMonth'] * price, revenue['lastMonth'] * price
+
+    return {
+        'range': {'start': start, 'end': end, 'department': department},
+        'totalPatients': patients.count(),
+        'totalAppointments': totals['totalAppointments'],
+        'completedVisits': totals['completedVisits'],
+        'activeDoctors': doctors.count(),
+        'appointmentsByMonth': {
+            'labels': [_label(month) for month, _ in by_month],
+            'data': [count for _, count in by_month],
+        },
+        'patientGrowth': {
+            'labels': [_label(month) for month, _ in growth],
+            'data': growth_data,
+        },
+        'departmentStats': [
+            {'department': row['doctor__department'] or 'General', 'visits': row['visits']}
+            for row in departments
+        ],
+        'demographics': [
+            {'range': label, 'percentage': round(ages[label] * 100 / age_total)}
+            for label, _ in AGE_GROUPS
+        ],
+        'revenue': {
+            'thisMonth': this_revenue,
+            'lastMonth': last_revenue,
+            'growth': round((this_revenue - last_revenue) * 100 / last_revenue, 1) if last_revenue else 0,
+        },
+    }
@@ -0,0 +1,283 @@
+"""
+Full-text search: patient typeahead and medical record descriptions.
+
+PostgreSQL searches the tables themselves through expression indexes, so
+there is nothing to keep in sync. SQLite uses FTS5 tables (rowid = the model's
+id) kept in sync by the model signals; bulk_create and raw inserts bypass
+those, so bulk loaders call index_patients()/index_records() themselves.
+
+Patients (/api/patients/search/?q=): every word of the query (3+ characters)
+must appear somewhere in the name, email or phone digits.
+
+* PostgreSQL: a pg_trgm GIN index over one lower-cased search expression,
+  queried with LIKE '%word%'.
+* SQLite: core_patient_search, with the trigram tokenizer.
+
+Scoring every match does not scale (a common surname matches hundreds of
+thousands of patients at 5M), so results come in tiers, newest first within
+each:
+
+* names starting with the query, from their own query on the name prefix
+  index (migration 0015), so a popular word elsewhere cannot crowd them out;
+* then, from the newest SEARCH_CANDIDATES matches of the search index, names
+  with a word starting with the first word of the query, then the rest (email
+  or phone matches).
+
+Words shorter than MIN_WORD_LENGTH cannot be looked up in a trigram index,
+but they are still applied (with LIKE) before the LIMIT, so they narrow the
+candidates instead of filtering an already truncated list.
+
+Medical records (/api/medical-records/search/?q=): web-search style queries
+("quoted phrases", -excluded words), newest first, with highlighted snippets.
+
+* PostgreSQL: a GIN index on to_tsvector('english', description), queried
+  with websearch_to_tsquery.
+* SQLite: core_medicalrecord_search (porter stemming, like the 'english'
+  config). Record type, status, doctor and patient are indexed as tag tokens
+  next to the description, so filters are intersected inside the index and
+  ORDER BY rowid DESC stops after one page instead of materialising every
+  match.
+"""
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.utils.html import escape
+
+from .models import Patient, MedicalRecord
+
+SEARCH_TABLE = 'core_patient_search'
+RECORD_SEARCH_TABLE = 'core_medicalrecord_search'
+SEARCH_CANDIDATES = 200
+MIN_WORD_LENGTH = 3  # shortest fragment a trigram index can look up
+
+# Must match the expressions indexed by migrations 0009 and 0010
+PG_SEARCH_EXPRESSION = (
+    "lower(name || ' ' || email || ' ' || regexp_replace(phone, '[^0-9]', '', 'g'))"
+)
+SQLITE_PHONE_DIGITS = (
+    "replace(replace(replace(replace(replace(replace(phone, '-', ''), ' ', ''), '(', ''), ')', ''), '+', ''), '.', '')"
+)
+PG_RECORD_VECTOR = "to_tsvector('english', description)"
+SQLITE_RECORD_TAGS = (
+    "'type' || lower(replace(record_type, ' ', '')) || ' status' || lower(status) "
+    "|| ' doctor' || doctor_id || ' patient' || patient_id"
+)
+# Highlight markers; the snippet is HTML-escaped before they become <mark>
+MARK_START, MARK_END = '\x02', '\x03'
+
+
+def query_words(query):
+    return re.findall(r'[^\W_]+', query.lower())
+
+
+def _digits(phone):
+    return re.sub(r'\D', '', phone or '')
+
+
+def _reindex(table, select, ids):
+    with connection.cursor() as cursor:
+        if ids is None:
+            cursor.execute(f'DELETE FROM {table}')
+            cursor.execute(f'INSERT INTO {table} {select}')
+            return
+        ids = list(ids)
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ', '.join(['%s'] * len(chunk))
+            cursor.execute(f'DELETE FROM {table} WHERE rowid IN ({placeholders})', chunk)
+            cursor.execute(f'INSERT INTO {table} {select} WHERE id IN ({placeholders})', chunk)
+
+
+def index_patients(ids=None):
+    """
+    (Re)index patients on SQLite, all of them when `ids` is None. Patients
+    that no longer exist are dropped from the index.
+    """
+    if connection.vendor == 'sqlite':
+        _reindex(
+            SEARCH_TABLE,
+            f'(rowid, name, email, phone) SELECT id, name, email, {SQLITE_PHONE_DIGITS} FROM core_patient',
+            ids,
+        )
+
+
+def index_records(ids=None):
+    """(Re)index medical records on SQLite, like index_patients()"""
+    if connection.vendor == 'sqlite':
+        _reindex(
+            RECORD_SEARCH_TABLE,
+            f'(rowid, description, tags) SELECT id, description, {SQLITE_RECORD_TAGS} FROM core_medicalrecord',
+            ids,
+        )
+
+
+def _name_prefix_matches(phrase, limit):
+    """Ids of the newest `limit` patients whose name starts with `phrase`"""
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        return list(Patient.objects.filter(name__istartswith=phrase).order_by('-id').values_list('id', flat=True)[:limit])
+
+    # Words never contain LIKE wildcards, so the phrase needs no escaping
+    column = 'name' if connection.vendor == 'sqlite' else 'lower(name)'
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT id FROM core_patient WHERE {column} LIKE %s ORDER BY id DESC LIMIT %s',
+            [f'{phrase}%', limit],
+        )
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _candidates(words):
+    """(id, name, email, phone) of the newest patients matching every word"""
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        patients = Patient.objects.order_by('-id')
+        for word in words:
+            patients = patients.filter(Q(name__icontains=word) | Q(email__icontains=word) | Q(phone__icontains=word))
+        return list(patients.values_list('id', 'name', 'email', 'phone')[:SEARCH_CANDIDATES])
+
+    indexed = [word for word in words if len(word) >= MIN_WORD_LENGTH]
+    short = [word for word in words if len(word) < MIN_WORD_LENGTH]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # Quoted, so each word is a substring (phrase of trigrams), never FTS syntax
+            match = ' AND '.join(f'"{word}"' for word in indexed)
+            conditions = ''.join([f" AND (name || ' ' || email || ' ' || phone) LIKE %s"] * len(short))
+            cursor.execute(
+                f'SELECT rowid, name, email, phone FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s{conditions} '
+                f'ORDER BY rowid DESC LIMIT %s',
+                [match] + [f'%{word}%' for word in short] + [SEARCH_CANDIDATES],
+            )
+        else:
+            # The trigram index answers the long words; short ones are checked on the rows it returns
+            conditions = ' AND '.join([f'{PG_SEARCH_EXPRESSION} LIKE %s'] * len(words))
+            cursor.execute(
+                f'SELECT id, name, email, phone FROM core_patient WHERE {conditions} ORDER BY id DESC LIMIT %s',
+                [f'%{word}%' for word in words] + [SEARCH_CANDIDATES],
+            )
+        return cursor.fetchall()
+
+
+def search_patients(query, limit):
+    """Ids of the best `limit` patients for a typeahead query, best first"""
+    words = query_words(query)
+    if not any(len(word) >= MIN_WORD_LENGTH for word in words):
+        return []
+    phrase = ' '.join(words)
+
+    ids = _name_prefix_matches(phrase, limit)
+    if len(ids) == limit:
+        return ids
+    found = set(ids)
+
+    ranked = []
+    for pk, name, email, phone in _candidates(words):
+        if pk in found:
+            continue
+        name = name.lower()
+        # SQLite's LIKE only folds ASCII case, so check every word here too
+        text = f'{name} {email.lower()} {_digits(phone)}'
+        if not all(word in text for word in words):
+            continue
+        if name.startswith(phrase):
+            tier = 0
+        elif any(part.startswith(words[0]) for part in name.split()):
+            tier = 1
+        else:
+            tier = 2
+        ranked.append((tier, -pk))
+    ranked.sort()
+    return ids + [-negative_pk for _, negative_pk in ranked[:limit - len(ids)]]
+
+
+def record_terms(query):
+    """(include, exclude) terms of a web-search style query; phrases stay whole"""
+    include, exclude = [], []
+    for phrase, word in re.findall(r'(-?"[^"]*")|(\S+)', query):
+        term = (phrase or word)
+        negative = term.startswith('-')
+        term = term.lstrip('-').strip('"').strip()
+        if re.search(r'[^\W_]', term):
+            (exclude if negative else include).append(term)
+    return include, exclude
+
+
+def _tag(name, value):
+    # Same spelling as SQLITE_RECORD_TAGS
+    return f'{name}{str(value).lower().replace(" ", "")}'
+
+
+def _fts_match(include, exclude, tags):
+    """An FTS5 query; every term is a quoted string, so user input is never FTS syntax"""
+    quote = lambda term: '"' + term.replace('"', '""') + '"'
+    match = 'description : (' + ' AND '.join(quote(term) for term in include) + ')'
+    if exclude:
+        match += ' NOT description : (' + ' OR '.join(quote(term) for term in exclude) + ')'
+    for name, values in tags.items():
+        match += ' AND tags : (' + ' OR '.join(quote(_tag(name, value)) for value in values) + ')'
+    return match
+
+
+def _highlight(snippet):
+    return escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>')
+
+
+def search_records(query, before_id, limit, record_types=(), statuses=(), doctor_id=None, patient_id=None):
+    """
+    (id, snippet) of matching records below `before_id` (None: from the
+    newest), newest first. Snippets are HTML-escaped with the matched terms
+    in <mark>.
+    """
+    include, exclude = record_terms(query)
+    if connection.vendor not in ('sqlite', 'postgresql'):
+        records = MedicalRecord.objects.order_by('-id')
+        for term in include:
+            records = records.filter(description__icontains=term)
+        for term in exclude:
+            records = records.exclude(description__icontains=term)
+        for field, values in (('record_type', record_types), ('status', statuses)):
+            if values:
+                records = records.filter(**{f'{field}__in': values})
+        for field, value in (('doctor_id', doctor_id), ('patient_id', patient_id), ('id__lt', before_id)):
+            if value is not None:
+                records = records.filter(**{field: value})
+        return [(pk, escape(description[:200])) for pk, description in records.values_list('id', 'description')[:limit]]
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            tags = {'type': record_types, 'status': statuses}
+            tags.update({name: [value] for name, value in (('doctor', doctor_id), ('patient', patient_id)) if value})
+            # Snippets are only computed for the rows the LIMIT lets through
+            sql = (
+                f"SELECT rowid, snippet({RECORD_SEARCH_TABLE}, 0, %s, %s, '…', 16) FROM {RECORD_SEARCH_TABLE} "
+                f'WHERE {RECORD_SEARCH_TABLE} MATCH %s'
+            )
+            params = [MARK_START, MARK_END, _fts_match(include, exclude, {name: values for name, values in tags.items() if values})]
+            if before_id is not None:
+                sql += ' AND rowid < %s'
+                params.append(before_id)
+            cursor.execute(f'{sql} ORDER BY rowid DESC LIMIT %s', params + [limit])
+            return [(pk, _highlight(snippet)) for pk, snippet in cursor.fetchall()]
+
+        sql = f"SELECT id FROM core_medicalrecord WHERE {PG_RECORD_VECTOR} @@ websearch_to_tsquery('english', %s)"
+        params = [query]
+        for column, values in (('record_type', record_types), ('status', statuses)):
+            if values:
+                sql += f' AND {column} IN ({", ".join(["%s"] * len(values))})'
+                params.extend(values)
+        for column, value in (('doctor_id', doctor_id), ('patient_id', patient_id), ('id', before_id)):
+            if value is not None:
+                sql += f' AND {column} {"<" if column == "id" else "="} %s'
+                params.append(value)
+        cursor.execute(f'{sql} ORDER BY id DESC LIMIT %s', params + [limit])
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            return []
+        # ts_headline is expensive, so it runs on the page only
+        options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=16, MinWords=6, MaxFragments=2, FragmentDelimiter=" … "'
+        cursor.execute(
+            f"SELECT id, ts_headline('english', description, websearch_to_tsquery('english', %s), %s) "
+            f'FROM core_medicalrecord WHERE id IN ({", ".join(["%s"] * len(ids))})',
+            [query, options] + ids,
+        )
+        snippets = dict(cursor.fetchall())
+        return [(pk, _highlight(snippets.get(pk, ''))) for pk in ids]
@@ -0,0 +1,108 @@
+"""
+Model signal handlers for the core app, connected in CoreConfig.ready().
+"""
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .authentication import revoke_user_tokens
+from .models import User, Patient, Appointment, MedicalRecord, Notification, Tombstone
+from .search import index_patients, index_records
+from .stats import invalidate_doctor_stats
+
+
+@receiver(pre_save, sender=Patient)
+def remember_previous_doctor(sender, instance, **kwargs):
+    """Keep the doctor a patient was assigned to before this save, so both dashboards refresh"""
+    instance._previous_doctor_id = None
+    if instance.pk:
+        instance._previous_doctor_id = (
+            Patient.objects.filter(pk=instance.pk).values_list('assigned_doctor_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def patient_changed(sender, instance, **kwargs):
+    invalidate_doctor_stats(instance.assigned_doctor_id, getattr(instance, '_previous_doctor_id', None))
+
+
+SEARCH_FIELDS = {'name', 'email', 'phone'}
+
+
+@receiver(post_save, sender=Patient)
+@receiver(post_delete, sender=Patient)
+def reindex_patient(sender, instance, update_fields=None, **kwargs):
+    """Keep the SQLite search table in step with the patient (see core/search.py)"""
+    if update_fields is None or SEARCH_FIELDS & set(update_fields):
+        index_patients([instance.pk])
+
+
+@receiver(post_save, sender=MedicalRecord)
+@receiver(post_delete, sender=MedicalRecord)
+def reindex_record(sender, instance, **kwargs):
+    index_records([instance.pk])
+
+
+@receiver(pre_save, sender=Appointment)
+def remember_previous_appointment_doctor(sender, instance, **kwargs):
+    instance._previous_doctor_id = None
+    if instance.pk:
+        instance._previous_doctor_id = (
+            Appointment.objects.filter(pk=instance.pk).values_list('doctor_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Appointment)
+@receiver(post_delete, sender=Appointment)
+def appointment_changed(sender, instance, **kwargs):
+    invalidate_doctor_stats(instance.doctor_id, getattr(instance, '_previous_doctor_id', None))
+
+
+@receiver(post_delete, sender=Patient)
+@receiver(post_delete, sender=Appointment)
+@receiver(post_delete, sender=MedicalRecord)
+@receiver(post_delete, sender=Notification)
+@receiver(post_delete, sender=User)
+def record_tombstone(sender, instance, **kwargs):
+    """
+    Delta-syncing clients (?since=, see core/sync.py) learn about deletes from
+    tombstones, and so do the conditional GET validators (core/conditional.py)
+    """
+    Tombstone.objects.create(model=sender._meta.label_lower, object_id=instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def touch_assigned_patients(sender, instance, **kwargs):
+    """
+    Deleting a doctor nulls assigned_doctor with a bulk UPDATE that skips
+    auto_now, so bump updated_at here for delta sync to pick those patients up
+    """
+    Patient.objects.filter(assigned_doctor_id=instance.pk).update(updated_at=timezone.now())
+
+
+TOKEN_CLAIM_FIELDS = {'role', 'is_verified', 'is_active'}
+
+
+@receiver(pre_save, sender=User)
+def remember_previous_claims(sender, instance, update_fields=None, **kwargs):
+    instance._previous_claims = None
+    if instance.pk and (update_fields is None or TOKEN_CLAIM_FIELDS & set(update_fields)):
+        instance._previous_claims = (
+            User.objects.filter(pk=instance.pk).values_list('role', 'is_verified', 'is_active').first()
+        )
+
+
+@receiver(post_save, sender=User)
+def revoke_stale_tokens(sender, instance, created, **kwargs):
+    """Tokens carry role/is_verified claims, so changing those (or deactivating) revokes them"""
+    previous = getattr(instance, '_previous_claims', None)
+    if created or previous is None:
+        return
+    if not instance.is_active or previous != (instance.role, instance.is_verified, instance.is_active):
+        revoke_user_tokens(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revoke_deleted_user_tokens(sender, instance, **kwargs):
+    revoke_user_tokens(instance.pk)
@@ -0,0 +1,102 @@
+"""
+Dashboard statistics.
+
+`doctor_stats_counts` answers the DoctorDashboard counters with a single
+query, and keeps the result in the cache until a Patient or Appointment
+belonging to that doctor changes (see signals.py). Invalidations only reach
+every worker through a shared cache; with a per-process one the entry is
+kept for at most LOCAL_CACHE_MAX_TIMEOUT seconds instead.
+
+`admin_summary_counts` does the same for the AdminDashboard totals, cached for
+a short fixed time instead since every write in the system would touch it.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import IntegerField, OuterRef, Subquery
+
+from .checks import shared_cache
+from .models import User, Patient, Appointment, MedicalRecord, Notification
+
+
+class SubqueryCount(Subquery):
+    """COUNT(*) of a correlated subquery, without joining it into the outer query"""
+    template = '(SELECT COUNT(*) FROM (%(subquery)s) _count)'
+    output_field = IntegerField()
+
+
+def _cache_key(doctor_id, day):
+    return f'doctor-stats:{doctor_id}:{day.isoformat()}'
+
+
+def _query_doctor_stats(doctor_id, today):
+    # Each counter is a correlated COUNT subquery so it is answered from its own
+    # index ((doctor, date), (doctor, status), ...) while still being a single
+    # round trip. A JOIN with conditional aggregates would have to visit every
+    # appointment the doctor ever had.
+    appointments = Appointment.objects.filter(doctor=OuterRef('pk')).order_by().values('pk')
+    return User.objects.filter(pk=doctor_id).annotate(
+        totalPatients=SubqueryCount(
+            Patient.objects.filter(assigned_doctor=OuterRef('pk')).order_by().values('pk')
+        ),
+        totalAppointments=SubqueryCount(appointments),
+        todaysAppointments=SubqueryCount(appointments.filter(date=today)),
+        pendingAppointments=SubqueryCount(appointments.filter(status='Pending')),
+    ).values('totalPatients', 'totalAppointments', 'todaysAppointments', 'pendingAppointments').get()
+
+
+def doctor_stats_counts(doctor_id):
+    """Counters for the doctor dashboard: zero queries on a cache hit, one on a miss"""
+    today = date.today()
+    timeout = settings.DOCTOR_STATS_CACHE_TIMEOUT
+    if not shared_cache():
+        # Other workers never see this worker's invalidations
+        timeout = min(timeout, settings.LOCAL_CACHE_MAX_TIMEOUT)
+    if not timeout:
+        return _query_doctor_stats(doctor_id, today)
+
+    key = _cache_key(doctor_id, today)
+    stats = cache.get(key)
+    if stats is None:
+        stats = _query_doctor_stats(doctor_id, today)
+        cache.set(key, stats, timeout)
+    return stats
+
+
+def invalidate_doctor_stats(*doctor_ids):
+    keys = [_cache_key(doctor_id, date.today()) for doctor_id in set(doctor_ids) if doctor_id]
+    if keys:
+        cache.delete_many(keys)
+
+
+def _query_admin_summary(anchor_id, today):
+    # The counters are independent tables, so they are hung off a single
+    # indexed row (the requesting user) to fetch them all in one round trip.
+    appointments = Appointment.objects.order_by().values('pk')
+    return User.objects.filter(pk=anchor_id).annotate(
+        totalPatients=SubqueryCount(Patient.objects.order_by().values('pk')),
+        totalDoctors=SubqueryCount(User.objects.filter(role='doctor').order_by().values('pk')),
+        totalAppointments=SubqueryCount(appointments),
+        todaysAppointments=SubqueryCount(appointments.filter(date=today)),
+        pendingRecords=SubqueryCount(MedicalRecord.objects.filter(status='Pending').order_by().values('pk')),
+        unreadNotifications=SubqueryCount(Notification.objects.filter(is_read=False).order_by().values('pk')),
+    ).values(
+        'totalPatients', 'totalDoctors', 'totalAppointments', 'todaysAppointments',
+        'pendingRecords', 'unreadNotifications',
+    ).get()
+
+
+def admin_summary_counts(anchor_id):
+    """Totals for the admin dashboard, cached for ADMIN_SUMMARY_CACHE_TIMEOUT seconds"""
+    today = date.today()
+    timeout = settings.ADMIN_SUMMARY_CACHE_TIMEOUT
+    if not timeout:
+        return _query_admin_summary(anchor_id, today)
+
+    key = f'admin-summary:{today.isoformat()}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = _query_admin_summary(anchor_id, today)
+        cache.set(key, stats, timeout)
+    return stats
@@ -0,0 +1,414 @@
+"""
+Deterministic synthetic data for load testing (`populate_all_data --scale N`).
+
+One unit of scale is 5 doctors, 500 patients, 10,000 appointments and 3,000
+medical records, so --scale 1000 gives 10M appointments. Everything is drawn
+from Randoms derived from the seed, so the same seed and scale give the same
+data whatever the batch size (dates are relative to the day it runs, so
+dashboards always have "today" rows).
+
+Distributions are skewed the way a real clinic is: departments and doctors
+have uneven load, a minority of patients account for most visits, visits grow
+over time, cluster on weekday mornings, and past visits are mostly completed.
+Doctors and patients are written with bulk_create (their keys are needed
+later); appointments and records, the bulk of the rows, with one prepared
+executemany per batch and their indexes built after loading. Only primary
+keys are kept in memory.
+"""
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as dtime, timedelta, timezone as dt_timezone
+from itertools import accumulate
+from random import Random
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models.constants import OnConflict
+
+from .models import User, Patient, Appointment, MedicalRecord
+from .search import index_patients, index_records
+
+UNIT = {'doctors': 5, 'patients': 500, 'appointments': 10_000, 'records': 3_000}
+
+DEPARTMENTS = [
+    ('General Medicine', 25), ('Cardiology', 12), ('Pediatrics', 12), ('Orthopedics', 10),
+    ('Neurology', 8), ('Dermatology', 8), ('Psychiatry', 7), ('Gynecology', 7),
+    ('Oncology', 6), ('ENT', 5),
+]
+CONDITIONS = [
+    (None, 30), ('Hypertension', 14), ('Diabetes Type 2', 10), ('Allergies', 8), ('Asthma', 7),
+    ('Arthritis', 7), ('Migraine', 5), ('Heart Disease', 5), ('Depression', 5),
+    ('Hypothyroidism', 4), ('COPD', 3), ('Chronic Kidney Disease', 2),
+]
+APPOINTMENT_TYPES = [('Consultation', 40), ('Follow-up', 35), ('Check-up', 20), ('Emergency', 5)]
+# Mornings are busiest; the clinic runs 08:00-17:45
+HOURS = [(8, 8), (9, 14), (10, 15), (11, 13), (12, 6), (13, 8), (14, 12), (15, 11), (16, 9), (17, 4)]
+PAST_STATUSES = [('Completed', 82), ('Cancelled', 13), ('Pending', 5)]
+FUTURE_STATUSES = [('Scheduled', 50), ('Confirmed', 35), ('Pending', 10), ('Cancelled', 5)]
+RECORD_TYPES = [('Prescription', 35), ('Diagnosis', 30), ('Lab Report', 25), ('Imaging', 10)]
+
+FIRST_NAMES = [
+    'James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'David', 'Elizabeth',
+    'William', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Priya', 'Wei',
+    'Aarav', 'Fatima', 'Carlos', 'Sofia', 'Kenji', 'Amara', 'Liam', 'Olivia', 'Noah', 'Emma',
+]
+LAST_NAMES = [
+    'Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+    'Wilson', 'Anderson', 'Taylor', 'Thomas', 'Moore', 'Patel', 'Chen', 'Kim', 'Nguyen', 'Okafor',
+    'Sharma', 'Lopez', 'Clark', 'Lewis', 'Walker', 'Hall', 'Young', 'Singh', 'Rossi', 'Novak',
+]
+NOTES = [
+    'Patient requested a morning slot.', 'Bring previous test results.', 'Fasting required.',
+    'Referred by primary care.', 'Interpreter requested.', 'Review medication dosage.',
+]
+# Sentences a record description is assembled from; lengths vary like real notes
+RECORD_SENTENCES = {
+    'Diagnosis': [
+        'Patient presents with intermittent chest discomfort on exertion.',
+        'Symptoms have been present for approximately three weeks.',
+        'Physical examination unremarkable apart from mild tachycardia.',
+        'Differential includes viral infection and early-stage hypertension.',
+        'Findings consistent with acute bronchitis.',
+        'Recommend follow-up in two weeks if symptoms persist.',
+        'Patient advised on diet, exercise and sleep hygiene.',
+        'No red-flag symptoms reported.',
+    ],
+    'Lab Report': [
+        'Complete blood count within normal range.',
+        'Fasting glucose 126 mg/dL, HbA1c 6.8%.',
+        'LDL cholesterol 140 mg/dL, HDL 45 mg/dL, triglycerides 180 mg/dL.',
+        'TSH 2.5 mIU/L, free T4 within reference range.',
+        'Creatinine mildly elevated at 1.4 mg/dL; eGFR 58.',
+        'Urinalysis negative for protein and blood.',
+        'Sample haemolysed; repeat draw recommended.',
+    ],
+    'Prescription': [
+        'Lisinopril 10mg once daily.',
+        'Metformin 500mg twice daily with meals.',
+        'Ibuprofen 400mg as needed, maximum three times daily.',
+        'Albuterol inhaler, two puffs every four to six hours as needed.',
+        'Continue current dosage and review in one month.',
+        'Patient counselled on possible side effects.',
+        'Refills: 2.',
+    ],
+    'Imaging': [
+        'Chest X-ray: lungs clear, no abnormalities detected.',
+        'MRI brain: no structural abnormalities or lesions.',
+        'Knee X-ray shows mild osteoarthritis of the right joint.',
+        'Echocardiogram: normal function, ejection fraction 60%.',
+        'Comparison with prior study shows no interval change.',
+        'Recommend clinical correlation.',
+    ],
+}
+
+
+class _Weighted:
+    """rng.choices with precomputed cumulative weights"""
+
+    def __init__(self, pairs):
+        pairs = list(pairs)
+        self.values = [value for value, _ in pairs]
+        self.cum_weights = list(accumulate(weight for _, weight in pairs))
+
+    def sample(self, rng, k=1):
+        return rng.choices(self.values, cum_weights=self.cum_weights, k=k)
+
+
+def _insert_rows(model, columns, rows, ignore_conflicts=False):
+    """
+    executemany() a batch of already-adapted tuples; returns the rows written.
+    For the two big tables bulk_create spends ~90% of its time compiling
+    per-value SQL, capping out near 9k rows/s; a single prepared INSERT is
+    several times faster.
+    """
+    ops = connection.ops
+    on_conflict = OnConflict.IGNORE if ignore_conflicts else None
+    sql = '{} {} ({}) VALUES ({}) {}'.format(
+        ops.insert_statement(on_conflict=on_conflict),
+        ops.quote_name(model._meta.db_table),
+        ', '.join(ops.quote_name(model._meta.get_field(column).column) for column in columns),
+        ', '.join(['%s'] * len(columns)),
+        ops.on_conflict_suffix_sql([], on_conflict, None, None),
+    )
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.executemany(sql, rows)
+        return cursor.rowcount
+
+
+@contextmanager
+def _bulk_load_settings():
+    """
+    Connection settings for the load only. A crash can at worst lose the last
+    few batches of throwaway data, never corrupt the database.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'sqlite':
+            # The default 2MB page cache thrashes on the foreign key indexes
+            # once they outgrow it; fsync per batch is most of the rest.
+            cursor.execute('PRAGMA cache_size')
+            cache_size = cursor.fetchone()[0]
+            cursor.execute('PRAGMA synchronous')
+            synchronous = cursor.fetchone()[0]
+            cursor.execute('PRAGMA cache_size = -262144')  # 256MB
+            cursor.execute('PRAGMA synchronous = OFF')
+        elif connection.vendor == 'postgresql':
+            cursor.execute('SET synchronous_commit = off')
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                cursor.execute(f'PRAGMA cache_size = {int(cache_size)}')
+                cursor.execute(f'PRAGMA synchronous = {int(synchronous)}')
+            elif connection.vendor == 'postgresql':
+                cursor.execute('RESET synchronous_commit')
+
+
+@contextmanager
+def _deferred_indexes(*models):
+    """
+    Drop the Meta indexes while loading and build them once at the end: one
+    sort instead of millions of random B-tree inserts. They are restored even
+    if generation fails.
+    """
+    with connection.schema_editor() as schema_editor:
+        for model in models:
+            for index in model._meta.indexes:
+                schema_editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        with connection.schema_editor() as schema_editor:
+            for model in models:
+                for index in model._meta.indexes:
+                    schema_editor.add_index(model, index)
+
+
+@contextmanager
+def _explicit_timestamps(*models):
+    """Let bulk_create keep the generated created_at/updated_at instead of auto_now(_add)"""
+    created = [model._meta.get_field('created_at') for model in models]
+    updated = [model._meta.get_field('updated_at') for model in models]
+    for field in created:
+        field.auto_now_add = False
+    for field in updated:
+        field.auto_now = False
+    try:
+        yield
+    finally:
+        for field in created:
+            field.auto_now_add = True
+        for field in updated:
+            field.auto_now = True
+
+
+class SyntheticDataGenerator:
+    def __init__(self, scale, seed=42, years=3, batch_size=5000, log=None):
+        self.counts = {name: max(1, round(per_unit * scale)) for name, per_unit in UNIT.items()}
+        self.seed = seed
+        self.batch_size = batch_size
+        self.log = log or (lambda message: None)
+        self.today = date.today()
+        self.span = years * 365
+        self.first_day = self.today - timedelta(days=self.span)
+
+    def stream(self, name):
+        """
+        An independent Random per table/column. Columns drawn a batch at a time
+        get their own stream so the data does not depend on the batch size.
+        """
+        return Random(f'{self.seed}:{name}')
+
+    def growing_day(self, rng):
+        """A day in the last `years` (or the next 60 days), denser towards today"""
+        # sqrt(u) gives a linearly increasing density: the clinic has grown
+        day = self.first_day + timedelta(days=int((self.span + 60) * rng.random() ** 0.5))
+        weekday = day.weekday()
+        if weekday >= 5 and rng.random() < 0.9:
+            day += timedelta(days=7 - weekday)
+        return day
+
+    def stamp(self, day, hour=12):
+        return datetime.combine(day, dtime(hour), tzinfo=dt_timezone.utc)
+
+    def name(self, rng):
+        return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+    def generate(self):
+        if User.objects.filter(username__startswith=f'synth{self.seed}_').exists():
+            raise ValueError(f'Synthetic data for seed {self.seed} already exists; use a fresh database or another seed')
+        with _bulk_load_settings():
+            with _explicit_timestamps(Patient):
+                self.create_doctors()
+                self.create_patients()
+            with _deferred_indexes(Appointment, MedicalRecord):
+                self.create_appointments()
+                self.create_records()
+                started = time.perf_counter()
+            self.log(f'✅ Indexes rebuilt in {time.perf_counter() - started:.1f}s')
+        return self.counts
+
+    def _timed(self, label, total, write_batches):
+        started = time.perf_counter()
+        written, next_report = 0, total / 10
+        for size in write_batches:
+            written += size
+            if written >= next_report and written < total:
+                self.log(f'  {label}: {written:,}/{total:,}')
+                next_report += total / 10
+        elapsed = time.perf_counter() - started
+        self.log(f'✅ {total:,} {label} in {elapsed:.1f}s ({total / max(elapsed, 1e-9):,.0f} rows/s)')
+
+    def create_doctors(self):
+        rng = self.stream('doctors')
+        departments = _Weighted(DEPARTMENTS)
+        password = make_password('doctor123')  # hashed once, shared by every synthetic doctor
+        joined = self.stamp(self.first_day)
+        doctors = []
+        for i in range(self.counts['doctors']):
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            doctors.append(User(
+                username=f'synth{self.seed}_dr_{i}',
+                email=f'synth{self.seed}.dr{i}@medicare.com',
+                password=password,
+                first_name=first,
+                last_name=last,
+                role='doctor',
+                department=departments.sample(rng)[0],
+                phone=f'555-{rng.randrange(10000):04d}',
+                date_joined=joined,
+            ))
+        self.doctor_ids = [doctor.pk for doctor in User.objects.bulk_create(doctors, batch_size=self.batch_size)]
+        # Some doctors are far busier than others (Zipf-like), but even the
+        # busiest stays within a day's slots at --scale 1000
+        self.doctor_choice = _Weighted((pk, 1 / (rank + 1) ** 0.3) for rank, pk in enumerate(self.doctor_ids))
+        self.log(f'✅ {len(self.doctor_ids):,} doctors')
+
+    def create_patients(self):
+        self.patient_ids, self.patient_doctors, activity = [], [], []
+        self._timed('patients', self.counts['patients'], self._patient_batches(activity))
+        # A minority of patients account for most visits
+        self.patient_choice = _Weighted(zip(range(len(self.patient_ids)), activity))
+
+    def _patient_batches(self, activity):
+        rng = self.stream('patients')
+        doctor_rng, gender_rng, condition_rng = (self.stream(f'patients.{c}') for c in ('doctor', 'gender', 'condition'))
+        conditions = _Weighted(CONDITIONS)
+        genders = _Weighted([('Female', 50), ('Male', 48), ('Other', 2)])
+        total = self.counts['patients']
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            doctors = self.doctor_choice.sample(doctor_rng, size)
+            batch = []
+            for offset, doctor_id, gender, condition in zip(
+                range(size), doctors, genders.sample(gender_rng, size), conditions.sample(condition_rng, size)
+            ):
+                i = start + offset
+                patient = Patient(
+                    name=self.name(rng),
+                    email=f'synth{self.seed}.patient{i}@example.com',
+                    phone=f'555-{rng.randrange(10000):04d}',
+                    age=min(99, max(0, int(rng.gauss(45, 20)))),
+                    gender=gender,
+                    condition=condition,
+                    assigned_doctor_id=doctor_id,
+                    status='Active' if rng.random() < 0.9 else 'Inactive',
+                    created_at=self.stamp(self.growing_day(rng)),
+                )
+                patient.updated_at = patient.created_at
+                batch.append(patient)
+                activity.append(rng.lognormvariate(0, 1))
+            with transaction.atomic():
+                Patient.objects.bulk_create(batch)
+                index_patients(patient.pk for patient in batch)
+            self.patient_ids.extend(patient.pk for patient in batch)
+            self.patient_doctors.extend(doctors)
+            yield size
+
+    def create_appointments(self):
+        self.double_booked = 0
+        self._timed('appointments', self.counts['appointments'], self._appointment_batches())
+        if self.double_booked:
+            # appt_unique_active_slot: a drawn slot the doctor already had is dropped
+            self.counts['appointments'] -= self.double_booked
+            self.log(f'  skipped {self.double_booked:,} draws for slots the doctor already had booked')
+
+    def _appointment_batches(self):
+        rng = self.stream('appointments')
+        streams = [self.stream(f'appointments.{c}') for c in ('patient', 'type', 'hour', 'past', 'future')]
+        ops = connection.ops
+        types, hours = _Weighted(APPOINTMENT_TYPES), _Weighted(HOURS)
+        past, future = _Weighted(PAST_STATUSES), _Weighted(FUTURE_STATUSES)
+        slots = {
+            (hour, minute): ops.adapt_timefield_value(dtime(hour, minute))
+            for hour, _ in HOURS for minute in (0, 15, 30, 45)
+        }
+        days, booked_stamps = {}, {}
+        columns = ['patient_id', 'doctor_id', 'date', 'time', 'type', 'status', 'notes', 'created_at', 'updated_at']
+        total = self.counts['appointments']
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            rows = []
+            for patient, kind, hour, past_status, future_status in zip(
+                *(choice.sample(stream, size) for choice, stream in zip(
+                    (self.patient_choice, types, hours, past, future), streams
+                )),
+            ):
+                day = self.growing_day(rng)
+                # Mostly seen by their own doctor
+                doctor_id = self.patient_doctors[patient] if rng.random() < 0.85 else self.doctor_choice.sample(rng)[0]
+                status = past_status if day < self.today else future_status
+                booked = min(day - timedelta(days=int(rng.expovariate(1 / 10))), self.today)
+                if day not in days:
+                    days[day] = ops.adapt_datefield_value(day)
+                if booked not in booked_stamps:
+                    booked_stamps[booked] = ops.adapt_datetimefield_value(self.stamp(booked, 9))
+                rows.append((
+                    self.patient_ids[patient],
+                    doctor_id,
+                    days[day],
+                    slots[hour, rng.choice((0, 15, 30, 45))],
+                    kind,
+                    status,
+                    rng.choice(NOTES) if rng.random() < 0.3 else None,
+                    booked_stamps[booked],
+                    booked_stamps[booked],
+                ))
+            self.double_booked += size - _insert_rows(Appointment, columns, rows, ignore_conflicts=True)
+            yield size
+
+    def create_records(self):
+        self._timed('medical records', self.counts['records'], self._record_batches())
+        # Raw inserts send no signals; index them for search in one pass
+        started = time.perf_counter()
+        index_records()
+        self.log(f'✅ Record search index built in {time.perf_counter() - started:.1f}s')
+
+    def _record_batches(self):
+        rng = self.stream('records')
+        patient_rng, type_rng = self.stream('records.patient'), self.stream('records.type')
+        ops = connection.ops
+        record_types = _Weighted(RECORD_TYPES)
+        columns = ['patient_id', 'doctor_id', 'record_type', 'description', 'status', 'created_at', 'updated_at']
+        total = self.counts['records']
+        for start in range(0, total, self.batch_size):
+            size = min(self.batch_size, total - start)
+            rows = []
+            for patient, record_type in zip(self.patient_choice.sample(patient_rng, size), record_types.sample(type_rng, size)):
+                # Mostly a line or two, occasionally a long note
+                sentences = min(40, max(1, int(rng.lognormvariate(1, 0.8))))
+                day = min(self.growing_day(rng), self.today)
+                description = ' '.join(rng.choices(RECORD_SENTENCES[record_type], k=sentences))
+                status = 'Completed' if rng.random() < 0.8 else 'Pending'
+                created = ops.adapt_datetimefield_value(self.stamp(day, rng.randrange(8, 18)))
+                rows.append((
+                    self.patient_ids[patient],
+                    self.patient_doctors[patient],
+                    record_type,
+                    description,
+                    status,
+                    created,
+                    created,
+                ))
+            _insert_rows(MedicalRecord, columns, rows)
+            yield size
@@ -1,3 +1,1445 @@
-from django.test import TestCase
+import asyncio
+import csv
+import gzip
+import io
+import json
+import logging
+import multiprocessing
+import socket
+import socketserver
+import tempfile
+import threading
+import time as time_module
+from datetime import date, time, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connection
+from django.http import HttpResponse
+from django.test import LiveServerTestCase, RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .models import User, Patient, Appointment, MedicalRecord, Notification, EmailOutbox, DoctorSchedule, Tombstone
+from . import benchmark, loadtest, metrics, profiling
+from .budget import QueryBudgetExceeded, fingerprint, query_budget
+from .checks import stateless_auth_needs_shared_cache, throttles_need_shared_cache
+from .middleware import _QueryRecorder
+from .outbox import queue_email, send_pending
+from .search import SEARCH_CANDIDATES, index_patients
+from .sync import _encode_token
+from .synthetic import SyntheticDataGenerator
+
+
+# One JSON line per request would drown the test output (see core/middleware.py)
+logging.getLogger('core.performance').setLevel(logging.WARNING)
+
+
+def make_user(username, role, **extra):
+    return User.objects.create_user(
+        username=username,
+        email=f'{username}@medicare.com',
+        password='secret123',
+        first_name=username.title(),
+        last_name='Test',
+        role=role,
+        **extra
+    )
+
+
+def seed_clinic(doctor, patients=10, appointments_per_patient=3):
+    """Create patients assigned to `doctor` with appointments, records and notifications"""
+    created = []
+    start = Patient.objects.filter(assigned_doctor=doctor).count()
+    for i in range(start, start + patients):
+        patient_user = make_user(f'patient{doctor.id}_{i}', 'patient')
+        patient = Patient.objects.create(
+            user=patient_user,
+            name=f'Patient {i}',
+            email=f'p{doctor.id}_{i}@example.com',
+            phone='555-0000',
+            age=30 + i % 40,
+            assigned_doctor=doctor,
+        )
+        for j in range(appointments_per_patient):
+            Appointment.objects.create(
+                patient=patient,
+                doctor=doctor,
+                date=date(2025, 1, 1) + timedelta(days=(i + j) % 5),
+                time=time(9 + j % 8, i % 60),
+            )
+            MedicalRecord.objects.create(
+                patient=patient,
+                doctor=doctor,
+                record_type='Diagnosis',
+                description=f'Record {j} for patient {i}',
+            )
+        Notification.objects.create(
+            notification_type='general',
+            title=f'Notice {i}',
+            message='Hello',
+            user=patient_user,
+        )
+        created.append(patient)
+    return created
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+    QUERY_BUDGET_RAISE=True,
+)
+class APITestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = make_user('admin', 'admin')
+        cls.doctor = make_user('doctor', 'doctor', department='Cardiology')
+        cls.patients = seed_clinic(cls.doctor)
+
+    def setUp(self):
+        cache.clear()
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+
+class CursorPaginationTests(APITestCase):
+    def walk(self, client, url, page_size):
+        ids, cursor, pages = [], None, 0
+        while True:
+            params = {'page_size': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            body = client.get(url, params).json()
+            ids.extend(row['id'] for row in body['data'])
+            pages += 1
+            cursor = body['pagination']['next']
+            if not cursor:
+                return ids, pages, body
+
+    def test_pages_cover_full_list_in_order(self):
+        client = self.client_for(self.admin)
+        for url in ['/api/patients/', '/api/appointments/', '/api/medical-records/', '/api/notifications/']:
+            full = [row['id'] for row in client.get(url).json()['data']]
+            paged, pages, _ = self.walk(client, url, 7)
+            self.assertEqual(paged, full, url)
+            self.assertEqual(pages, -(-len(full) // 7), url)
+
+    def test_doctor_endpoints_paginate(self):
+        client = self.client_for(self.doctor)
+        for url in ['/api/doctor/patients/', '/api/doctor/appointments/']:
+            full = [row['id'] for row in client.get(url).json()['data']]
+            paged, _, _ = self.walk(client, url, 4)
+            self.assertEqual(paged, full, url)
+
+    def test_previous_cursor_returns_prior_page(self):
+        client = self.client_for(self.admin)
+        first = client.get('/api/appointments/', {'page_size': 5}).json()
+        self.assertIsNone(first['pagination']['previous'])
+        second = client.get('/api/appointments/', {'page_size': 5, 'cursor': first['pagination']['next']}).json()
+        back = client.get('/api/appointments/', {'page_size': 5, 'cursor': second['pagination']['previous']}).json()
+        self.assertEqual([r['id'] for r in back['data']], [r['id'] for r in first['data']])
+        self.assertIsNone(back['pagination']['previous'])
+
+    def test_unpaginated_request_keeps_legacy_shape(self):
+        body = self.client_for(self.admin).get('/api/patients/').json()
+        self.assertNotIn('pagination', body)
+        self.assertEqual(len(body['data']), len(self.patients))
+
+    def test_bad_cursor_and_page_size(self):
+        client = self.client_for(self.admin)
+        self.assertEqual(client.get('/api/appointments/', {'cursor': 'not-a-cursor'}).status_code, 400)
+        self.assertEqual(client.get('/api/appointments/', {'page_size': '0'}).status_code, 400)
+
+
+class ListFilterTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = make_user('doctor2', 'doctor')
+        seed_clinic(cls.other, patients=3)
+        Appointment.objects.filter(doctor=cls.doctor, date=date(2025, 1, 1)).update(status='Cancelled')
+        Appointment.objects.filter(doctor=cls.doctor, date=date(2025, 1, 2)).update(status='Completed', type='Follow-up')
+        MedicalRecord.objects.filter(doctor=cls.other).update(record_type='Imaging', status='Completed')
+
+    def test_appointment_filters_match_queryset(self):
+        client = self.client_for(self.admin)
+        body = client.get('/api/appointments/', {
+            'doctor': self.doctor.id, 'status': 'Scheduled,Completed', 'date_from': '2025-01-02', 'date_to': '2025-01-04',
+        }).json()
+        expected = Appointment.objects.filter(
+            doctor=self.doctor, status__in=['Scheduled', 'Completed'], date__range=(date(2025, 1, 2), date(2025, 1, 4))
+        )
+        self.assertEqual({row['id'] for row in body['data']}, set(expected.values_list('id', flat=True)))
+
+        patient = self.patients[0]
+        body = client.get(f'/api/appointments/?patient={patient.id}&type=Follow-up&type=Consultation').json()
+        self.assertEqual(len(body['data']), patient.appointments.count())
+
+    def test_facets_ignore_their_own_filter(self):
+        body = self.client_for(self.admin).get('/api/appointments/', {
+            'doctor': self.doctor.id, 'status': 'Cancelled', 'facets': 'status,type',
+        }).json()
+        mine = Appointment.objects.filter(doctor=self.doctor)
+        self.assertEqual(body['facets']['status'], {
+            value: mine.filter(status=value).count() for value in ['Scheduled', 'Cancelled', 'Completed']
+        })
+        # The type facet is narrowed by the status filter
+        self.assertEqual(body['facets']['type'], {'Consultation': mine.filter(status='Cancelled').count()})
+        self.assertEqual(sum(body['facets']['status'].values()), mine.count())
+        self.assertTrue(all(row['status'] == 'Cancelled' for row in body['data']))
+
+    def test_sort_and_cursor(self):
+        client = self.client_for(self.admin)
+        # Several statuses are paged by merging one index scan per status
+        statuses = 'Scheduled,Completed,Cancelled'
+        full = [row['id'] for row in client.get('/api/appointments/', {'sort': 'date', 'status': statuses}).json()['data']]
+        expected = Appointment.objects.filter(status__in=statuses.split(',')).order_by('date', 'time', 'id')
+        self.assertEqual(full, list(expected.values_list('id', flat=True)))
+
+        pages, cursor = [], None
+        while True:
+            params = {'sort': 'date', 'status': statuses, 'page_size': 4}
+            if cursor:
+                params['cursor'] = cursor
+            body = client.get('/api/appointments/', params).json()
+            pages.append(body)
+            cursor = body['pagination']['next']
+            if not cursor:
+                break
+        self.assertEqual([row['id'] for page in pages for row in page['data']], full)
+        back = client.get('/api/appointments/', {
+            'sort': 'date', 'status': statuses, 'page_size': 4, 'cursor': pages[2]['pagination']['previous'],
+        }).json()
+        self.assertEqual(back['data'], pages[1]['data'])
+
+        # A repeated value is one partition, not two copies of every row
+        repeated = client.get('/api/appointments/?sort=date&status=Scheduled,Completed&status=Scheduled&page_size=20').json()
+        expected_ids = list(expected.exclude(status='Cancelled').values_list('id', flat=True)[:20])
+        self.assertEqual([row['id'] for row in repeated['data']], expected_ids)
+
+        # A cursor minted for one sort order is refused under another
+        first = client.get('/api/appointments/', {'sort': 'date', 'page_size': 4}).json()
+        response = client.get('/api/appointments/', {'page_size': 4, 'cursor': first['pagination']['next']})
+        self.assertEqual(response.status_code, 400)
+
+    def test_medical_record_filters_and_facets(self):
+        client = self.client_for(self.admin)
+        today = date.today().isoformat()
+        body = client.get('/api/medical-records/', {
+            'record_type': 'Imaging', 'date_from': today, 'date_to': today, 'sort': 'created_at', 'facets': 'record_type,status',
+        }).json()
+        imaging = MedicalRecord.objects.filter(doctor=self.other).order_by('created_at', 'id')
+        self.assertEqual([row['id'] for row in body['data']], list(imaging.values_list('id', flat=True)))
+        self.assertEqual(body['facets']['record_type'], {
+            'Imaging': imaging.count(), 'Diagnosis': MedicalRecord.objects.filter(doctor=self.doctor).count(),
+        })
+        self.assertEqual(body['facets']['status'], {'Completed': imaging.count()})
+
+        yesterday = (date.today() - timedelta(days=1)).isoformat()
+        body = client.get('/api/medical-records/', {'date_to': yesterday, 'doctor': self.doctor.id}).json()
+        self.assertEqual(body['data'], [])
+
+    def test_invalid_filters(self):
+        client = self.client_for(self.admin)
+        for params in [{'status': 'Lost'}, {'date_from': '01/02/2025'}, {'doctor': 'me'}, {'sort': 'name'}, {'facets': 'doctor'}]:
+            response = client.get('/api/appointments/', params)
+            self.assertEqual(response.status_code, 400, params)
+            self.assertFalse(response.json()['success'])
+        self.assertEqual(client.get('/api/medical-records/', {'record_type': 'X-ray'}).status_code, 400)
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class DeltaSyncTests(APITestCase):
+    def test_since_returns_changes_and_deletes(self):
+        client = self.client_for(self.admin)
+        for url in ['/api/patients/', '/api/appointments/', '/api/medical-records/', '/api/notifications/']:
+            token = client.get(url).json()['since']
+            body = client.get(url, {'since': token}).json()
+            self.assertEqual((body['data'], body['deleted']), ([], []), url)
+
+        token = client.get('/api/patients/').json()['since']
+        changed, removed = self.patients[0], self.patients[1]
+        changed.condition = 'Asthma'
+        changed.save()
+        removed_id = removed.id
+        removed.delete()
+        body = client.get('/api/patients/', {'since': token}).json()
+        self.assertEqual([row['id'] for row in body['data']], [changed.id])
+        self.assertEqual(body['deleted'], [removed_id])
+        self.assertEqual(client.get('/api/patients/', {'since': body['since']}).json()['data'], [])
+
+        # Cascaded deletes leave tombstones too
+        deleted = client.get('/api/appointments/', {'since': token}).json()['deleted']
+        self.assertEqual(len(deleted), 3)
+
+    def test_delta_ignores_filters_and_pagination(self):
+        client = self.client_for(self.admin)
+        token = client.get('/api/appointments/', {'status': 'Scheduled', 'page_size': 5}).json()['since']
+        appointment = Appointment.objects.filter(status='Scheduled').first()
+        appointment.status = 'Cancelled'
+        appointment.save()
+        body = client.get('/api/appointments/', {'since': token, 'status': 'Scheduled', 'page_size': 5}).json()
+        self.assertEqual([(row['id'], row['status']) for row in body['data']], [(appointment.id, 'Cancelled')])
+        self.assertNotIn('pagination', body)
+
+    def test_bulk_updates_bump_updated_at(self):
+        client = self.client_for(self.admin)
+        user = User.objects.create_user('pending', email='pending@example.com', role='patient', is_verified=False)
+        notification = Notification.objects.create(notification_type='patient_registration', title='New', message='Hi', user=user)
+        token = client.get('/api/notifications/').json()['since']
+        client.post(f'/api/verify-patient/{user.id}/', {'action': 'approve'}, format='json')
+        rows = client.get('/api/notifications/', {'since': token}).json()['data']
+        self.assertEqual([(row['id'], row['is_read']) for row in rows], [(notification.id, True)])
+
+    def test_invalid_and_expired_tokens(self):
+        client = self.client_for(self.admin)
+        self.assertEqual(client.get('/api/patients/', {'since': 'not-a-token'}).status_code, 400)
+        expired = _encode_token(timezone.now() - timedelta(days=31))
+        self.assertEqual(client.get('/api/patients/', {'since': expired}).status_code, 410)
+
+    def test_prune_tombstones(self):
+        self.patients[0].delete()
+        Tombstone.objects.update(deleted_at=timezone.now() - timedelta(days=31))
+        kept = self.patients[1].id
+        self.patients[1].delete()
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(list(Tombstone.objects.filter(model='core.patient').values_list('object_id', flat=True)), [kept])
+
+
+@override_settings(SYNC_OVERLAP_SECONDS=0)
+class ConditionalGetTests(APITestCase):
+    def test_unchanged_resources_answer_304(self):
+        client = self.client_for(self.admin)
+        for url in ['/api/doctors/', '/api/patients/', f'/api/patients/{self.patients[0].id}/', '/api/auth/profile/',
+                    '/api/appointments/?status=Scheduled', '/api/notifications/']:
+            first = client.get(url)
+            self.assertEqual(first.status_code, 200, url)
+            self.assertIn('no-cache', first['Cache-Control'])
+            with CaptureQueriesContext(connection) as ctx:
+                again = client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual((again.status_code, again.content), (304, b''), url)
+            self.assertEqual(len(ctx.captured_queries), 1, url)
+            self.assertEqual(client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified']).status_code, 304, url)
+
+    def test_changes_and_deletes_change_the_etag(self):
+        client = self.client_for(self.admin)
+        etag = client.get('/api/appointments/')['ETag']
+        self.patients[0].name = 'Renamed'
+        self.patients[0].save()  # appointment rows show the patient's name
+        renamed = client.get('/api/appointments/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(renamed.status_code, 200)
+        Appointment.objects.filter(pk=Appointment.objects.order_by('id').first().pk).delete()
+        self.assertEqual(client.get('/api/appointments/', HTTP_IF_NONE_MATCH=renamed['ETag']).status_code, 200)
+
+    def test_no_validators_for_errors_other_users_or_fresh_changes(self):
+        self.assertNotIn('ETag', self.client_for(self.admin).get('/api/patients/999999/'))
+        self.assertNotIn('ETag', self.client_for(self.doctor).get('/api/notifications/'))
+        self.assertNotEqual(
+            self.client_for(self.admin).get('/api/patients/')['ETag'],
+            self.client_for(self.doctor).get('/api/patients/')['ETag'],
+        )
+        with override_settings(SYNC_OVERLAP_SECONDS=60):
+            self.assertNotIn('ETag', self.client_for(self.admin).get('/api/patients/'))
+
+    def test_wrong_role_is_refused_even_with_a_matching_validator(self):
+        last_modified = self.client_for(self.admin).get('/api/notifications/')['Last-Modified']
+        for user, url in [(self.doctor, '/api/notifications/'), (self.admin, '/api/doctor/appointments/'),
+                          (self.patients[0].user, '/api/doctor/patients/')]:
+            client = self.client_for(user)
+            for headers in ({'HTTP_IF_MODIFIED_SINCE': last_modified}, {'HTTP_IF_NONE_MATCH': '*'}):
+                response = client.get(url, **headers)
+                self.assertEqual(response.status_code, 403, url)
+                self.assertNotIn('Last-Modified', response)
+
+
+class PerformanceMiddlewareTests(APITestCase):
+    @override_settings(PERF_SERVER_TIMING=True)
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs('core.performance', 'INFO') as logs:
+            response = self.client_for(self.admin).get('/api/patients/')
+        self.assertRegex(response['Server-Timing'], r'^total;dur=[\d.]+, db;dur=[\d.]+;desc="2 queries"$')
+        line = json.loads(logs.output[-1].split(':', 2)[2])
+        self.assertEqual(
+            {key: line[key] for key in ('method', 'path', 'view', 'status', 'queries', 'bytes')},
+            {'method': 'GET', 'path': '/api/patients/', 'view': 'patient-list', 'status': 200,
+             'queries': 2, 'bytes': len(response.content)},
+        )
+
+    @override_settings(PERF_SLOW_REQUEST_MS=0, PERF_SLOW_SQL_LIMIT=1)
+    def test_slow_requests_dump_their_sql_without_parameters(self):
+        with self.assertLogs('core.performance', 'WARNING') as logs:
+            self.client_for(self.admin).get(f'/api/patients/{self.patients[0].id}/')
+        line = json.loads(logs.output[-1].split(':', 2)[2])
+        self.assertTrue(line['slow'])
+        self.assertEqual(len(line['sql']), 1)
+        self.assertTrue(line['sql_truncated'])
+        self.assertNotIn(self.patients[0].email, logs.output[-1])
+
+    def test_recorder_keeps_the_slowest_statements(self):
+        recorder = _QueryRecorder(keep=2)
+        for sql, seconds in [('fast 1', 0), ('slow 1', 0.03), ('fast 2', 0), ('slow 2', 0.02), ('fast 3', 0)]:
+            recorder(lambda *args, seconds=seconds: time_module.sleep(seconds), sql, None, False, {})
+        self.assertEqual(recorder.count, 5)
+        self.assertEqual([sql for _, sql in sorted(recorder.statements, reverse=True)], ['slow 1', 'slow 2'])
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_server_timing_can_be_disabled(self):
+        self.assertNotIn('Server-Timing', self.client_for(self.admin).get('/api/doctors/'))
+
+
+class MetricsTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(METRICS_DIR=directory.name, METRICS_TOKEN='scrape-me')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def scrape(self, token='scrape-me'):
+        return APIClient().get('/api/metrics', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def test_requests_are_counted_per_view(self):
+        client = self.client_for(self.admin)
+        for _ in range(3):
+            client.get('/api/doctors/')
+        client.get('/api/patients/999999/')
+        text = self.scrape().content.decode()
+        self.assertIn('medicare_http_requests_total{view="doctor-list",method="GET",status="200"} 3', text)
+        self.assertIn('medicare_http_requests_total{view="patient-detail",method="GET",status="404"} 1', text)
+        self.assertIn('medicare_http_request_duration_seconds_bucket{view="doctor-list",le="+Inf"} 3', text)
+        self.assertIn('medicare_http_request_queries_count{view="doctor-list"} 3', text)
+
+    def test_workers_are_summed(self):
+        context = multiprocessing.get_context('fork')
+        workers = [
+            context.Process(target=metrics.observe_request, args=('doctor-list', 'GET', 200, 0.02, 0.01, 2))
+            for _ in range(3)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        metrics.observe_request('doctor-list', 'GET', 200, 0.2, 0.01, 30)
+        text = metrics.render()
+        self.assertIn('medicare_http_requests_total{view="doctor-list",method="GET",status="200"} 4', text)
+        self.assertIn('medicare_http_request_duration_seconds_bucket{view="doctor-list",le="0.025"} 3', text)
+        self.assertIn('medicare_http_request_queries_bucket{view="doctor-list",le="2.0"} 3', text)
+        self.assertIn('medicare_http_request_queries_sum{view="doctor-list"} 36', text)
+
+    def test_store_grows_and_reopens(self):
+        path = f'{settings.METRICS_DIR}/store.db'
+        store = metrics.MmapStore(path)
+        for i in range(5000):
+            store.add(f'key-{i}', i)
+        store.add('key-1', 1)
+        store.close()
+        store = metrics.MmapStore(path)
+        store.add('key-4999', 1)
+        self.assertEqual(dict((k, v) for k, v, _ in metrics._entries(store._map, store._used))['key-4999'], 5000)
+        self.assertEqual(metrics.collect()['key-1'], 2)
+
+    def test_scrape_needs_the_token(self):
+        self.assertEqual(self.scrape('wrong').status_code, 403)
+        with override_settings(METRICS_TOKEN=''):
+            self.assertEqual(self.scrape().status_code, 403)
+
+
+class ProfilingTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(PROFILE_DIR=directory.name, PROFILE_INTERVAL_MS=0.2)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.admin_client = self.client_for(self.admin)
+
+    def token(self):
+        return self.admin_client.post('/api/admin/profiles/token/').json()['data']['token']
+
+    def test_signed_request_is_profiled_and_downloadable(self):
+        response = self.client_for(self.patients[0].user).get('/api/patient/dashboard/', HTTP_X_PROFILE=self.token())
+        self.assertEqual(response.status_code, 200)
+        name = response['X-Profile-Id']
+
+        profiles = self.admin_client.get('/api/admin/profiles/').json()['data']
+        self.assertEqual([(p['name'], p['view']) for p in profiles], [(name, 'patient-dashboard')])
+        download = self.admin_client.get(f'/api/admin/profiles/{name}/')
+        self.assertEqual(download.status_code, 200)
+        for line in b''.join(download.streaming_content).decode().splitlines():
+            self.assertRegex(line, r'^\S.* \d+$')
+
+        # The query flag works too
+        self.assertIn('X-Profile-Id', self.admin_client.get('/api/doctors/', {'profile': self.token()}))
+
+    def test_requests_without_a_valid_token_are_not_profiled(self):
+        for token in ['forged', profiling.mint_token(self.admin.id) + 'x']:
+            self.assertNotIn('X-Profile-Id', self.admin_client.get('/api/doctors/', HTTP_X_PROFILE=token))
+        with override_settings(PROFILE_TOKEN_MAX_AGE=-1):
+            self.assertNotIn('X-Profile-Id', self.admin_client.get('/api/doctors/', HTTP_X_PROFILE=self.token()))
+        self.assertEqual(profiling.list_profiles(), [])
+
+    @override_settings(PROFILE_KEEP=1)
+    def test_old_profiles_are_pruned(self):
+        for _ in range(2):
+            name = self.admin_client.get('/api/doctors/', HTTP_X_PROFILE=self.token())['X-Profile-Id']
+        self.assertEqual([p['name'] for p in profiling.list_profiles()], [name])
+
+    def test_admin_only(self):
+        doctor = self.client_for(self.doctor)
+        self.assertEqual(doctor.post('/api/admin/profiles/token/').status_code, 403)
+        self.assertEqual(doctor.get('/api/admin/profiles/').status_code, 403)
+        self.assertEqual(self.admin_client.get('/api/admin/profiles/..%2Fsettings.py/').status_code, 404)
+
+
+class QueryCountTests(APITestCase):
+    """
+    Every list/detail endpoint must load its data in a fixed number of
+    queries. Each endpoint is measured, the dataset is grown, and the count
+    must not move.
+    """
+    # url -> (role, expected queries); the lists spend one on their conditional GET validator
+    ENDPOINTS = {
+        '/api/patients/': ('admin', 2),
+        '/api/appointments/': ('admin', 2),
+        '/api/medical-records/': ('admin', 2),
+        '/api/notifications/': ('admin', 2),
+        '/api/doctor/patients/': ('doctor', 2),
+        '/api/doctor/appointments/': ('doctor', 2),
+        '/api/doctor/patients/{patient}/': ('doctor', 3),
+        '/api/patient/dashboard/': ('patient', 3),
+    }
+
+    def user_for(self, role):
+        return {'admin': self.admin, 'doctor': self.doctor, 'patient': self.patients[0].user}[role]
+
+    def measure(self, url, role):
+        client = self.client_for(self.user_for(role))
+        url = url.format(patient=self.patients[0].id)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        return len(ctx.captured_queries)
+
+    def test_query_counts_do_not_grow_with_data(self):
+        before = {url: self.measure(url, role) for url, (role, _) in self.ENDPOINTS.items()}
+
+        other_doctor = make_user('other', 'doctor')
+        seed_clinic(other_doctor, patients=20)
+        seed_clinic(self.doctor, patients=20)
+        for patient in self.patients[:1]:
+            for i in range(20):
+                Appointment.objects.create(patient=patient, doctor=other_doctor, date=date(2025, 2, 1), time=time(10, i))
+                MedicalRecord.objects.create(patient=patient, doctor=other_doctor, record_type='Imaging', description='x')
+
+        for url, (role, expected) in self.ENDPOINTS.items():
+            after = self.measure(url, role)
+            self.assertEqual(after, before[url], f'{url} query count grew with data size')
+            self.assertEqual(after, expected, url)
+
+
+class DoctorStatsTests(APITestCase):
+    def get_stats(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client_for(self.doctor).get('/api/doctor/stats/')
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data'], len(ctx.captured_queries)
+
+    def test_counts_match_individual_queries(self):
+        Appointment.objects.filter(pk=Appointment.objects.first().pk).update(status='Pending', date=date.today())
+        stats, queries = self.get_stats()
+        self.assertEqual(queries, 1)
+        self.assertEqual(stats, {
+            'totalPatients': Patient.objects.filter(assigned_doctor=self.doctor).count(),
+            'totalAppointments': Appointment.objects.filter(doctor=self.doctor).count(),
+            'todaysAppointments': Appointment.objects.filter(doctor=self.doctor, date=date.today()).count(),
+            'pendingAppointments': Appointment.objects.filter(doctor=self.doctor, status='Pending').count(),
+        })
+
+    def test_cached_until_patient_or_appointment_changes(self):
+        first, _ = self.get_stats()
+        cached, queries = self.get_stats()
+        self.assertEqual((cached, queries), (first, 0))
+
+        Appointment.objects.create(patient=self.patients[0], doctor=self.doctor, date=date.today(), time=time(8, 0))
+        stats, queries = self.get_stats()
+        self.assertEqual(queries, 1)
+        self.assertEqual(stats['todaysAppointments'], first['todaysAppointments'] + 1)
+
+        patient = self.patients[1]
+        patient.assigned_doctor = make_user('another', 'doctor')
+        patient.save()
+        stats, _ = self.get_stats()
+        self.assertEqual(stats['totalPatients'], first['totalPatients'] - 1)
+
+    @override_settings(LOCAL_CACHE_MAX_TIMEOUT=0)
+    def test_per_process_cache_caps_the_timeout(self):
+        # The test cache is LocMem, which other workers' invalidations never reach
+        self.get_stats()
+        self.assertEqual(self.get_stats()[1], 1)
+
+
+class AdminSummaryTests(APITestCase):
+    def test_summary_counts_and_lists(self):
+        Appointment.objects.create(patient=self.patients[0], doctor=self.doctor, date=date.today(), time=time(9, 30))
+        Notification.objects.filter(pk=Notification.objects.first().pk).update(is_read=True)
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client_for(self.admin).get('/api/admin/summary/', {'limit': 3})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(ctx.captured_queries), 3)
+
+        data = response.json()['data']
+        self.assertEqual(data['stats'], {
+            'totalPatients': Patient.objects.count(),
+            'totalDoctors': User.objects.filter(role='doctor').count(),
+            'totalAppointments': Appointment.objects.count(),
+            'todaysAppointments': 1,
+            'pendingRecords': MedicalRecord.objects.filter(status='Pending').count(),
+            'unreadNotifications': Notification.objects.filter(is_read=False).count(),
+        })
+        self.assertEqual(len(data['todays_appointments']), 1)
+        self.assertTrue(all(not n['is_read'] for n in data['notifications']))
+
+    def test_admin_only(self):
+        self.assertEqual(self.client_for(self.doctor).get('/api/admin/summary/').status_code, 403)
+
+
+class ReportsTests(APITestCase):
+    def test_report_aggregates(self):
+        cardio = self.client_for(self.admin).get('/api/reports/', {'department': 'cardiology'}).json()['data']
+        self.assertEqual(cardio['totalAppointments'], Appointment.objects.count())
+        self.assertEqual(cardio['totalPatients'], len(self.patients))
+        self.assertEqual(cardio['activeDoctors'], 1)
+        self.assertEqual(sum(cardio['appointmentsByMonth']['data']), Appointment.objects.count())
+        self.assertEqual(cardio['patientGrowth']['data'][-1], len(self.patients))
+        self.assertEqual(cardio['departmentStats'], [{'department': 'Cardiology', 'visits': Appointment.objects.count()}])
+        self.assertEqual(sum(d['percentage'] for d in cardio['demographics']), 100)
+
+        other = self.client_for(self.admin).get('/api/reports/', {'department': 'neurology'}).json()['data']
+        self.assertEqual(other['totalAppointments'], 0)
+
+    def test_date_range(self):
+        client = self.client_for(self.admin)
+        data = client.get('/api/reports/', {'start': '2025-01-02', 'end': '2025-01-03'}).json()['data']
+        self.assertEqual(
+            data['totalAppointments'],
+            Appointment.objects.filter(date__range=(date(2025, 1, 2), date(2025, 1, 3))).count(),
+        )
+        self.assertEqual(client.get('/api/reports/', {'start': 'yesterday'}).status_code, 400)
+
+    @override_settings(APPOINTMENT_BASE_PRICE=100)
+    def test_revenue_counts_calendar_months_only(self):
+        this_month = date.today().replace(day=1)
+        last_month = (this_month - timedelta(days=1)).replace(day=1)
+        next_month = (this_month + timedelta(days=31)).replace(day=1)
+        for i, (day, appointment_status) in enumerate([
+            (this_month, 'Scheduled'), (this_month, 'Completed'), (this_month, 'Cancelled'),
+            (last_month, 'Completed'),
+            # Booked ahead: not this month's revenue
+            (next_month, 'Scheduled'), (next_month.replace(year=next_month.year + 1), 'Scheduled'),
+        ]):
+            Appointment.objects.create(
+                patient=self.patients[0], doctor=self.doctor, date=day, time=time(8, i), status=appointment_status,
+            )
+        revenue = self.client_for(self.admin).get('/api/reports/').json()['data']['revenue']
+        self.assertEqual(revenue, {'thisMonth': 200, 'lastMonth': 100, 'growth': 100.0})
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP to accept messages from smtplib"""
+
+    def handle(self):
+        self.server.connections += 1
+        self.wfile.write(b'220 sink ready\r\n')
+        for line in iter(self.rfile.readline, b''):
+            command = line.strip().upper()
+            if command == b'DATA':
+                if self.server.hold:
+                    # Keep the client waiting until the test releases it
+                    self.server.holding.set()
+                    self.server.hold.wait(10)
+                self.wfile.write(b'354 end with .\r\n')
+                lines = []
+                for data in iter(self.rfile.readline, b''):
+                    if data == b'.\r\n':
+                        break
+                    lines.append(data)
+                self.server.messages.append(b''.join(lines))
+                self.wfile.write(b'250 queued\r\n')
+            elif command.startswith(b'RCPT') and b'BOUNCE' in command:
+                self.wfile.write(b'550 no such user\r\n')
+            elif command == b'QUIT':
+                self.wfile.write(b'221 bye\r\n')
+                return
+            else:
+                self.wfile.write(b'250 ok\r\n')
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), SMTPSinkHandler)
+        self.messages = []
+        self.connections = 0
+        self.hold = None
+        self.holding = threading.Event()
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class EmailOutboxTests(APITestCase):
+    def smtp_settings(self, port):
+        return override_settings(
+            EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+            EMAIL_HOST='127.0.0.1',
+            EMAIL_PORT=port,
+            EMAIL_TIMEOUT=5,
+        )
+
+    def test_approval_queues_email_instead_of_sending(self):
+        pending = make_user('newpatient', 'patient', is_verified=False)
+        response = self.client_for(self.admin).post(f'/api/verify-patient/{pending.id}/', {'action': 'approve'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(mail.outbox), 0)
+        item = EmailOutbox.objects.get()
+        self.assertEqual((item.recipient, item.status), (pending.email, 'Pending'))
+        self.assertIn('/login', item.html_body)
+
+        self.assertEqual(send_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(EmailOutbox.objects.get().status, 'Sent')
+
+    def test_batch_is_sent_over_one_smtp_connection(self):
+        for i in range(5):
+            queue_email(f'user{i}@example.com', f'Hello {i}', 'Body', '<p>Body</p>')
+        with SMTPSink() as sink, self.smtp_settings(sink.server_address[1]):
+            call_command('send_outbox', batch_size=2, stdout=io.StringIO())
+        self.assertEqual(len(sink.messages), 5)
+        # one connection per batch of two
+        self.assertEqual(sink.connections, 3)
+        self.assertFalse(EmailOutbox.objects.exclude(status='Sent').exists())
+
+    def test_rejected_messages_back_off_then_give_up(self):
+        item = queue_email('bounce@example.com', 'Hello', 'Body')
+        queue_email('user@example.com', 'Hello', 'Body')
+        with SMTPSink() as sink, self.smtp_settings(sink.server_address[1]):
+            self.assertEqual(send_pending(max_attempts=2), (1, 1))
+            item.refresh_from_db()
+            self.assertEqual((item.status, item.attempts), ('Pending', 1))
+            self.assertIsNotNone(item.last_error)
+            # Not due again until the backoff expires
+            self.assertEqual(send_pending(max_attempts=2), (0, 0))
+
+            EmailOutbox.objects.filter(pk=item.pk).update(next_attempt_at=item.created_at)
+            self.assertEqual(send_pending(max_attempts=2), (0, 1))
+            item.refresh_from_db()
+            self.assertEqual((item.status, item.attempts), ('Failed', 2))
+        self.assertEqual(len(sink.messages), 1)
+
+    def test_smtp_outage_defers_the_batch_without_charging_attempts(self):
+        for i in range(3):
+            queue_email(f'user{i}@example.com', 'Hello', 'Body')
+        with self.smtp_settings(closed_port()):
+            for _ in range(4):
+                self.assertEqual(send_pending(max_attempts=2), (0, 0))
+                self.assertFalse(EmailOutbox.objects.filter(next_attempt_at__lte=timezone.now()).exists())
+                EmailOutbox.objects.update(next_attempt_at=timezone.now())
+        for item in EmailOutbox.objects.all():
+            self.assertEqual((item.status, item.attempts), ('Pending', 0))
+            self.assertIsNotNone(item.last_error)
+
+    def test_expired_lease_is_claimed_again(self):
+        item = queue_email('user@example.com', 'Hello', 'Body')
+        # A worker leased the row and died before recording anything
+        EmailOutbox.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now() + timedelta(minutes=5))
+        self.assertEqual(send_pending(), (0, 0))
+        EmailOutbox.objects.filter(pk=item.pk).update(next_attempt_at=timezone.now())
+        self.assertEqual(send_pending(), (1, 0))
+        self.assertEqual(EmailOutbox.objects.get().status, 'Sent')
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.smtp.EmailBackend',
+    EMAIL_HOST='127.0.0.1',
+    EMAIL_TIMEOUT=5,
+)
+class EmailOutboxLockTests(TransactionTestCase):
+    def test_database_writes_do_not_wait_for_the_mail_server(self):
+        queue_email('user@example.com', 'Hello', 'Body')
+        results = []
+
+        def worker():
+            try:
+                results.append(send_pending())
+            finally:
+                connection.close()
+
+        with SMTPSink() as sink, override_settings(EMAIL_PORT=sink.server_address[1]):
+            sink.hold = threading.Event()
+            thread = threading.Thread(target=worker)
+            thread.start()
+            try:
+                self.assertTrue(sink.holding.wait(10))
+                # The send is stuck on the mail server; a request's write must not queue behind it
+                started = timezone.now()
+                Patient.objects.create(name='Walk In', email='walkin@example.com', phone='555-0100')
+                self.assertLess((timezone.now() - started).total_seconds(), 1)
+                # Leased, so another worker does not send it twice meanwhile
+                self.assertEqual(send_pending(), (0, 0))
+            finally:
+                sink.hold.set()
+                thread.join(10)
+        self.assertEqual(results, [(1, 0)])
+        self.assertEqual(EmailOutbox.objects.get().status, 'Sent')
+
+
+@override_settings(JWT_STATELESS_AUTH=True, JWT_REVOCATION_CHECK_TTL=0)
+class StatelessJWTTests(APITestCase):
+    def login(self, user):
+        response = APIClient().post('/api/auth/login/', {'username': user.username, 'password': 'secret123'})
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {response.json()['data']['access']}")
+        return client
+
+    def test_authorizes_from_claims_without_user_query(self):
+        client = self.login(self.doctor)
+        with CaptureQueriesContext(connection) as ctx:
+            response = client.get('/api/doctor/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(any('"core_user"."password"' in q['sql'] for q in ctx.captured_queries))
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+        self.assertEqual(client.get('/api/notifications/').status_code, 403)
+        profile = client.get('/api/auth/profile/').json()['data']
+        self.assertEqual((profile['email'], profile['department']), (self.doctor.email, 'Cardiology'))
+
+    def test_deactivated_or_changed_users_are_revoked(self):
+        client = self.login(self.doctor)
+        self.assertEqual(client.get('/api/doctor/stats/').status_code, 200)
+        self.doctor.role = 'receptionist'
+        # Revoked a second after the token was issued; iat has whole-second resolution
+        with mock.patch('time.time', return_value=time_module.time() + 1):
+            self.doctor.save()
+        self.assertEqual(client.get('/api/doctor/stats/').status_code, 401)
+
+        client = self.login(self.admin)
+        self.admin.is_active = False
+        with mock.patch('time.time', return_value=time_module.time() + 1):
+            self.admin.save()
+        self.assertEqual(client.get('/api/admin/summary/').status_code, 401)
+
+    def test_login_in_the_same_second_as_a_revocation_is_accepted(self):
+        self.doctor.role = 'receptionist'
+        self.doctor.save()
+        client = self.login(self.doctor)
+        self.assertEqual(client.get('/api/auth/profile/').status_code, 200)
+
+    def test_refuses_to_start_without_a_shared_cache(self):
+        self.assertEqual([error.id for error in stateless_auth_needs_shared_cache(None)], ['core.E001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(stateless_auth_needs_shared_cache(None), [])
+
+
+class LoginAdmissionTests(APITestCase):
+    def login(self, username='doctor', password='secret123'):
+        return APIClient().post('/api/auth/login/', {'username': username, 'password': password})
+
+    @override_settings(AUTH_THROTTLE_RATES={'auth_ip': None, 'auth_identity': '2/min'})
+    def test_attempts_per_identity_are_throttled(self):
+        self.assertEqual(self.login(password='wrong').status_code, 401)
+        self.assertEqual(self.login().status_code, 200)
+        self.assertEqual(self.login().status_code, 429)
+        self.assertEqual(self.login('admin').status_code, 200)
+
+    def test_deploy_check_warns_about_per_process_counters(self):
+        self.assertEqual([warning.id for warning in throttles_need_shared_cache(None)], ['core.W001'])
+        redis = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://cache:6379'}}
+        with override_settings(CACHES=redis):
+            self.assertEqual(throttles_need_shared_cache(None), [])
+
+    @override_settings(AUTH_HASHING_CONCURRENCY=1, AUTH_HASHING_QUEUE_TIMEOUT=0.01)
+    def test_sheds_load_when_hashing_slots_are_full(self):
+        from .throttling import hashing_slot
+
+        with hashing_slot():
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(self.login().status_code, 200)
+
+
+class ExportTests(APITestCase):
+    def download(self, resource, **params):
+        response = self.client_for(self.admin).get(f'/api/export/{resource}/', params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    @override_settings(EXPORT_CHUNK_SIZE=7, EXPORT_BUFFER_BYTES=512)
+    def test_ndjson_csv_and_gzip_exports(self):
+        rows = [json.loads(line) for line in self.download('appointments').splitlines()]
+        self.assertEqual([r['id'] for r in rows], list(Appointment.objects.order_by('id').values_list('id', flat=True)))
+        self.assertEqual(rows[0]['doctor_email'], self.doctor.email)
+
+        records = list(csv.DictReader(io.StringIO(self.download('medical-records', output='csv').decode())))
+        self.assertEqual(len(records), MedicalRecord.objects.count())
+
+        compressed = self.download('patients', output='csv', gzip='1')
+        patients = list(csv.DictReader(io.StringIO(gzip.decompress(compressed).decode())))
+        self.assertEqual(len(patients), len(self.patients))
+
+    def test_since_and_validation(self):
+        latest = Patient.objects.order_by('-created_at').first()
+        rows = self.download('patients', since=latest.created_at.isoformat()).splitlines()
+        self.assertEqual(json.loads(rows[-1])['id'], latest.id)
+        self.assertLess(len(rows), len(self.patients))
+        # A naive datetime is in the current time zone
+        naive = timezone.make_naive(latest.created_at).isoformat()
+        self.assertEqual(self.download('patients', since=naive).splitlines(), rows)
+
+        client = self.client_for(self.admin)
+        self.assertEqual(client.get('/api/export/patients/', {'since': '2024-02-30T00:00'}).status_code, 400)
+        self.assertEqual(client.get('/api/export/patients/', {'since': 'yesterday'}).status_code, 400)
+        self.assertEqual(client.get('/api/export/users/').status_code, 404)
+        self.assertEqual(client.get('/api/export/patients/', {'output': 'xml'}).status_code, 400)
+        self.assertEqual(self.client_for(self.doctor).get('/api/export/patients/').status_code, 403)
+
+    def test_management_command(self):
+        with tempfile.NamedTemporaryFile(suffix='.ndjson.gz') as out:
+            call_command('export_data', 'appointments', '--gzip', output=out.name, stderr=io.StringIO())
+            lines = gzip.decompress(open(out.name, 'rb').read()).splitlines()
+        self.assertEqual(len(lines), Appointment.objects.count())
+
+        latest = Patient.objects.order_by('-created_at').first()
+        with tempfile.NamedTemporaryFile(suffix='.ndjson') as out:
+            naive = timezone.make_naive(latest.created_at).isoformat()
+            call_command('export_data', 'patients', since=naive, output=out.name, stderr=io.StringIO())
+            self.assertEqual(json.loads(open(out.name).read().splitlines()[-1])['id'], latest.id)
+        for since in ('2024-02-30T00:00', 'yesterday'):
+            with self.assertRaises(CommandError):
+                call_command('export_data', 'patients', since=since, stderr=io.StringIO())
+
+
+@override_settings(IMPORT_BATCH_SIZE=3)
+class ImportTests(APITestCase):
+    def test_patients_csv_reports_bad_rows_and_keeps_going(self):
+        lines = ['name,email,phone,age,gender,assigned_doctor_email']
+        lines += [f'New {i},new{i}@example.com,555-1000,{20 + i},Female,{self.doctor.email}' for i in range(7)]
+        lines += [
+            'Bad Age,badage@example.com,555-1000,old,Male,',
+            'Dup,new1@example.com,555-1000,40,Male,',
+            f'Existing,{self.patients[0].email},555-1000,40,Male,',
+            'Nobody,nobody@example.com,555-1000,40,Male,ghost@example.com',
+        ]
+        response = self.client_for(self.admin).post(
+            '/api/import/patients/', '\n'.join(lines), content_type='text/csv'
+        )
+        data = response.json()['data']
+        self.assertEqual(data['created'], 7)
+        self.assertEqual([e['line'] for e in data['errors']], [9, 10, 11, 12])
+        self.assertIn('age', data['errors'][0]['errors'])
+        self.assertIn('assigned_doctor_email', data['errors'][3]['errors'])
+        self.assertEqual(Patient.objects.filter(email__startswith='new', assigned_doctor=self.doctor).count(), 7)
+
+    def test_appointments_ndjson_upload_resolves_emails_per_batch(self):
+        rows = [
+            {'patient_email': p.email, 'doctor_email': self.doctor.email, 'date': '2025-03-01', 'time': f'10:{i:02d}'}
+            for i, p in enumerate(self.patients)
+        ]
+        rows.append({'patient_email': 'ghost@example.com', 'doctor_email': self.doctor.email, 'date': '2025-03-01', 'time': '10:30'})
+        rows.append({'patient_email': self.patients[0].email, 'doctor_email': self.doctor.email, 'date': 'soon', 'time': '10:30', 'status': 'Maybe'})
+        rows.append({'patient_email': self.patients[1].email, 'doctor_email': self.doctor.email, 'date': '2025-03-01', 'time': '10:00'})
+        body = '\n'.join(json.dumps(row) for row in rows).encode() + b'\nnot json\n'
+        upload = io.BytesIO(body)
+        upload.name = 'appointments.ndjson'
+
+        before = Appointment.objects.count()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client_for(self.admin).post('/api/import/appointments/', {'file': upload}, format='multipart')
+        data = response.json()['data']
+        self.assertEqual(data['created'], len(self.patients))
+        self.assertEqual(data['failed'], 4)
+        self.assertEqual(set(data['errors'][1]['errors']), {'date', 'status'})
+        self.assertEqual(set(data['errors'][2]['errors']), {'time'})
+        self.assertEqual(Appointment.objects.count(), before + len(self.patients))
+        # One doctor lookup, then patient and slot lookups and an insert per batch of 3
+        batches = -(-len(self.patients) // 3)
+        self.assertLessEqual(len(queries), 1 + batches * 5 + 2)
+
+    def test_validation_and_command(self):
+        client = self.client_for(self.admin)
+        self.assertEqual(client.post('/api/import/users/', '', content_type='text/csv').status_code, 404)
+        self.assertEqual(client.post('/api/import/patients/?input=xml', '', content_type='text/csv').status_code, 400)
+        self.assertEqual(self.client_for(self.doctor).post('/api/import/patients/', '', content_type='text/csv').status_code, 403)
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write('name,email,phone\nCli,cli@example.com,555\n')
+            f.flush()
+            out = io.StringIO()
+            call_command('import_data', 'patients', f.name, stdout=out, stderr=io.StringIO())
+        self.assertIn('Imported 1 patients', out.getvalue())
+        self.assertTrue(Patient.objects.filter(email='cli@example.com').exists())
+
+
+class PatientSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for name, email, phone in [
+            ('Fatima Kim', 'fatima@example.com', '555-0101'),
+            ('Kim Lee', 'klee@example.com', '555-0102'),
+            ('Joakim Berg', 'jberg@example.com', '(555) 867-5309'),
+        ]:
+            Patient.objects.create(name=name, email=email, phone=phone)
+
+    def search(self, q, **params):
+        response = self.client_for(self.admin).get('/api/patients/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200)
+        return [row['name'] for row in response.json()['data']]
+
+    def test_ranked_by_name_prefix_then_word_then_substring(self):
+        self.assertEqual(self.search('kim'), ['Kim Lee', 'Fatima Kim', 'Joakim Berg'])
+        self.assertEqual(self.search('KIM', limit=2), ['Kim Lee', 'Fatima Kim'])
+        self.assertEqual(self.search('fatima.kim'), ['Fatima Kim'])
+        self.assertEqual(self.search('kim lee'), ['Kim Lee'])
+
+    def test_email_and_phone_fragments(self):
+        self.assertEqual(self.search('jberg@'), ['Joakim Berg'])
+        # Punctuation in the stored or typed number does not matter
+        self.assertEqual(self.search('8675309'), ['Joakim Berg'])
+        self.assertEqual(self.search('555-867'), ['Joakim Berg'])
+
+    def test_index_follows_saves_deletes_and_imports(self):
+        patient = Patient.objects.get(name='Kim Lee')
+        patient.name = 'Hana Lee'
+        patient.save()
+        self.assertEqual(self.search('hana'), ['Hana Lee'])
+        self.assertNotIn('Hana Lee', self.search('kim'))
+        patient.delete()
+        self.assertEqual(self.search('hana'), [])
+
+        # bulk_create sends no signals; the importer indexes the batch itself
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write('name,email,phone\nZora Quill,zq@example.com,555-7777\n')
+            f.flush()
+            call_command('import_data', 'patients', f.name, stdout=io.StringIO(), stderr=io.StringIO())
+        self.assertEqual(self.search('quill'), ['Zora Quill'])
+
+    def test_short_queries_and_bad_limit(self):
+        self.assertEqual(self.search('ki'), [])
+        self.assertEqual(self.search(''), [])
+        # Short words still narrow the results once one word is long enough
+        self.assertEqual(self.search('kim f'), ['Fatima Kim'])
+        client = self.client_for(self.admin)
+        self.assertEqual(client.get('/api/patients/search/', {'q': 'kim', 'limit': 'x'}).status_code, 400)
+        self.assertEqual(client.get('/api/patients/search/', {'q': 'kim', 'limit': 0}).status_code, 400)
+
+    def test_older_matches_are_not_crowded_out_by_a_common_word(self):
+        Patient.objects.create(name='Jo Smith', email='jo@example.com', phone='555-0199')
+        Patient.objects.bulk_create([
+            Patient(name=f'Alex Smith {i}', email=f'smith{i}@example.com', phone='555-0200')
+            for i in range(SEARCH_CANDIDATES + 50)
+        ])
+        index_patients()
+        # The short word is applied before the candidate limit
+        self.assertEqual(self.search('smith jo'), ['Jo Smith'])
+        # Name prefix matches come from their own query, ahead of the newer candidates
+        self.assertEqual(self.search('jo smith', limit=3), ['Jo Smith'])
+        self.assertEqual(self.search('alex smith', limit=2), ['Alex Smith 249', 'Alex Smith 248'])
+
+
+class RecordSearchTests(APITestCase):
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other = make_user('doctor2', 'doctor')
+        patient = cls.patients[0]
+        cls.lab = MedicalRecord.objects.create(
+            patient=patient, doctor=cls.doctor, record_type='Lab Report', description='Fasting glucose 126 mg/dL, HbA1c 6.8%.'
+        )
+        cls.echo = MedicalRecord.objects.create(
+            patient=patient, doctor=cls.other, record_type='Imaging',
+            description='Echocardiogram: ejection fraction 55%, normal <valves>.'
+        )
+        cls.diagnosis = MedicalRecord.objects.create(
+            patient=cls.patients[1], doctor=cls.doctor, record_type='Diagnosis',
+            description='Reduced ejection fractions noted; HbA1c pending.'
+        )
+        MedicalRecord.objects.create(
+            patient=patient, doctor=cls.doctor, record_type='Diagnosis', description='Fraction of ejection unclear.'
+        )
+
+    def search(self, q, **params):
+        response = self.client_for(self.doctor).get('/api/medical-records/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, q, **params):
+        return [row['id'] for row in self.search(q, **params)['data']]
+
+    def test_matches_newest_first_with_highlighted_snippets(self):
+        body = self.search('hba1c')
+        self.assertEqual([row['id'] for row in body['data']], [self.diagnosis.id, self.lab.id])
+        self.assertIn('<mark>HbA1c</mark>', body['data'][1]['snippet'])
+        # Phrases keep word order; stemming matches "fractions"
+        self.assertEqual(self.ids('"ejection fraction"'), [self.diagnosis.id, self.echo.id])
+        snippet = self.search('echocardiogram')['data'][0]['snippet']
+        self.assertIn('&lt;valves&gt;', snippet)
+        self.assertNotIn('<valves>', snippet)
+        self.assertEqual(self.ids('hba1c -pending'), [self.lab.id])
+
+    def test_filters(self):
+        self.assertEqual(self.ids('"ejection fraction"', doctor=self.doctor.id), [self.diagnosis.id])
+        self.assertEqual(self.ids('"ejection fraction"', record_type='Imaging,Lab Report'), [self.echo.id])
+        self.assertEqual(self.ids('hba1c', patient=self.patients[0].id), [self.lab.id])
+        self.assertEqual(self.ids('hba1c', status='Completed'), [])
+        client = self.client_for(self.doctor)
+        self.assertEqual(client.get('/api/medical-records/search/', {'q': 'hba1c', 'record_type': 'X-ray'}).status_code, 400)
+        self.assertEqual(client.get('/api/medical-records/search/', {'q': '-hba1c'}).status_code, 400)
+        self.assertEqual(client.get('/api/medical-records/search/').status_code, 400)
+
+    def test_index_follows_saves_and_deletes(self):
+        self.lab.description = 'Lipid panel: LDL 140 mg/dL.'
+        self.lab.save()
+        self.assertEqual(self.ids('hba1c'), [self.diagnosis.id])
+        self.assertEqual(self.ids('ldl'), [self.lab.id])
+        self.lab.status = 'Completed'
+        self.lab.save()
+        self.assertEqual(self.ids('ldl', status='Completed'), [self.lab.id])
+        self.echo.delete()
+        self.assertEqual(self.ids('echocardiogram'), [])
+
+    def test_cursor_pages(self):
+        extra = [
+            MedicalRecord.objects.create(patient=self.patients[2], doctor=self.doctor, record_type='Diagnosis', description=f'HbA1c check {i}')
+            for i in range(3)
+        ]
+        expected = [r.id for r in reversed(extra)] + [self.diagnosis.id, self.lab.id]
+        seen, cursor = [], None
+        while True:
+            body = self.search('hba1c', page_size=2, **({'cursor': cursor} if cursor else {}))
+            seen.extend(row['id'] for row in body['data'])
+            cursor = body['pagination']['next']
+            if not cursor:
+                break
+        self.assertEqual(seen, expected)
+        response = self.client_for(self.doctor).get('/api/medical-records/search/', {'q': 'hba1c', 'cursor': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class SyntheticDataTests(TransactionTestCase):
+    def snapshot(self):
+        return list(Appointment.objects.order_by('id').values_list(
+            'patient__email', 'doctor__username', 'date', 'time', 'type', 'status', 'notes'
+        ))
+
+    def test_same_seed_same_data_and_indexes_restored(self):
+        counts = SyntheticDataGenerator(0.1, seed=7, batch_size=64).generate()
+        self.assertEqual(counts['patients'], 50)
+        # Draws that would double-book the doctor are dropped
+        self.assertGreater(counts['appointments'], 900)
+        self.assertEqual(Appointment.objects.count(), counts['appointments'])
+        self.assertEqual(MedicalRecord.objects.count(), 300)
+        self.assertEqual(set(Appointment.objects.values_list('doctor__role', flat=True)), {'doctor'})
+        self.assertLess(Appointment.objects.filter(status='Completed').count(), counts['appointments'])
+
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(cursor, Appointment._meta.db_table)
+        self.assertIn('appt_doctor_date_idx', constraints)
+
+        first = self.snapshot()
+        Patient.objects.all().delete()
+        User.objects.all().delete()
+        SyntheticDataGenerator(0.1, seed=7, batch_size=100).generate()
+        self.assertEqual(self.snapshot(), first)
+
+        with self.assertRaises(ValueError):
+            SyntheticDataGenerator(0.1, seed=7).generate()
+
+
+class SlotTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        # A Monday well in the future, so no slot is in the past
+        self.monday = date.today() + timedelta(days=7 - date.today().weekday() + 7)
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(9, 0), end_time=time(11, 0), slot_minutes=30)
+        DoctorSchedule.objects.create(doctor=self.doctor, weekday=0, start_time=time(14, 0), end_time=time(15, 0), slot_minutes=20)
+        patient = self.patients[0]
+        Appointment.objects.create(patient=patient, doctor=self.doctor, date=self.monday, time=time(9, 30))
+        Appointment.objects.create(patient=patient, doctor=self.doctor, date=self.monday, time=time(9, 45))
+        Appointment.objects.create(patient=patient, doctor=self.doctor, date=self.monday, time=time(14, 20), status='Cancelled')
+
+    def test_free_slots_skip_bookings_and_follow_schedule(self):
+        response = self.client_for(self.admin).get(
+            f'/api/doctors/{self.doctor.id}/slots/', {'from': self.monday, 'to': self.monday + timedelta(days=6)}
+        )
+        slots = response.json()['data']['slots']
+        # 09:30 and the overlapping 09:45 booking block 09:30-10:15
+        self.assertEqual(slots, {self.monday.isoformat(): ['09:00', '10:30', '14:00', '14:20', '14:40']})
+
+    def test_department_batch_uses_constant_queries(self):
+        other = make_user('doctor2', 'doctor', department='Cardiology')
+        make_user('doctor3', 'doctor', department='Neurology')
+        client = self.client_for(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/doctors/slots/', {'department': 'cardiology', 'from': self.monday, 'to': self.monday})
+        data = {row['doctor_id']: row['slots'] for row in response.json()['data']}
+        self.assertEqual(set(data), {self.doctor.id, other.id})
+        # No schedule: default 09:00-17:00 in 30 minute slots
+        self.assertEqual(len(data[other.id][self.monday.isoformat()]), 16)
+        self.assertLessEqual(len(queries), 3)
+
+    def test_schedule_replace_and_validation(self):
+        url = f'/api/doctors/{self.doctor.id}/schedule/'
+        schedule = [{'weekday': 2, 'start': '08:00', 'end': '12:00', 'slot_minutes': 15}]
+        self.assertEqual(self.client_for(self.patients[0].user).put(url, {'schedule': schedule}, format='json').status_code, 403)
+        body = self.client_for(self.doctor).put(url, {'schedule': schedule}, format='json').json()
+        self.assertEqual(body['data']['schedule'], schedule)
+        self.assertFalse(body['data']['is_default'])
+
+        bad = [{'weekday': 9, 'start': '12:00', 'end': '08:00'}]
+        self.assertEqual(self.client_for(self.admin).put(url, {'schedule': bad}, format='json').status_code, 400)
+        client = self.client_for(self.admin)
+        # A body without the list must not wipe the schedule; only an explicit [] resets it
+        for body in ({}, {'schedule': None}, {'weekday': 2}):
+            self.assertEqual(client.put(url, body, format='json').status_code, 400)
+        self.assertFalse(client.get(url).json()['data']['is_default'])
+        self.assertTrue(client.put(url, {'schedule': []}, format='json').json()['data']['is_default'])
+        self.assertEqual(client.get('/api/doctors/999/slots/').status_code, 404)
+        self.assertEqual(client.get(f'/api/doctors/{self.doctor.id}/slots/', {'from': 'monday'}).status_code, 400)
+        self.assertEqual(client.get(f'/api/doctors/{self.doctor.id}/slots/', {'to': '2000-01-01'}).status_code, 400)
+
+
+class BookingTests(APITestCase):
+    def book(self, client, **overrides):
+        payload = {'patient': self.patients[0].id, 'doctor': self.doctor.id, 'date': '2025-06-02', 'time': '10:00'}
+        payload.update(overrides)
+        return client.post('/api/appointments/', payload, format='json')
+
+    def test_second_booking_for_slot_conflicts(self):
+        client = self.client_for(self.admin)
+        first = self.book(client)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(self.book(client, patient=self.patients[1].id).status_code, 409)
+        self.assertEqual(self.book(client, time='10:30').status_code, 200)
+        self.assertEqual(self.book(client, time='later').status_code, 400)
+
+        # Cancelling frees the slot; re-activating the old one then conflicts
+        first_id = first.json()['data']['id']
+        client.put(f'/api/appointments/{first_id}/', {'status': 'Cancelled'}, format='json')
+        self.assertEqual(self.book(client, patient_id=self.patients[1].id).status_code, 200)
+        response = client.put(f'/api/appointments/{first_id}/', {'status': 'Scheduled'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(Appointment.objects.get(id=first_id).status, 'Cancelled')
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class ConcurrentBookingTests(TransactionTestCase):
+    def test_concurrent_bookings_never_double_book(self):
+        admin = make_user('admin', 'admin')
+        doctor = make_user('doctor', 'doctor')
+        patients = seed_clinic(doctor, patients=8, appointments_per_patient=0)
+        slots = [time(9 + i // 4, 15 * (i % 4)) for i in range(20)]
+        statuses = []
+        lock = threading.Lock()
+
+        def receptionist(n):
+            client = APIClient()
+            client.force_authenticate(admin)
+            for i in range(40):
+                response = client.post('/api/appointments/', {
+                    'patient': patients[n].id,
+                    'doctor': doctor.id,
+                    'date': '2025-06-02',
+                    'time': slots[(n * 7 + i) % len(slots)].strftime('%H:%M'),
+                }, format='json')
+                with lock:
+                    statuses.append(response.status_code)
+
+        threads = [threading.Thread(target=receptionist, args=(n,)) for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(statuses), 320)
+        self.assertEqual(set(statuses), {200, 409})
+        self.assertEqual(statuses.count(200), len(slots))
+        booked = list(Appointment.objects.values_list('time', flat=True))
+        self.assertEqual(sorted(booked), slots)
+
+
+class BenchmarkTests(TransactionTestCase):
+    def test_every_route_is_benchmarked_or_skipped(self):
+        from .urls import urlpatterns
+        timed = {name for _, name, *_ in benchmark.ROUTES}
+        self.assertEqual({pattern.name for pattern in urlpatterns}, timed | set(benchmark.SKIPPED))
+        self.assertFalse(timed & set(benchmark.SKIPPED))
+
+    def test_run_records_every_route(self):
+        counts, samples = benchmark.seed(0.01, seed=3)
+        self.assertEqual(counts['patients'], 5)
+        results = benchmark.run(samples, repeat=3, warmup=1)
+
+        self.assertEqual(set(results), {label for label, *_ in benchmark.ROUTES})
+        for label, result in results.items():
+            self.assertEqual(result['status'], 200, label)
+            self.assertEqual(result['samples'], 3)
+            self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+            self.assertLessEqual(result['p95_ms'], result['p99_ms'])
+            self.assertGreater(result['bytes'], 0, label)
+        self.assertEqual(results['metrics']['queries'], 0)
+        self.assertGreater(results['patient-dashboard']['queries'], 0)
+
+    def test_compare_fails_on_regression(self):
+        def results(p95, queries=3, size=1000):
+            route = {'status': 200, 'p50_ms': p95, 'p95_ms': p95, 'p99_ms': p95, 'queries': queries, 'bytes': size}
+            return {'scales': {'1': {'routes': {'patient-list': route}}}}
+
+        baseline = results(10.0)
+        self.assertEqual(benchmark.compare(baseline, results(12.0)), [])
+        # Within the ratio but not the floor, and vice versa
+        self.assertEqual(benchmark.compare(results(0.5), results(2.0)), [])
+        self.assertEqual(benchmark.compare(baseline, results(12.4), min_delta_ms=2.0), [])
+        self.assertEqual(len(benchmark.compare(baseline, results(20.0))), 1)
+        self.assertEqual(len(benchmark.compare(baseline, results(10.0, queries=4))), 1)
+        self.assertEqual(len(benchmark.compare(baseline, results(10.0, size=2000))), 1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            paths = {}
+            for name, data in (('baseline', baseline), ('same', results(10.5)), ('slower', results(30.0))):
+                paths[name] = f'{directory}/{name}.json'
+                with open(paths[name], 'w') as handle:
+                    json.dump(data, handle)
+            out = io.StringIO()
+            call_command('benchmark_api', results=paths['same'], compare=paths['baseline'], stdout=out)
+            self.assertIn('No regressions', out.getvalue())
+            with self.assertRaises(CommandError):
+                call_command('benchmark_api', results=paths['slower'], compare=paths['baseline'], stdout=io.StringIO())
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'],
+)
+class LoadTestTests(LiveServerTestCase):
+    def setUp(self):
+        make_user('admin', 'admin')
+        make_user('frontdesk', 'receptionist')
+        seed_clinic(make_user('doctor', 'doctor'), patients=4, appointments_per_patient=2)
+
+    def test_ramp_reports_every_role_and_finds_saturation(self):
+        mix, context = loadtest.prepare()
+        self.assertEqual(set(mix), {'doctor', 'receptionist', 'admin', 'patient'})
+
+        stages = asyncio.run(loadtest.run_ramp(f'{self.live_server_url}/api', mix, context, [1, 4, 16, 64], duration=0.5))
+
+        self.assertEqual([stage['concurrency'] for stage in stages], [1, 4, 16, 64])
+        for stage in stages:
+            self.assertGreater(stage['requests'], 0)
+            self.assertEqual(stage['error_rate'], 0.0, stage['statuses'])
+            self.assertLessEqual(stage['p50_ms'], stage['p99_ms'])
+        roles = {name.split()[0] for stage in stages for name in stage['endpoints']}
+        self.assertEqual(roles, set(mix))
+        self.assertTrue(Appointment.objects.filter(type='Consultation', status='Scheduled').exists())
+
+        # The live server shares this process, and its GIL, with the clients:
+        # it saturates well before 64 users
+        self.assertIn(loadtest.saturation(stages, gain=0.5), (1, 4, 16))
+
+    def test_saturation_is_where_throughput_stops_growing(self):
+        stages = [{'concurrency': c, 'throughput': t} for c, t in ((1, 100), (2, 190), (4, 370), (8, 390), (16, 380))]
+        self.assertEqual(loadtest.saturation(stages), 4)
+        self.assertIsNone(loadtest.saturation(stages[:3]))
+
+    def test_roles_without_accounts_leave_the_mix(self):
+        User.objects.filter(role='receptionist').delete()
+        Patient.objects.update(user=None)
+        mix, context = loadtest.prepare()
+        self.assertEqual(set(mix), {'doctor', 'receptionist', 'admin'})
+        self.assertEqual(len(context['tokens']['receptionist']), 1)  # the admin stands in
+
+
+class QueryBudgetTests(APITestCase):
+    def n_plus_one(self, request):
+        # One query per patient: the pattern budgets are there to catch
+        names = [Patient.objects.get(pk=patient.pk).name for patient in self.patients]
+        return HttpResponse(', '.join(names))
+
+    def test_over_budget_raises_with_the_sql(self):
+        view = query_budget(3)(self.n_plus_one)
+        with self.assertRaises(QueryBudgetExceeded) as raised:
+            view(RequestFactory().get('/'))
+        message = str(raised.exception)
+        self.assertIn('made 10 queries (budget 3)', message)
+        self.assertIn('10x SELECT', message)
+
+        self.assertEqual(query_budget(10)(self.n_plus_one)(RequestFactory().get('/')).status_code, 200)
+        # Writes are not budgeted unless asked for
+        self.assertEqual(view(RequestFactory().post('/')).status_code, 200)
+        with self.assertRaises(QueryBudgetExceeded):
+            query_budget(3, methods=('POST',))(self.n_plus_one)(RequestFactory().post('/'))
+
+    def test_database_time_is_logged_but_never_raised(self):
+        view = query_budget(100, db_ms=0)(self.n_plus_one)
+        # Timings depend on the machine, so tests only enforce the query count
+        self.assertEqual(view(RequestFactory().get('/')).status_code, 200)
+        with override_settings(QUERY_BUDGET_RAISE=False, QUERY_BUDGET_SAMPLE_RATE=1.0):
+            with self.assertLogs('core.performance', 'WARNING') as logs:
+                view(RequestFactory().get('/'))
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['queries'], line['db_ms_budget']), (10, 0))
+
+    def test_production_logs_a_sample_with_duplicate_fingerprints(self):
+        view = query_budget(3)(self.n_plus_one)
+        with override_settings(QUERY_BUDGET_RAISE=False, QUERY_BUDGET_SAMPLE_RATE=1.0):
+            with self.assertLogs('core.performance', 'WARNING') as logs:
+                self.assertEqual(view(RequestFactory().get('/')).status_code, 200)
+        line = json.loads(logs.records[0].getMessage())
+        self.assertEqual((line['view'], line['queries'], line['query_budget']), ('n_plus_one', 10, 3))
+        self.assertEqual(len(line['duplicates']), 1)
+        self.assertEqual(line['duplicates'][0]['count'], 10)
+        self.assertNotIn(str(self.patients[0].pk), line['duplicates'][0]['sql'].split('LIMIT')[0])
+
+        with override_settings(QUERY_BUDGET_RAISE=False, QUERY_BUDGET_SAMPLE_RATE=0.0):
+            with self.assertNoLogs('core.performance', 'WARNING'):
+                view(RequestFactory().get('/'))
+
+    def test_fingerprint_folds_literals_and_in_lists(self):
+        self.assertEqual(
+            fingerprint("SELECT * FROM  \"core_patient\" U0 WHERE U0.id IN (%s, %s, %s) AND name = 'O''Neil' LIMIT 21"),
+            'SELECT * FROM "core_patient" U0 WHERE U0.id IN (...) AND name = ? LIMIT ?',
+        )
+
+    def test_list_budgets_hold_as_data_grows(self):
+        seed_clinic(self.doctor, patients=40, appointments_per_patient=3)
+        client = self.client_for(self.admin)
+        for url in ['/api/patients/', '/api/appointments/', '/api/medical-records/', '/api/admin/summary/', '/api/reports/']:
+            self.assertEqual(client.get(url).status_code, 200, url)
+        self.assertEqual(self.client_for(self.doctor).get('/api/doctor/appointments/').status_code, 200)
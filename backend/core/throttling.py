@@ -0,0 +1,90 @@
+"""
+Admission control for the password-hashing endpoints (login, register).
+
+PBKDF2 is deliberately slow, so a login storm can occupy every worker thread.
+Two layers keep that from starving the rest of the API:
+
+* Rate throttles per client IP and per submitted email/username, so one
+  client or one targeted account cannot queue unbounded hashing work. They
+  count in the default cache, which must be shared for the limits to hold
+  across workers (check core.W001).
+* `hashing_slot`, a per-process semaphore that caps how many threads hash at
+  once. With gunicorn's gthread workers (see Procfile) the remaining threads
+  keep serving dashboards; excess logins are shed with 503 + Retry-After
+  instead of queueing behind each other.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+
+class AuthBusy(Exception):
+    """No hashing slot became free within AUTH_HASHING_QUEUE_TIMEOUT"""
+
+
+_lock = threading.Lock()
+_semaphore = None
+_semaphore_size = None
+_in_flight = set()
+
+
+def _get_semaphore():
+    global _semaphore, _semaphore_size
+    size = settings.AUTH_HASHING_CONCURRENCY
+    with _lock:
+        if _semaphore is None or _semaphore_size != size:
+            _semaphore, _semaphore_size = threading.BoundedSemaphore(size), size
+        return _semaphore
+
+
+@contextmanager
+def hashing_slot(identity=None):
+    """
+    Hold one of the AUTH_HASHING_CONCURRENCY hashing slots. A second attempt
+    for the same identity while one is already running is rejected straight
+    away rather than hashed twice.
+    """
+    if identity:
+        identity = identity.lower()
+        with _lock:
+            if identity in _in_flight:
+                raise AuthBusy()
+            _in_flight.add(identity)
+    semaphore = _get_semaphore()
+    try:
+        if not semaphore.acquire(timeout=settings.AUTH_HASHING_QUEUE_TIMEOUT):
+            raise AuthBusy()
+        try:
+            yield
+        finally:
+            semaphore.release()
+    finally:
+        if identity:
+            with _lock:
+                _in_flight.discard(identity)
+
+
+class _AuthRateThrottle(SimpleRateThrottle):
+    """Rates come from settings.AUTH_THROTTLE_RATES so they can be tuned per deployment"""
+
+    def get_rate(self):
+        return settings.AUTH_THROTTLE_RATES.get(self.scope)
+
+
+class LoginIPRateThrottle(_AuthRateThrottle):
+    scope = 'auth_ip'
+
+    def get_cache_key(self, request, view):
+        return self.cache_format % {'scope': self.scope, 'ident': self.get_ident(request)}
+
+
+class LoginIdentityRateThrottle(_AuthRateThrottle):
+    scope = 'auth_identity'
+
+    def get_cache_key(self, request, view):
+        identity = request.data.get('username') or request.data.get('email')
+        if not identity:
+            return None
+        return self.cache_format % {'scope': self.scope, 'ident': str(identity).lower()}
@@ -7,11 +7,16 @@ urlpatterns = [
     path('auth/profile/', views.profile_view, name='profile'),
     path('auth/register/', views.patient_register, name='patient-register'),
     path('patients/', views.patient_list, name='patient-list'),
+    path('patients/search/', views.patient_search, name='patient-search'),
     path('patients/<int:pk>/', views.patient_detail, name='patient-detail'),
     path('appointments/', views.appointment_list, name='appointment-list'),
     path('appointments/<int:pk>/', views.appointment_detail, name='appointment-detail'),
     path('doctors/', views.doctor_list, name='doctor-list'),
+    path('doctors/slots/', views.department_slots, name='department-slots'),
+    path('doctors/<int:pk>/slots/', views.doctor_slots, name='doctor-slots'),
+    path('doctors/<int:pk>/schedule/', views.doctor_schedule, name='doctor-schedule'),
     path('medical-records/', views.medical_record_list, name='medical-record-list'),
+    path('medical-records/search/', views.medical_record_search, name='medical-record-search'),
     path('medical-records/<int:pk>/', views.medical_record_detail, name='medical-record-detail'),
     # Doctor-specific endpoints
     path('doctor/patients/', views.doctor_patients, name='doctor-patients'),
@@ -20,7 +25,15 @@ urlpatterns = [
     path('doctor/stats/', views.doctor_stats, name='doctor-stats'),
     # Patient-specific endpoints
     path('patient/dashboard/', views.patient_dashboard, name='patient-dashboard'),
-    # Admin notification endpoints
+    # Admin endpoints
+    path('admin/summary/', views.admin_summary, name='admin-summary'),
+    path('admin/profiles/', views.profile_list, name='profile-list'),
+    path('admin/profiles/token/', views.profile_token, name='profile-token'),
+    path('admin/profiles/<str:name>/', views.profile_download, name='profile-download'),
+    path('reports/', views.reports, name='reports'),
+    path('export/<str:resource>/', views.export_data, name='export'),
+    path('import/<str:resource>/', views.import_data, name='import'),
+    path('metrics', views.metrics_view, name='metrics'),  # Prometheus scrape target
     path('notifications/', views.notifications_list, name='notifications-list'),
     path('verify-patient/<int:pk>/', views.verify_patient, name='verify-patient'),
 ]
@@ -1,17 +1,47 @@
-from rest_framework.decorators import api_view, permission_classes
+import hmac
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, throttle_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
-from django.core.mail import send_mail
+from django.db import IntegrityError, transaction
 from django.template.loader import render_to_string
 from django.utils.html import strip_tags
 from django.conf import settings
-from .models import User, Patient, Appointment, MedicalRecord, Notification
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
+from datetime import timedelta
+from django.utils.dateparse import parse_date, parse_time
+from .models import User, Patient, Appointment, MedicalRecord, Notification, DoctorSchedule
+from .authentication import add_user_claims, db_user
+from .outbox import queue_email
+from .throttling import AuthBusy, hashing_slot, LoginIPRateThrottle, LoginIdentityRateThrottle
+from .stats import doctor_stats_counts, admin_summary_counts
+from .reports import build_report
+from .export import RESOURCES as EXPORT_RESOURCES, FORMATS as EXPORT_FORMATS, parse_since, stream_export
+from .importers import IMPORTERS, INPUT_FORMATS, import_rows
+from .availability import free_slots, weekly_schedule
+from .booking import SlotTaken, book_appointment, is_slot_conflict
+from .search import search_patients, search_records, record_terms
+from .filters import APPOINTMENT_FILTER, MEDICAL_RECORD_FILTER
+from .sync import changes
+from .conditional import conditional
+from .budget import query_budget
+from . import metrics, profiling
+from .pagination import (
+    paginate, paginate_ids, list_response, PATIENT_ORDERING, APPOINTMENT_ORDERING, NOTIFICATION_ORDERING,
+)
+
+def auth_busy_response():
+    return Response({
+        'success': False,
+        'message': 'Too many sign-in attempts right now. Please try again in a moment.'
+    }, status=status.HTTP_503_SERVICE_UNAVAILABLE, headers={'Retry-After': str(settings.AUTH_BUSY_RETRY_AFTER)})
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPRateThrottle, LoginIdentityRateThrottle])
 def login_view(request):
     """Login with email or username"""
     username = request.data.get('username') or request.data.get('email')
@@ -24,14 +54,18 @@ def login_view(request):
         }, status=status.HTTP_400_BAD_REQUEST)
     
     # Try with email if it contains @
-    if '@' in str(username):
-        try:
-            user_obj = User.objects.get(email=username)
-            user = authenticate(username=user_obj.username, password=password)
-        except User.DoesNotExist:
-            user = None
-    else:
-        user = authenticate(username=username, password=password)
+    try:
+        with hashing_slot(str(username)):
+            if '@' in str(username):
+                try:
+                    user_obj = User.objects.get(email=username)
+                    user = authenticate(username=user_obj.username, password=password)
+                except User.DoesNotExist:
+                    user = None
+            else:
+                user = authenticate(username=username, password=password)
+    except AuthBusy:
+        return auth_busy_response()
     
     if not user:
         return Response({
@@ -46,8 +80,8 @@ def login_view(request):
             'message': 'Your account is pending verification by an administrator. Please wait for approval.'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    # Generate JWT tokens
-    refresh = RefreshToken.for_user(user)
+    # Generate JWT tokens; the claims let StatelessJWTAuthentication skip the User lookup
+    refresh = add_user_claims(RefreshToken.for_user(user), user)
     
     return Response({
         'success': True,
@@ -80,9 +114,11 @@ def logout_view(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@query_budget(4)
+@conditional(lambda request: User.objects.filter(pk=request.user.id))
 def profile_view(request):
     """Get current user profile"""
-    user = request.user
+    user = db_user(request.user)
     return Response({
         'success': True,
         'data': {
@@ -99,9 +135,15 @@ def profile_view(request):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@query_budget(5)
+@conditional(Patient, User)
 def patient_list(request):
     if request.method == 'GET':
-        patients = Patient.objects.all()
+        queryset = Patient.objects.select_related('assigned_doctor')
+        patients, sync = changes(request, queryset)
+        pagination = None
+        if patients is None:
+            patients, pagination = paginate(request, queryset, PATIENT_ORDERING)
         data = [{
             'id': p.id,
             'patient_id': f"P{p.id:03d}",
@@ -116,7 +158,7 @@ def patient_list(request):
             'status': p.status,
             'created_at': p.created_at
         } for p in patients]
-        return Response({'success': True, 'data': data})
+        return list_response(data, pagination, sync=sync)
     
     if request.method == 'POST':
         try:
@@ -133,11 +175,43 @@ def patient_list(request):
         except Exception as e:
             return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@query_budget(4)
+def patient_search(request):
+    """Ranked typeahead matches for ?q= (name, email or phone fragment)"""
+    try:
+        limit = int(request.query_params.get('limit', settings.PATIENT_SEARCH_LIMIT))
+    except ValueError:
+        limit = 0
+    if limit < 1:
+        return Response({'success': False, 'message': 'limit must be a positive integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ids = search_patients(request.query_params.get('q', ''), min(limit, settings.PATIENT_SEARCH_MAX_LIMIT))
+    patients = Patient.objects.select_related('assigned_doctor').in_bulk(ids)
+    data = [{
+        'id': p.id,
+        'patient_id': f"P{p.id:03d}",
+        'name': p.name,
+        'email': p.email,
+        'phone': p.phone,
+        'contact': p.phone,
+        'age': p.age,
+        'gender': p.gender,
+        'condition': p.condition,
+        'assigned_doctor': p.assigned_doctor.get_full_name() if p.assigned_doctor else 'N/A',
+        'status': p.status,
+        'created_at': p.created_at
+    } for p in (patients[pk] for pk in ids if pk in patients)]
+    return Response({'success': True, 'data': data})
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@query_budget(4)
+@conditional(lambda request, pk: Patient.objects.filter(pk=pk), User)
 def patient_detail(request, pk):
     try:
-        patient = Patient.objects.get(id=pk)
+        patient = Patient.objects.select_related('assigned_doctor').get(id=pk)
     except Patient.DoesNotExist:
         return Response({'success': False, 'message': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -176,6 +250,8 @@ def patient_detail(request, pk):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@query_budget(4)
+@conditional(User)
 def doctor_list(request):
     if request.method == 'GET':
         doctors = User.objects.filter(role='doctor')
@@ -207,11 +283,111 @@ def doctor_list(request):
         except Exception as e:
             return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+def slot_range(request):
+    """Parse ?from=&to= (default: the next 7 days); returns (start, end, error response)"""
+    try:
+        start = parse_date(request.query_params['from']) if request.query_params.get('from') else timezone.localdate()
+        end = parse_date(request.query_params['to']) if request.query_params.get('to') else start and start + timedelta(days=6)
+    except ValueError:
+        start = end = None
+    if start is None or end is None:
+        return None, None, Response({'success': False, 'message': 'from and to must be YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+    if end < start or (end - start).days >= settings.SLOTS_MAX_DAYS:
+        return None, None, Response({'success': False, 'message': f'to must be on or after from, at most {settings.SLOTS_MAX_DAYS} days'}, status=status.HTTP_400_BAD_REQUEST)
+    return start, end, None
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@query_budget(6)
+def doctor_slots(request, pk):
+    """Free appointment slots for one doctor between ?from= and ?to="""
+    if not User.objects.filter(id=pk, role='doctor').exists():
+        return Response({'success': False, 'message': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    start, end, error = slot_range(request)
+    if error:
+        return error
+    
+    return Response({
+        'success': True,
+        'data': {
+            'doctor_id': pk,
+            'from': start,
+            'to': end,
+            'slots': free_slots([pk], start, end)[pk]
+        }
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@query_budget(5)
+def department_slots(request):
+    """Free slots for every active doctor, optionally in one ?department=, between ?from= and ?to="""
+    start, end, error = slot_range(request)
+    if error:
+        return error
+    
+    doctors = User.objects.filter(role='doctor', is_active=True).order_by('id')
+    if request.query_params.get('department'):
+        doctors = doctors.filter(department__iexact=request.query_params['department'])
+    doctors = list(doctors.only('id', 'first_name', 'last_name', 'username', 'department'))
+    
+    slots = free_slots([d.id for d in doctors], start, end)
+    data = [{
+        'doctor_id': d.id,
+        'doctor_name': d.get_full_name() or d.username,
+        'department': d.department or 'General',
+        'slots': slots[d.id]
+    } for d in doctors]
+    return Response({'success': True, 'data': data, 'from': start, 'to': end})
+
+@api_view(['GET', 'PUT'])
+@permission_classes([IsAuthenticated])
+@query_budget(4)
+def doctor_schedule(request, pk):
+    """Weekly working hours for a doctor; PUT replaces them (admin or the doctor)"""
+    if not User.objects.filter(id=pk, role='doctor').exists():
+        return Response({'success': False, 'message': 'Doctor not found'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if request.method == 'PUT':
+        if request.user.role != 'admin' and request.user.id != pk:
+            return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+        
+        # Only an explicit empty list resets to the default hours; a body without one is a mistake
+        schedule = request.data.get('schedule')
+        if not isinstance(schedule, list):
+            return Response({'success': False, 'message': 'schedule must be a list of blocks ([] resets to the default hours)'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        blocks = []
+        for block in schedule:
+            try:
+                weekday = int(block['weekday'])
+                start_time, end_time = parse_time(block['start']), parse_time(block['end'])
+                slot_minutes = int(block.get('slot_minutes', 30))
+            except (KeyError, TypeError, ValueError):
+                start_time = end_time = None
+            if start_time is None or end_time is None or not 0 <= weekday <= 6 or start_time >= end_time or slot_minutes <= 0:
+                return Response({'success': False, 'message': 'Each block needs weekday 0-6, start < end (HH:MM) and a positive slot_minutes'}, status=status.HTTP_400_BAD_REQUEST)
+            blocks.append(DoctorSchedule(doctor_id=pk, weekday=weekday, start_time=start_time, end_time=end_time, slot_minutes=slot_minutes))
+        
+        with transaction.atomic():
+            DoctorSchedule.objects.filter(doctor_id=pk).delete()
+            DoctorSchedule.objects.bulk_create(blocks)
+    
+    is_default, data = weekly_schedule(pk)
+    return Response({'success': True, 'data': {'doctor_id': pk, 'is_default': is_default, 'schedule': data}})
+
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@query_budget(6)
+@conditional(Appointment, Patient, User)
 def appointment_list(request):
     if request.method == 'GET':
-        appointments = Appointment.objects.all()
+        queryset = Appointment.objects.select_related('patient', 'doctor')
+        appointments, sync = changes(request, queryset)
+        pagination = facets = None
+        if appointments is None:
+            appointments, pagination, facets = APPOINTMENT_FILTER.paginate(request, queryset)
         data = [{
             'id': a.id,
             'patient_name': a.patient.name,
@@ -221,27 +397,40 @@ def appointment_list(request):
             'type': a.type,
             'status': a.status
         } for a in appointments]
-        return Response({'success': True, 'data': data})
+        return list_response(data, pagination, facets, sync)
     
     if request.method == 'POST':
         try:
-            appointment = Appointment.objects.create(
-                patient_id=request.data.get('patient_id'),
-                doctor_id=request.data.get('doctor_id'),
-                date=request.data.get('date'),
-                time=request.data.get('time'),
+            day = parse_date(str(request.data.get('date', '')))
+            at = parse_time(str(request.data.get('time', '')))
+        except ValueError:
+            day = at = None
+        if day is None or at is None:
+            return Response({'success': False, 'message': 'date (YYYY-MM-DD) and time (HH:MM) are required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        try:
+            appointment = book_appointment(
+                # NewAppointmentModal sends patient/doctor, older clients patient_id/doctor_id
+                request.data.get('patient_id') or request.data.get('patient'),
+                request.data.get('doctor_id') or request.data.get('doctor'),
+                day,
+                at,
                 type=request.data.get('type', 'Consultation'),
+                notes=request.data.get('notes') or None,
                 status='Scheduled'
             )
-            return Response({'success': True, 'message': 'Appointment created'})
+            return Response({'success': True, 'message': 'Appointment created', 'data': {'id': appointment.id}})
+        except SlotTaken:
+            return Response({'success': False, 'message': 'The doctor already has an appointment at this time'}, status=status.HTTP_409_CONFLICT)
         except Exception as e:
             return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@query_budget(4)
 def appointment_detail(request, pk):
     try:
-        appointment = Appointment.objects.get(id=pk)
+        appointment = Appointment.objects.select_related('patient', 'doctor').get(id=pk)
     except Appointment.DoesNotExist:
         return Response({'success': False, 'message': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -261,7 +450,14 @@ def appointment_detail(request, pk):
     
     if request.method == 'PUT':
         appointment.status = request.data.get('status', appointment.status)
-        appointment.save()
+        try:
+            # Re-activating a cancelled appointment must not take a slot someone else has booked since
+            with transaction.atomic():
+                appointment.save()
+        except IntegrityError as e:
+            if not is_slot_conflict(e):
+                raise
+            return Response({'success': False, 'message': 'The doctor already has an appointment at this time'}, status=status.HTTP_409_CONFLICT)
         return Response({'success': True, 'message': 'Updated'})
     
     if request.method == 'DELETE':
@@ -270,9 +466,15 @@ def appointment_detail(request, pk):
 
 @api_view(['GET', 'POST'])
 @permission_classes([IsAuthenticated])
+@query_budget(6)
+@conditional(MedicalRecord, Patient, User)
 def medical_record_list(request):
     if request.method == 'GET':
-        records = MedicalRecord.objects.select_related('patient', 'doctor').distinct()
+        queryset = MedicalRecord.objects.select_related('patient', 'doctor').distinct()
+        records, sync = changes(request, queryset)
+        pagination = facets = None
+        if records is None:
+            records, pagination, facets = MEDICAL_RECORD_FILTER.paginate(request, queryset)
         data = [{
             'id': r.id,
             'patient_id': r.patient.id,
@@ -283,13 +485,13 @@ def medical_record_list(request):
             'status': r.status,
             'created_at': r.created_at.isoformat()
         } for r in records]
-        return Response({'success': True, 'data': data})
+        return list_response(data, pagination, facets, sync)
     
     if request.method == 'POST':
         try:
             record = MedicalRecord.objects.create(
                 patient_id=request.data.get('patient_id'),
-                doctor=request.user,
+                doctor_id=request.user.id,
                 record_type=request.data.get('record_type'),
                 description=request.data.get('description'),
                 status='Pending'
@@ -298,11 +500,45 @@ def medical_record_list(request):
         except Exception as e:
             return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@query_budget(4)
+def medical_record_search(request):
+    """Full-text search over record descriptions (?q=), newest first, with highlighted snippets"""
+    query = request.query_params.get('q', '')
+    if not record_terms(query)[0]:
+        return Response({'success': False, 'message': 'q must contain a word or "phrase" to search for'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    ids = MEDICAL_RECORD_FILTER.id_filters(request.query_params)
+    choices = MEDICAL_RECORD_FILTER.choice_filters(request.query_params)
+    matches, pagination = paginate_ids(request, lambda before_id, limit: search_records(
+        query, before_id, limit,
+        record_types=choices.get('record_type', ()),
+        statuses=choices.get('status', ()),
+        doctor_id=ids.get('doctor_id'),
+        patient_id=ids.get('patient_id'),
+    ))
+    snippets = dict(matches)
+    records = MedicalRecord.objects.select_related('patient', 'doctor').in_bulk(snippets)
+    data = [{
+        'id': r.id,
+        'patient_id': r.patient.id,
+        'patient_name': r.patient.name,
+        'doctor_name': r.doctor.get_full_name() or r.doctor.username,
+        'record_type': r.record_type,
+        'description': r.description,
+        'snippet': snippets[r.id],
+        'status': r.status,
+        'created_at': r.created_at.isoformat()
+    } for r in (records[pk] for pk, _ in matches if pk in records)]
+    return list_response(data, pagination)
+
 @api_view(['GET', 'PUT', 'DELETE'])
 @permission_classes([IsAuthenticated])
+@query_budget(4)
 def medical_record_detail(request, pk):
     try:
-        record = MedicalRecord.objects.get(id=pk)
+        record = MedicalRecord.objects.select_related('patient', 'doctor').get(id=pk)
     except MedicalRecord.DoesNotExist:
         return Response({'success': False, 'message': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
     
@@ -331,12 +567,14 @@ def medical_record_detail(request, pk):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@query_budget(4)
+@conditional(Patient, roles=('doctor',))
 def doctor_patients(request):
     """Get all patients assigned to the logged-in doctor"""
     if request.user.role != 'doctor':
         return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    patients = Patient.objects.filter(assigned_doctor=request.user)
+    patients, pagination = paginate(request, Patient.objects.filter(assigned_doctor_id=request.user.id), PATIENT_ORDERING)
     data = [{
         'id': p.id,
         'patient_id': f"P{p.id:03d}",
@@ -350,16 +588,20 @@ def doctor_patients(request):
         'status': p.status,
         'created_at': p.created_at
     } for p in patients]
-    return Response({'success': True, 'data': data})
+    return list_response(data, pagination)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@query_budget(5)
+@conditional(Appointment, Patient, roles=('doctor',))
 def doctor_appointments(request):
     """Get all appointments for the logged-in doctor"""
     if request.user.role != 'doctor':
         return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
     
-    appointments = Appointment.objects.filter(doctor=request.user)
+    appointments, pagination = paginate(
+        request, Appointment.objects.filter(doctor_id=request.user.id).select_related('patient'), APPOINTMENT_ORDERING
+    )
     data = [{
         'id': a.id,
         'patient_name': a.patient.name,
@@ -370,35 +612,201 @@ def doctor_appointments(request):
         'status': a.status,
         'notes': a.notes
     } for a in appointments]
-    return Response({'success': True, 'data': data})
+    return list_response(data, pagination)
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@query_budget(4)
 def doctor_stats(request):
     """Get statistics for the logged-in doctor"""
     if request.user.role != 'doctor':
         return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
     
+    stats = doctor_stats_counts(request.user.id)
+    
+    return Response({'success': True, 'data': stats})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@query_budget(5)
+def admin_summary(request):
+    """Totals, today's appointments and unread notifications for the admin dashboard"""
+    if request.user.role != 'admin':
+        return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        limit = min(max(int(request.query_params.get('limit', 5)), 1), 50)
+        notifications_limit = min(max(int(request.query_params.get('notifications_limit', 20)), 1), 50)
+    except ValueError:
+        return Response({'success': False, 'message': 'limit must be an integer'}, status=status.HTTP_400_BAD_REQUEST)
+    
     from datetime import date
-    today = date.today()
+    todays_appointments = Appointment.objects.filter(date=date.today()).select_related(
+        'patient', 'doctor'
+    ).order_by('time', 'id')[:limit]
+    notifications = Notification.objects.filter(is_read=False).select_related('user')[:notifications_limit]
+    
+    return Response({
+        'success': True,
+        'data': {
+            'stats': admin_summary_counts(request.user.id),
+            'todays_appointments': [{
+                'id': a.id,
+                'patient_name': a.patient.name,
+                'doctor_name': a.doctor.get_full_name() or a.doctor.username,
+                'date': a.date,
+                'time': a.time,
+                'type': a.type,
+                'status': a.status
+            } for a in todays_appointments],
+            'notifications': [{
+                'id': n.id,
+                'notification_type': n.notification_type,
+                'title': n.title,
+                'message': n.message,
+                'user_id': n.user.id if n.user else None,
+                'user_name': n.user.get_full_name() if n.user else None,
+                'user_email': n.user.email if n.user else None,
+                'is_read': n.is_read,
+                'created_at': n.created_at
+            } for n in notifications]
+        }
+    })
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@query_budget(11, db_ms=1000)
+def reports(request):
+    """Aggregated analytics for the Reports page, optionally limited to ?start=&end=&department="""
+    if request.user.role != 'admin':
+        return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    params = request.query_params
+    try:
+        start = parse_date(params['start']) if params.get('start') else None
+        end = parse_date(params['end']) if params.get('end') else None
+        if (params.get('start') and not start) or (params.get('end') and not end):
+            raise ValueError
+    except ValueError:
+        return Response({'success': False, 'message': 'start and end must be YYYY-MM-DD dates'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    department = params.get('department')
+    if department == 'all':
+        department = None
+    
+    return Response({'success': True, 'data': build_report(start, end, department)})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def export_data(request, resource):
+    """Stream a full or incremental (?since=) export as NDJSON or CSV (?output=), optionally gzipped (?gzip=1)"""
+    if request.user.role != 'admin':
+        return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    if resource not in EXPORT_RESOURCES:
+        return Response({'success': False, 'message': f'Unknown resource. Use one of: {", ".join(EXPORT_RESOURCES)}'}, status=status.HTTP_404_NOT_FOUND)
+    
+    output_format = request.query_params.get('output', 'ndjson')
+    if output_format not in EXPORT_FORMATS:
+        return Response({'success': False, 'message': 'output must be ndjson or csv'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    since = None
+    if request.query_params.get('since'):
+        since = parse_since(request.query_params['since'])
+        if since is None:
+            return Response({'success': False, 'message': 'since must be an ISO 8601 datetime'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    compress = request.query_params.get('gzip') in ('1', 'true')
+    filename = f'{resource}.{output_format}' + ('.gz' if compress else '')
+    response = StreamingHttpResponse(
+        stream_export(resource, output_format, since, compress),
+        content_type='application/gzip' if compress else EXPORT_FORMATS[output_format],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def import_data(request, resource):
+    """Bulk import patients or appointments from CSV or NDJSON (multipart `file` or raw request body)"""
+    if request.user.role != 'admin':
+        return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    if resource not in IMPORTERS:
+        return Response({'success': False, 'message': f'Unknown resource. Use one of: {", ".join(IMPORTERS)}'}, status=status.HTTP_404_NOT_FOUND)
+    
+    if request.content_type.startswith('multipart/'):
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'success': False, 'message': 'Upload the data as the "file" field'}, status=status.HTTP_400_BAD_REQUEST)
+        default_format = 'ndjson' if upload.name.endswith(('.ndjson', '.jsonl')) else 'csv'
+    else:
+        # Read the raw body as a stream rather than request.body, which would
+        # load it all into memory and is capped by DATA_UPLOAD_MAX_MEMORY_SIZE
+        upload = request._request
+        default_format = 'ndjson' if 'ndjson' in request.content_type else 'csv'
     
-    total_patients = Patient.objects.filter(assigned_doctor=request.user).count()
-    total_appointments = Appointment.objects.filter(doctor=request.user).count()
-    todays_appointments = Appointment.objects.filter(doctor=request.user, date=today).count()
-    pending_appointments = Appointment.objects.filter(doctor=request.user, status='Pending').count()
+    input_format = request.query_params.get('input', default_format)
+    if input_format not in INPUT_FORMATS:
+        return Response({'success': False, 'message': 'input must be csv or ndjson'}, status=status.HTTP_400_BAD_REQUEST)
+    
+    result = import_rows(resource, upload, input_format)
+    return Response({'success': True, 'data': result.as_dict()})
+
+@api_view(['GET'])
+@authentication_classes([])  # the scraper sends METRICS_TOKEN, not a JWT
+@permission_classes([AllowAny])
+def metrics_view(request):
+    """Per-view request metrics of every worker, in the Prometheus text format"""
+    token = settings.METRICS_TOKEN
+    if token:
+        if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    elif not settings.DEBUG:
+        return Response({'success': False, 'message': 'Set METRICS_TOKEN to enable metrics'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def profile_token(request):
+    """A short-lived token; a request sent with it as X-Profile (or ?profile=) is profiled"""
+    if request.user.role != 'admin':
+        return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
     
     return Response({
         'success': True,
         'data': {
-            'totalPatients': total_patients,
-            'totalAppointments': total_appointments,
-            'todaysAppointments': todays_appointments,
-            'pendingAppointments': pending_appointments
+            'token': profiling.mint_token(request.user.id),
+            'header': 'X-Profile',
+            'expires_in': settings.PROFILE_TOKEN_MAX_AGE,
         }
     })
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+def profile_list(request):
+    """Saved request profiles, newest first"""
+    if request.user.role != 'admin':
+        return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    return Response({'success': True, 'data': profiling.list_profiles()})
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def profile_download(request, name):
+    """One saved profile as collapsed stacks (open it in speedscope or flamegraph.pl)"""
+    if request.user.role != 'admin':
+        return Response({'success': False, 'message': 'Not authorized'}, status=status.HTTP_403_FORBIDDEN)
+    
+    path = profiling.profile_path(name)
+    if path is None:
+        return Response({'success': False, 'message': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=name, content_type='text/plain; charset=utf-8')
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@query_budget(5)
 def doctor_patient_detail(request, pk):
     """Get detailed patient information including medical records for doctors"""
     if request.user.role != 'doctor':
@@ -406,12 +814,12 @@ def doctor_patient_detail(request, pk):
     
     try:
         # Only allow doctor to view their assigned patients
-        patient = Patient.objects.get(id=pk, assigned_doctor=request.user)
+        patient = Patient.objects.get(id=pk, assigned_doctor_id=request.user.id)
     except Patient.DoesNotExist:
         return Response({'success': False, 'message': 'Patient not found or not assigned to you'}, status=status.HTTP_404_NOT_FOUND)
     
     # Get patient's medical records
-    medical_records = MedicalRecord.objects.filter(patient=patient)
+    medical_records = MedicalRecord.objects.filter(patient=patient).select_related('doctor')
     records_data = [{
         'id': r.id,
         'record_type': r.record_type,
@@ -422,7 +830,7 @@ def doctor_patient_detail(request, pk):
     } for r in medical_records]
     
     # Get patient's appointments
-    appointments = Appointment.objects.filter(patient=patient)
+    appointments = Appointment.objects.filter(patient=patient).select_related('doctor')
     appointments_data = [{
         'id': a.id,
         'date': a.date,
@@ -453,6 +861,7 @@ def doctor_patient_detail(request, pk):
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
+@throttle_classes([LoginIPRateThrottle, LoginIdentityRateThrottle])
 def patient_register(request):
     """Register a new patient account - requires admin verification"""
     try:
@@ -476,19 +885,22 @@ def patient_register(request):
                 'message': 'An account with this email already exists'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create unverified patient user
+        # Create unverified patient user (the password is hashed once, inside a hashing slot)
         username = email.split('@')[0] + '_' + str(User.objects.count() + 1)
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            first_name=first_name,
-            last_name=last_name,
-            phone=phone,
-            role='patient',
-            is_verified=False  # Requires admin verification
-        )
-        user.set_password(password)
-        user.save()
+        try:
+            with hashing_slot(email):
+                user = User.objects.create_user(
+                    username=username,
+                    email=email,
+                    password=password,
+                    first_name=first_name,
+                    last_name=last_name,
+                    phone=phone,
+                    role='patient',
+                    is_verified=False  # Requires admin verification
+                )
+        except AuthBusy:
+            return auth_busy_response()
         
         # Create notification for admin
         Notification.objects.create(
@@ -511,6 +923,8 @@ def patient_register(request):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@query_budget(5)
+@conditional(Notification, User, roles=('admin',))
 def notifications_list(request):
     """Get all notifications (for admin)"""
     if request.user.role != 'admin':
@@ -519,7 +933,11 @@ def notifications_list(request):
             'message': 'Not authorized'
         }, status=status.HTTP_403_FORBIDDEN)
     
-    notifications = Notification.objects.all()
+    queryset = Notification.objects.select_related('user')
+    notifications, sync = changes(request, queryset)
+    pagination = None
+    if notifications is None:
+        notifications, pagination = paginate(request, queryset, NOTIFICATION_ORDERING)
     data = [{
         'id': n.id,
         'notification_type': n.notification_type,
@@ -532,7 +950,7 @@ def notifications_list(request):
         'created_at': n.created_at
     } for n in notifications]
     
-    return Response({'success': True, 'data': data})
+    return list_response(data, pagination, sync=sync)
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -549,27 +967,29 @@ def verify_patient(request, pk):
         action = request.data.get('action')  # 'approve' or 'reject'
         
         if action == 'approve':
-            user.is_verified = True
-            user.save()
-            
-            # Create Patient profile if it doesn't exist
-            if not Patient.objects.filter(user=user).exists():
-                Patient.objects.create(
-                    user=user,
-                    name=user.get_full_name(),
-                    email=user.email,
-                    phone=user.phone or '',
-                    age=0,  # Admin can update this later
-                    gender='Not Specified',
-                    condition='New Patient',
-                    assigned_doctor=None
-                )
-            
-            # Mark related notification as read
-            Notification.objects.filter(user=user, notification_type='patient_registration').update(is_read=True)
-            
-            # Send approval email to patient
-            try:
+            # The approval and its email are committed together; the email itself
+            # is delivered later by `manage.py send_outbox`, never inside the request.
+            with transaction.atomic():
+                user.is_verified = True
+                user.save()
+                
+                # Create Patient profile if it doesn't exist
+                if not Patient.objects.filter(user=user).exists():
+                    Patient.objects.create(
+                        user=user,
+                        name=user.get_full_name(),
+                        email=user.email,
+                        phone=user.phone or '',
+                        age=0,  # Admin can update this later
+                        gender='Not Specified',
+                        condition='New Patient',
+                        assigned_doctor=None
+                    )
+                
+                # Mark related notification as read
+                Notification.objects.filter(user=user, notification_type='patient_registration').update(is_read=True, updated_at=timezone.now())
+                
+                # Queue approval email to patient
                 login_url = f"{settings.FRONTEND_URL}/login"
                 context = {
                     'patient_name': user.get_full_name() or user.username,
@@ -579,28 +999,21 @@ def verify_patient(request, pk):
                 }
                 
                 html_message = render_to_string('emails/patient_approval.html', context)
-                plain_message = strip_tags(html_message)
-                
-                send_mail(
+                queue_email(
+                    recipient=user.email,
                     subject='Your Medicare Hospital Account Has Been Approved!',
-                    message=plain_message,
-                    from_email=settings.DEFAULT_FROM_EMAIL,
-                    recipient_list=[user.email],
-                    html_message=html_message,
-                    fail_silently=False,
+                    body=strip_tags(html_message),
+                    html_body=html_message,
                 )
-            except Exception as e:
-                # Log the error but don't fail the approval process
-                print(f"Error sending approval email: {str(e)}")
             
             return Response({
                 'success': True,
-                'message': f'Patient {user.get_full_name()} has been verified and can now login. Approval email sent.'
+                'message': f'Patient {user.get_full_name()} has been verified and can now login. Approval email queued.'
             })
         
         elif action == 'reject':
             # Mark notification as read and optionally delete user
-            Notification.objects.filter(user=user, notification_type='patient_registration').update(is_read=True)
+            Notification.objects.filter(user=user, notification_type='patient_registration').update(is_read=True, updated_at=timezone.now())
             user.delete()
             
             return Response({
@@ -622,6 +1035,7 @@ def verify_patient(request, pk):
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
+@query_budget(6)
 def patient_dashboard(request):
     """Get patient dashboard data including appointments and medical records"""
     if request.user.role != 'patient':
@@ -632,10 +1046,10 @@ def patient_dashboard(request):
     
     try:
         # Get patient profile
-        patient = Patient.objects.get(user=request.user)
+        patient = Patient.objects.select_related('assigned_doctor').get(user_id=request.user.id)
         
         # Get appointments
-        appointments = Appointment.objects.filter(patient=patient)
+        appointments = Appointment.objects.filter(patient=patient).select_related('doctor')
         appointments_data = [{
             'id': a.id,
             'doctor_name': a.doctor.get_full_name() or a.doctor.username,
@@ -647,7 +1061,7 @@ def patient_dashboard(request):
         } for a in appointments]
         
         # Get medical records
-        medical_records = MedicalRecord.objects.filter(patient=patient)
+        medical_records = MedicalRecord.objects.filter(patient=patient).select_related('doctor')
         records_data = [{
             'id': r.id,
             'doctor_name': r.doctor.get_full_name() or r.doctor.username,
@@ -678,13 +1092,14 @@ def patient_dashboard(request):
         
     except Patient.DoesNotExist:
         # Patient user exists but no patient profile yet
+        user = db_user(request.user)
         return Response({
             'success': True,
             'data': {
                 'patient': {
-                    'name': request.user.get_full_name(),
-                    'email': request.user.email,
-                    'phone': request.user.phone or ''
+                    'name': user.get_full_name(),
+                    'email': user.email,
+                    'phone': user.phone or ''
                 },
                 'appointments': [],
                 'medical_records': [],
@@ -0,0 +1,12 @@
+"""
+Gunicorn picks this file up from the working directory; the Procfile's
+command-line flags are applied on top of it.
+"""
+import os
+
+
+def on_starting(server):
+    """Start every server with empty request metrics (see core/metrics.py)"""
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
+    from core.metrics import clear
+    clear()
@@ -47,30 +47,21 @@ const AdminDashboard = () => {
       const token = localStorage.getItem('access_token');
       const headers = { Authorization: `Bearer ${token}` };
 
-      const [patientsRes, doctorsRes, appointmentsRes, notificationsRes] = await Promise.all([
-        axios.get(`${API_URL}/patients/`, { headers }),
-        axios.get(`${API_URL}/doctors/`, { headers }),
-        axios.get(`${API_URL}/appointments/`, { headers }),
-        axios.get(`${API_URL}/notifications/`, { headers })
-      ]);
-
-      const patients = patientsRes.data.data || [];
-      const doctors = doctorsRes.data.data || [];
-      const appointments = appointmentsRes.data.data || [];
-      const notifs = notificationsRes.data.data || [];
-
-      const today = new Date().toISOString().split('T')[0];
-      const todaysApts = appointments.filter(apt => apt.date === today);
+      const response = await axios.get(`${API_URL}/admin/summary/`, {
+        headers,
+        params: { limit: 5 }
+      });
+      const summary = response.data.data;
 
       setStats({
-        totalPatients: patients.length,
-        totalDoctors: doctors.length,
-        todaysAppointments: todaysApts.length,
-        pendingRecords: 3
+        totalPatients: summary.stats.totalPatients,
+        totalDoctors: summary.stats.totalDoctors,
+        todaysAppointments: summary.stats.todaysAppointments,
+        pendingRecords: summary.stats.pendingRecords
       });
 
-      setTodaysAppointments(todaysApts.slice(0, 5));
-      setNotifications(notifs);
+      setTodaysAppointments(summary.todays_appointments || []);
+      setNotifications(summary.notifications || []);
       
       setRecentActivities([
         { icon: '👤', title: 'New patient registered', description: 'John Doe registered 2 minutes ago' },
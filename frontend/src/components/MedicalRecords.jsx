@@ -51,13 +51,19 @@ const MedicalRecords = () => {
 
   useEffect(() => {
     fetchRecords();
-  }, []);
+  }, [startDate, endDate, recordType]);
 
   const fetchRecords = async () => {
     try {
       const token = localStorage.getItem('access_token');
+      // Type and date range are filtered by the server
+      const params = {};
+      if (recordType !== 'all') params.record_type = recordType;
+      if (startDate) params.date_from = startDate;
+      if (endDate) params.date_to = endDate;
       const response = await axios.get(`${API_URL}/medical-records/`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params
       });
       
       if (response.data.success) {
@@ -71,12 +77,17 @@ const MedicalRecords = () => {
   };
 
   const filteredRecords = records.filter(record => {
-    const matchesSearch = record.patient_name?.toLowerCase().includes(searchQuery.toLowerCase()) ||
-                         record.record_id?.toLowerCase().includes(searchQuery.toLowerCase());
-    const matchesType = recordType === 'all' || record.record_type === recordType;
-    return matchesSearch && matchesType;
+    return record.patient_name?.toLowerCase().includes(searchQuery.toLowerCase()) ||
+           record.record_id?.toLowerCase().includes(searchQuery.toLowerCase());
   });
 
+  const clearFilters = () => {
+    setSearchQuery('');
+    setStartDate('');
+    setEndDate('');
+    setRecordType('all');
+  };
+
   const handleViewRecord = (record) => {
     setSelectedRecord(record);
     setShowViewModal(true);
@@ -279,7 +290,7 @@ const MedicalRecords = () => {
               </select>
             </div>
 
-            <button className="btn-clear-filters">🔄 Clear Filters</button>
+            <button className="btn-clear-filters" onClick={clearFilters}>🔄 Clear Filters</button>
           </div>
 
           <div className="records-section">
@@ -15,6 +15,7 @@ export default function NewAppointmentModal({ open, onClose, onCreated }) {
     status: 'Scheduled',
     notes: ''
   });
+  const [slots, setSlots] = useState(null);
   const [submitting, setSubmitting] = useState(false);
   const [error, setError] = useState('');
 
@@ -34,6 +35,21 @@ export default function NewAppointmentModal({ open, onClose, onCreated }) {
       .catch(() => setError('Failed loading patients/doctors'));
   }, [open]);
 
+  useEffect(() => {
+    // Offer only the doctor's free slots for the chosen day; fall back to a
+    // free-form time input if they cannot be loaded
+    setSlots(null);
+    if (!open || !form.doctor || !form.date) return;
+    const token = localStorage.getItem('access_token');
+    const headers = { Authorization: `Bearer ${token}` };
+    axios.get(`${API_URL}/doctors/${form.doctor}/slots/`, {
+      headers,
+      params: { from: form.date, to: form.date }
+    })
+      .then((res) => setSlots(res.data.data?.slots?.[form.date] || []))
+      .catch(() => setSlots(null));
+  }, [open, form.doctor, form.date]);
+
   const handleChange = (e) => {
     const { name, value } = e.target;
     setForm((f) => ({ ...f, [name]: value }));
@@ -78,7 +94,7 @@ export default function NewAppointmentModal({ open, onClose, onCreated }) {
     } catch (err) {
       const msg = err.response?.data?.errors
         ? JSON.stringify(err.response.data.errors)
-        : 'Server error creating appointment';
+        : err.response?.data?.message || 'Server error creating appointment';
       setError(msg);
     } finally {
       setSubmitting(false);
@@ -127,7 +143,16 @@ export default function NewAppointmentModal({ open, onClose, onCreated }) {
 
           <div className="form-group">
             <label>Time</label>
-            <input type="time" name="time" value={form.time} onChange={handleChange} required />
+            {slots ? (
+              <select name="time" value={form.time} onChange={handleChange} required>
+                <option value="">{slots.length ? 'Select a free slot' : 'No free slots this day'}</option>
+                {slots.map(t => (
+                  <option key={t} value={t}>{t}</option>
+                ))}
+              </select>
+            ) : (
+              <input type="time" name="time" value={form.time} onChange={handleChange} required />
+            )}
           </div>
 
           <div className="form-group">
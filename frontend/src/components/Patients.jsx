@@ -1,4 +1,4 @@
-import { useState, useContext, useEffect } from 'react';
+import { useState, useContext, useEffect, useRef } from 'react';
 import { useNavigate, useLocation } from 'react-router-dom';
 import { AuthContext } from '../context/AuthContext';
 import { useAlert } from './CustomAlert';
@@ -24,6 +24,8 @@ const Patients = () => {
   const [showViewModal, setShowViewModal] = useState(false);
   const [showEditModal, setShowEditModal] = useState(false);
   const [selectedPatient, setSelectedPatient] = useState(null);
+  // Token from the last list response; later fetches only ask for what changed since
+  const syncToken = useRef(null);
 
   const handleLogout = () => {
     showConfirm(
@@ -54,20 +56,40 @@ const Patients = () => {
   const fetchPatients = async () => {
     try {
       const token = localStorage.getItem('access_token');
+      const since = syncToken.current;
       const response = await axios.get(`${API_URL}/patients/`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params: since ? { since } : {}
       });
       
       if (response.data.success) {
-        setPatients(response.data.data);
+        syncToken.current = response.data.since;
+        if (since) {
+          const { data: changed, deleted } = response.data;
+          setPatients(prev => mergeChanges(prev, changed, deleted));
+        } else {
+          setPatients(response.data.data);
+        }
       }
       setLoading(false);
     } catch (error) {
+      if (error.response?.status === 410 && syncToken.current) {
+        // Too old to sync from; reload the whole list
+        syncToken.current = null;
+        return fetchPatients();
+      }
       console.error('Error fetching patients:', error);
       setLoading(false);
     }
   };
 
+  const mergeChanges = (current, changed, deleted) => {
+    const removed = new Set(deleted);
+    const byId = new Map(current.filter(p => !removed.has(p.id)).map(p => [p.id, p]));
+    changed.forEach(p => byId.set(p.id, p));
+    return [...byId.values()].sort((a, b) => a.id - b.id);
+  };
+
   const handleViewPatient = (patient) => {
     setSelectedPatient(patient);
     setShowViewModal(true);
@@ -21,6 +21,7 @@ const ReceptionistAppointments = () => {
   const [searchQuery, setSearchQuery] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
   const [dateFilter, setDateFilter] = useState('all');
+  const [statusCounts, setStatusCounts] = useState({});
   const [showProfileMenu, setShowProfileMenu] = useState(false);
 
   const handleLogout = () => {
@@ -42,21 +43,47 @@ const ReceptionistAppointments = () => {
 
   useEffect(() => {
     fetchAppointments();
-  }, []);
+  }, [statusFilter, dateFilter]);
 
   useEffect(() => {
     filterAppointments();
-  }, [appointments, searchQuery, statusFilter, dateFilter]);
+  }, [appointments, searchQuery]);
+
+  const isoDate = (date) => {
+    const month = String(date.getMonth() + 1).padStart(2, '0');
+    const day = String(date.getDate()).padStart(2, '0');
+    return `${date.getFullYear()}-${month}-${day}`;
+  };
+
+  // Status and date filters run on the server; the status counts come back
+  // as facets in the same response
+  const filterParams = () => {
+    const params = { facets: 'status' };
+    if (statusFilter !== 'all') params.status = statusFilter;
+
+    const today = new Date();
+    if (dateFilter === 'today') {
+      params.date_from = params.date_to = isoDate(today);
+    } else if (dateFilter === 'week') {
+      params.date_from = isoDate(today);
+      params.date_to = isoDate(new Date(today.getTime() + 7 * 24 * 60 * 60 * 1000));
+    } else if (dateFilter === 'upcoming') {
+      params.date_from = isoDate(today);
+    }
+    return params;
+  };
 
   const fetchAppointments = async () => {
     try {
       const token = localStorage.getItem('access_token');
       const response = await axios.get(`${API_URL}/appointments/`, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params: filterParams()
       });
       
       if (response.data.success) {
         setAppointments(response.data.data);
+        setStatusCounts(response.data.facets?.status || {});
       }
       setLoading(false);
     } catch (error) {
@@ -76,31 +103,6 @@ const ReceptionistAppointments = () => {
       );
     }
 
-    // Status filter
-    if (statusFilter !== 'all') {
-      filtered = filtered.filter(apt => apt.status === statusFilter);
-    }
-
-    // Date filter
-    const today = new Date();
-    today.setHours(0, 0, 0, 0);
-    
-    if (dateFilter === 'today') {
-      filtered = filtered.filter(apt => {
-        const aptDate = new Date(apt.date);
-        aptDate.setHours(0, 0, 0, 0);
-        return aptDate.getTime() === today.getTime();
-      });
-    } else if (dateFilter === 'week') {
-      const weekFromNow = new Date(today.getTime() + 7 * 24 * 60 * 60 * 1000);
-      filtered = filtered.filter(apt => {
-        const aptDate = new Date(apt.date);
-        return aptDate >= today && aptDate <= weekFromNow;
-      });
-    } else if (dateFilter === 'upcoming') {
-      filtered = filtered.filter(apt => new Date(apt.date) >= today);
-    }
-
     setFilteredAppointments(filtered);
   };
 
@@ -113,9 +115,7 @@ const ReceptionistAppointments = () => {
         { headers: { Authorization: `Bearer ${token}` } }
       );
       
-      setAppointments(appointments.map(apt => 
-        apt.id === appointmentId ? { ...apt, status: newStatus } : apt
-      ));
+      fetchAppointments();
       showSuccess('Appointment status updated successfully!');
     } catch (error) {
       console.error('Error updating appointment:', error);
@@ -133,7 +133,7 @@ const ReceptionistAppointments = () => {
             headers: { Authorization: `Bearer ${token}` }
           });
           
-          setAppointments(appointments.filter(apt => apt.id !== appointmentId));
+          fetchAppointments();
           showSuccess('Appointment cancelled successfully!');
         } catch (error) {
           console.error('Error deleting appointment:', error);
@@ -283,21 +283,21 @@ const ReceptionistAppointments = () => {
             <div className="stat-card">
               <div className="stat-icon scheduled">📅</div>
               <div className="stat-info">
-                <h3>{appointments.filter(a => a.status === 'Scheduled').length}</h3>
+                <h3>{statusCounts.Scheduled || 0}</h3>
                 <p>Scheduled</p>
               </div>
             </div>
             <div className="stat-card">
               <div className="stat-icon confirmed">✅</div>
               <div className="stat-info">
-                <h3>{appointments.filter(a => a.status === 'Confirmed').length}</h3>
+                <h3>{statusCounts.Confirmed || 0}</h3>
                 <p>Confirmed</p>
               </div>
             </div>
             <div className="stat-card">
               <div className="stat-icon pending">⏳</div>
               <div className="stat-info">
-                <h3>{appointments.filter(a => a.status === 'Pending').length}</h3>
+                <h3>{statusCounts.Pending || 0}</h3>
                 <p>Pending</p>
               </div>
             </div>
@@ -18,6 +18,7 @@ const ReceptionistPatients = () => {
   
   const [activeTab, setActiveTab] = useState('all');
   const [searchQuery, setSearchQuery] = useState('');
+  const [searchResults, setSearchResults] = useState(null);
   const [patients, setPatients] = useState([]);
   const [loading, setLoading] = useState(true);
   const [showNewPatientModal, setShowNewPatientModal] = useState(false);
@@ -47,6 +48,31 @@ const ReceptionistPatients = () => {
     fetchPatients();
   }, []);
 
+  // Longer queries go to the indexed search endpoint (debounced); shorter
+  // ones, like patient ids, are matched against the loaded list
+  useEffect(() => {
+    if (searchQuery.trim().length < 3) {
+      setSearchResults(null);
+      return;
+    }
+    const timer = setTimeout(async () => {
+      try {
+        const token = localStorage.getItem('access_token');
+        const response = await axios.get(`${API_URL}/patients/search/`, {
+          headers: { Authorization: `Bearer ${token}` },
+          params: { q: searchQuery, limit: 50 }
+        });
+        if (response.data.success) {
+          setSearchResults(response.data.data);
+        }
+      } catch (error) {
+        console.error('Error searching patients:', error);
+        setSearchResults(null);
+      }
+    }, 200);
+    return () => clearTimeout(timer);
+  }, [searchQuery]);
+
   const fetchPatients = async () => {
     try {
       const token = localStorage.getItem('access_token');
@@ -93,8 +119,9 @@ const ReceptionistPatients = () => {
     );
   };
 
-  const filteredPatients = patients.filter(patient => {
-    const matchesSearch = patient.name?.toLowerCase().includes(searchQuery.toLowerCase()) ||
+  const filteredPatients = (searchResults || patients).filter(patient => {
+    const matchesSearch = searchResults !== null ||
+                         patient.name?.toLowerCase().includes(searchQuery.toLowerCase()) ||
                          patient.patient_id?.toLowerCase().includes(searchQuery.toLowerCase()) ||
                          patient.email?.toLowerCase().includes(searchQuery.toLowerCase());
     const matchesTab = activeTab === 'all' || 
@@ -83,39 +83,41 @@ const Reports = () => {
   useEffect(() => {
     fetchAnalyticsData();
   // eslint-disable-next-line react-hooks/exhaustive-deps
-  }, []);
+  }, [dateRange, department]);
+
+  const rangeStartDate = (range) => {
+    const days = { 'last-30-days': 30, 'last-90-days': 90, 'last-year': 365 }[range];
+    if (!days) return undefined;
+    const start = new Date();
+    start.setDate(start.getDate() - days);
+    return start.toISOString().split('T')[0];
+  };
+
+  const formatCurrency = (amount) => `$${(amount || 0).toLocaleString()}`;
 
   const fetchAnalyticsData = async () => {
     try {
       const token = localStorage.getItem('access_token');
       const headers = { Authorization: `Bearer ${token}` };
 
-      const [patientsRes, appointmentsRes, doctorsRes] = await Promise.all([
-        axios.get(`${API_URL}/patients/`, { headers }),
-        axios.get(`${API_URL}/appointments/`, { headers }),
-        axios.get(`${API_URL}/doctors/`, { headers })
-      ]);
-
-      const patients = patientsRes.data.data || [];
-      const appointments = appointmentsRes.data.data || [];
-      const doctors = doctorsRes.data.data || [];
-
-      const appointmentsByMonth = processAppointmentsByMonth(appointments);
-      const patientGrowth = processPatientGrowth(patients);
-      const departmentStats = processDepartmentStats(doctors, appointments);
-      const demographics = processDemographics(patients);
-      const revenue = calculateRevenue(appointments);
+      // All aggregation happens server-side; see /api/reports/
+      const response = await axios.get(`${API_URL}/reports/`, {
+        headers,
+        params: {
+          start: rangeStartDate(dateRange),
+          department
+        }
+      });
+      const report = response.data.data;
 
       setAnalyticsData({
-        totalPatients: patients.length,
-        totalAppointments: appointments.length,
-        completedVisits: appointments.filter(a => a.status === 'Completed').length,
-        activeDoctors: doctors.filter(d => d.is_active !== false).length,
-        appointmentsByMonth,
-        patientGrowth,
-        departmentStats,
-        demographics,
-        revenue
+        ...report,
+        departmentStats: report.departmentStats.slice(0, 3),
+        revenue: {
+          thisMonth: formatCurrency(report.revenue.thisMonth),
+          lastMonth: formatCurrency(report.revenue.lastMonth),
+          growth: `${report.revenue.growth >= 0 ? '+' : ''}${report.revenue.growth}%`
+        }
       });
 
       setLoading(false);
@@ -125,95 +127,6 @@ const Reports = () => {
     }
   };
 
-  const processAppointmentsByMonth = (appointments) => {
-    const monthCounts = {};
-    const months = ['Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec'];
-    
-    months.forEach(month => monthCounts[month] = 0);
-    
-    appointments.forEach(apt => {
-      const date = new Date(apt.date);
-      const month = months[date.getMonth()];
-      monthCounts[month]++;
-    });
-
-    return {
-      labels: months,
-      data: months.map(m => monthCounts[m])
-    };
-  };
-
-  const processPatientGrowth = (patients) => {
-    const months = ['Jan', 'Mar', 'May', 'Jul', 'Sep', 'Nov'];
-    
-    return {
-      labels: months,
-      data: months.map((_, i) => Math.floor(patients.length * (i + 1) / 6))
-    };
-  };
-
-  const processDepartmentStats = (doctors, appointments) => {
-    const deptCounts = {};
-    
-    doctors.forEach(doc => {
-      const dept = doc.department || 'General';
-      deptCounts[dept] = (deptCounts[dept] || 0) + 1;
-    });
-
-    const topDepts = Object.entries(deptCounts)
-      .sort((a, b) => b[1] - a[1])
-      .slice(0, 3);
-
-    return topDepts.map(([dept, count]) => ({
-      department: dept,
-      visits: count * 100 + Math.floor(Math.random() * 50)
-    }));
-  };
-
-  const processDemographics = (patients) => {
-    const ageGroups = {
-      '18-25': 0,
-      '26-55': 0,
-      '55+': 0
-    };
-
-    patients.forEach(patient => {
-      const age = patient.age || 30;
-      if (age <= 25) ageGroups['18-25']++;
-      else if (age <= 55) ageGroups['26-55']++;
-      else ageGroups['55+']++;
-    });
-
-    const total = patients.length || 1;
-    return Object.entries(ageGroups).map(([range, count]) => ({
-      range,
-      percentage: Math.round((count / total) * 100)
-    }));
-  };
-
-  const calculateRevenue = (appointments) => {
-    const basePrice = 150;
-    const thisMonth = appointments.filter(a => {
-      const date = new Date(a.date);
-      const now = new Date();
-      return date.getMonth() === now.getMonth();
-    }).length * basePrice;
-
-    const lastMonth = appointments.filter(a => {
-      const date = new Date(a.date);
-      const now = new Date();
-      return date.getMonth() === now.getMonth() - 1;
-    }).length * basePrice;
-
-    const growth = lastMonth > 0 ? ((thisMonth - lastMonth) / lastMonth * 100).toFixed(1) : 0;
-
-    return {
-      thisMonth: `$${thisMonth.toLocaleString()}`,
-      lastMonth: `$${lastMonth.toLocaleString()}`,
-      growth: `+${growth}%`
-    };
-  };
-
   const generateReportPreview = () => {
     const dateStr = customReportConfig.startDate && customReportConfig.endDate 
       ? `${customReportConfig.startDate} to ${customReportConfig.endDate}`